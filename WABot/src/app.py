@@ -1,73 +1,92 @@
+import asyncio
 import os
 from dotenv import load_dotenv
-from fastapi import FastAPI, Depends, HTTPException, status, Request
-from fastapi.responses import PlainTextResponse
+from fastapi import FastAPI, Depends, HTTPException, status, Request, Response
+from fastapi.responses import FileResponse, PlainTextResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
 from pydantic import BaseModel
 from datetime import datetime, timedelta
 from typing import Optional, List, Dict
 from fastapi.staticfiles import StaticFiles
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
 
-from whatsapp_config import whatsapp
-from wa_cloud_py.messages.types import (
-    TextMessage,
-    ImageMessage,
-    DocumentMessage,
-    AudioMessage,
-    VideoMessage,
-    LocationMessage,
-    InteractiveListMessage,
-)
-from database import get_db
+from wa_cloud_py.messages.types import MessageStatus
+from database import get_db, SessionLocal, session_scope
 from db_operations import (
-    get_student_by_whatsapp_number,
-    create_student,
-    update_student,
-    create_academic_history,
-    delete_academic_history,
-    create_or_update_subject_combination,
-    update_academic_history,
-    get_academic_history_by_whatsapp_number,
-    get_all_students_with_details,
+    count_students,
+    get_students_page,
     get_complete_student_info,
+    find_students_by_result,
+    get_result_subjects,
+)
+from conversation import handle_message
+from whatsapp_config import whatsapp, outbound_queue
+from webhook_queue import WebhookInbox, WebhookQueue, validate_webhook_body
+from lane_scheduler import LaneScheduler
+from webhook_parser import parse_webhook_events
+from message_dedup import MessageDeduplicator
+from status_buffer import StatusBuffer
+from outbox import OutboxDispatcher
+from media_fetcher import MediaFetcher
+from media_store import MEDIA_URL_PREFIX, MediaStore, get_media_object
+from renditions import RenditionBuilder, RENDITIONS, get_rendition
+from fingerprints import (
+    FingerprintIndexer,
+    DUPLICATE_PAGE_SIZE,
+    EXACT_RECALL_DISTANCE,
+    SIMILAR_DISTANCE,
+    find_similar,
+    find_cross_applicant_duplicates,
+    get_uploaders,
 )
-from messages.option_messages import (
-    send_welcome_message,
-    enrollment_welcome_message,
-    get_student_fullname,
-    get_student_birth,
-    get_student_address,
-    get_olevel_results,
-    get_student_gender,
-    reupload_olevel_results,
-    request_preferred_combination,
-    request_second_combination,
-    request_third_combination,
-    confirm_combination,
-    edit_combination_message,
-    information_confirmation_message,
-    lower_six_application_success_message,
-    get_olevel_results_by_subject,
+from media_response import (
+    IMMUTABLE_CACHE_CONTROL,
+    accel_redirect,
+    etag_matches,
+    evaluate_if_range,
+    not_modified,
 )
-from validation.personal_details_validation import convert_to_datetime
-from other_operations import handle_image_upload
-from subject_combination_validator import (
-    validate_combination,
-    separate_combination,
-    parse_academic_results,
+from dashboard import CounterReconciler, DashboardCache, read_dashboard_version
+from broadcast import (
+    BroadcastRunner,
+    create_broadcast,
+    broadcast_progress,
+    get_broadcast_recipients,
+)
+from models import (
+    User,
+    StudentAcademicHistory,
+    SubjectCombination,
+    Student,
+    Broadcast,
 )
-from models import User, StudentAcademicHistory, SubjectCombination, Student
 
 load_dotenv()
 
 VERIFY_TOKEN = os.getenv("VERIFY_TOKEN")
 ACCESS_TOKEN = os.getenv("ACCESS_TOKEN")
 PHONE_NUMBER_ID = os.getenv("PHONE_NUMBER_ID")
+# "queue" acknowledges webhooks as soon as they are stored in the inbox and
+# processes them on background workers; "inline" processes each webhook before
+# responding.
+WEBHOOK_INGESTION_MODE = os.getenv("WEBHOOK_INGESTION_MODE", "queue")
+# Messages from one WhatsApp number always run on the same sequential lane
+WEBHOOK_LANES = int(os.getenv("WEBHOOK_LANES", "8"))
+# Concurrent media downloads
+MEDIA_DOWNLOAD_WORKERS = int(os.getenv("MEDIA_DOWNLOAD_WORKERS", "4"))
+# Concurrent sends per broadcast; the outbound rate limit still applies
+BROADCAST_WORKERS = int(os.getenv("BROADCAST_WORKERS", "16"))
+# Internal location the reverse proxy maps to the media store root (e.g.
+# "/internal-media/"). When set, media files are handed to the proxy with
+# X-Accel-Redirect and sent by it with sendfile instead of by the app.
+MEDIA_ACCEL_REDIRECT = os.getenv("MEDIA_ACCEL_REDIRECT")
+# Comma-separated origins allowed to call the API from a browser (the dashboard)
+CORS_ORIGINS = os.getenv("CORS_ORIGINS", "http://localhost:5173").split(",")
 
 if not VERIFY_TOKEN:
     raise ValueError("VERIFY_TOKEN environment variable is not set")
@@ -77,12 +96,48 @@ if not PHONE_NUMBER_ID:
     raise ValueError("PHONE_NUMBER_ID environment variable is not set")
 
 app = FastAPI()
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=[origin.strip() for origin in CORS_ORIGINS if origin.strip()],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+    # Paging headers of /api/students, unreadable by the dashboard otherwise
+    expose_headers=["X-Next-Cursor", "X-Total-Count"],
+)
 
 # Serve static files
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
 templates = Jinja2Templates(directory="templates")
 
+message_deduplicator = MessageDeduplicator(SessionLocal)
+status_buffer = StatusBuffer(SessionLocal)
+outbox_dispatcher = OutboxDispatcher(outbound_queue, SessionLocal)
+media_store = MediaStore()
+rendition_builder = RenditionBuilder(SessionLocal, store=media_store)
+fingerprint_indexer = FingerprintIndexer(SessionLocal, store=media_store)
+
+
+def media_stored(sha256):
+    rendition_builder.submit(sha256)
+    fingerprint_indexer.submit(sha256)
+
+
+media_fetcher = MediaFetcher(
+    whatsapp,
+    SessionLocal,
+    store=media_store,
+    workers=MEDIA_DOWNLOAD_WORKERS,
+    on_stored=media_stored,
+    outbound=outbound_queue,
+)
+counter_reconciler = CounterReconciler(SessionLocal)
+dashboard_cache = DashboardCache(SessionLocal)
+broadcast_runner = BroadcastRunner(
+    outbound_queue, SessionLocal, workers=BROADCAST_WORKERS
+)
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -198,261 +253,243 @@ async def verify_webhook(request: Request):
     raise HTTPException(status_code=403, detail="Invalid verify token")
 
 
-@app.post("/webhook")
-async def receive_message(request: Request):
+def process_messages(messages):
+    """
+    Handles a list of inbound messages in order over one shared database session,
+    dropping redeliveries before the handler runs. This is blocking and must not
+    run on the event loop.
+    """
+    processed = 0
+    duplicates = 0
+    errors = []
+    with session_scope() as db:
+        for message in messages:
+            # Each message is one unit of work with a single commit. Its id is
+            # claimed in the same transaction, so a message whose handler fails
+            # (or whose process dies) is not marked as processed: its webhook
+            # stays in the inbox (or gets a non-2xx inline) and is retried.
+            try:
+                if not message_deduplicator.claim(db, message.id):
+                    duplicates += 1
+                    print(f"Skipping duplicate message {message.id}")
+                    continue
+                handle_message(db, message)
+                db.commit()
+                message_deduplicator.mark_processed(message.id)
+                outbox_dispatcher.notify()
+                media_fetcher.notify()
+                processed += 1
+            except Exception as e:
+                # One bad message must not drop the rest of the batch
+                print(f"Error processing message {message.id}: {e}")
+                db.rollback()
+                errors.append(str(e))
+
+    if errors:
+        return {
+            "status": "error",
+            "processed": processed,
+            "duplicates": duplicates,
+            "errors": errors,
+        }
+    return {"status": "processed", "processed": processed, "duplicates": duplicates}
+
+
+def process_webhook(body):
+    """
+    Processes every message in a raw webhook body in one pass. Used by the inline
+    ingestion mode.
+    """
     try:
-        body = await request.body()
-        message = whatsapp.parse(body)
-        phone = message.user.phone_number
-        username = message.user.name
-        db = next(get_db())
-        student_state = None
-        student = get_student_by_whatsapp_number(db=db, whatsapp_number=phone)
-        if student:
-            student_state = student.state
-            print(f"student with state {student_state} found")
-        else:
-            create_student(phone=phone, state="none", email=None, name=None)
-            print("student not found")
-        if isinstance(message, TextMessage):
-            if student_state == "none":
-                send_welcome_message(whatsapp, phone, username)
-            elif student_state == "collecting_name":
-                get_student_birth(whatsapp, phone)
-                name = message.body
-                update_student(
-                    db=db, whatsapp_number=phone, name=name, state="collecting_dob"
-                )
-            elif student_state == "collecting_dob":
-                get_student_gender(whatsapp, phone)
-                dob = message.body
-                dob = convert_to_datetime(dob)
-                update_student(
-                    db=db,
-                    whatsapp_number=phone,
-                    dob=dob,
-                    state="collecting_gender",
-                )
-            elif student_state == "collecting_gender":
-                get_student_address(whatsapp, phone)
-                gender = message.body
-                update_student(
-                    db=db,
-                    whatsapp_number=phone,
-                    gender=gender,
-                    state="collecting_address",
-                )
-                pass
-            elif student_state == "collecting_address":
-                get_olevel_results_by_subject(whatsapp, phone)
-                address = message.body
-                update_student(
-                    db=db,
-                    whatsapp_number=phone,
-                    address=address,
-                    state="collecting_academics",
-                )
-            elif student_state == "collecting_academics":
-                results_str = message.body
-                print("passing academic history")
-                results = parse_academic_results(results_str)
-                print(results)
-                academic_history = get_academic_history_by_whatsapp_number(
-                    db=db, whatsapp_number=phone
-                )
-                if academic_history:
-                    update_academic_history(
-                        db=db, whatsapp_number=phone, results=results
-                    )
-                    get_olevel_results(whatsapp, phone)
-                    update_student(db=db, whatsapp_number=phone, state="upload_photo")
-                else:
-                    create_academic_history(whatsapp_number=phone)
-                    update_academic_history(
-                        db=db, whatsapp_number=phone, results=results
-                    )
-                    get_olevel_results(whatsapp, phone)
-                    update_student(db=db, whatsapp_number=phone, state="upload_photo")
-            elif student_state == "collecting_combination":
-                combination = message.body
-                validate_comb = validate_combination(combination)
-                print("validating combination")
-                if validate_comb:
-                    print("separating subjects")
-                    Subject1, Subject2, Subject3 = separate_combination(combination)
-                    request_second_combination(whatsapp, phone)
-                    create_or_update_subject_combination(
-                        db=db,
-                        whatsapp_number=phone,
-                        subject1=Subject1,
-                        subject2=Subject2,
-                        subject3=Subject3,
-                    )
-                    update_student(
-                        db=db, whatsapp_number=phone, state="collecting_combination_2"
-                    )
-            elif student_state == "collecting_combination_2":
-                combination = message.body
-                validate_comb = validate_combination(combination)
-                print("validating combination")
-                if validate_comb:
-                    print("separating subjects")
-                    Subject1, Subject2, Subject3 = separate_combination(combination)
-                    request_third_combination(whatsapp, phone)
-                    create_or_update_subject_combination(
-                        db=db,
-                        whatsapp_number=phone,
-                        subject1_option2=Subject1,
-                        subject2_option2=Subject2,
-                        subject3_option2=Subject3,
-                    )
-                update_student(
-                    db=db, whatsapp_number=phone, state="collecting_combination_3"
-                )
-            elif student_state == "collecting_combination_3":
-                combination = message.body
-                validate_comb = validate_combination(combination)
-                print("validating combination")
-                if validate_comb:
-                    print("separating subjects")
-                    Subject1, Subject2, Subject3 = separate_combination(combination)
-                    confirm_combination(whatsapp, phone)
-                    create_or_update_subject_combination(
-                        db=db,
-                        whatsapp_number=phone,
-                        subject1_option3=Subject1,
-                        subject2_option3=Subject2,
-                        subject3_option3=Subject3,
-                    )
-                update_student(db=db, whatsapp_number=phone, state="verify_combination")
-            elif student_state == "editing_combination_1":
-                combination = message.body
-                validate_comb = validate_combination(combination)
-                print("validating combination")
-                if validate_comb:
-                    print("separating subjects")
-                    Subject1, Subject2, Subject3 = separate_combination(combination)
-                    confirm_combination(whatsapp, phone)
-                    create_or_update_subject_combination(
-                        db=db,
-                        whatsapp_number=phone,
-                        subject1=Subject1,
-                        subject2=Subject2,
-                        subject3=Subject3,
-                    )
-                    update_student(
-                        db=db, whatsapp_number=phone, state="verify_combination"
-                    )
-            elif student_state == "editing_combination_2":
-                combination = message.body
-                validate_comb = validate_combination(combination)
-                print("validating combination")
-                if validate_comb:
-                    print("separating subjects")
-                    Subject1, Subject2, Subject3 = separate_combination(combination)
-                    confirm_combination(whatsapp, phone)
-                    create_or_update_subject_combination(
-                        db=db,
-                        whatsapp_number=phone,
-                        subject1_option2=Subject1,
-                        subject2_option2=Subject2,
-                        subject3_option2=Subject3,
-                    )
-                    update_student(
-                        db=db, whatsapp_number=phone, state="verify_combination"
-                    )
-            elif student_state == "editing_combination_3":
-                combination = message.body
-                validate_comb = validate_combination(combination)
-                print("validating combination")
-                if validate_comb:
-                    print("separating subjects")
-                    Subject1, Subject2, Subject3 = separate_combination(combination)
-                    confirm_combination(whatsapp, phone)
-                    create_or_update_subject_combination(
-                        db=db,
-                        whatsapp_number=phone,
-                        subject1_option2=Subject1,
-                        subject2_option2=Subject2,
-                        subject3_option2=Subject3,
-                    )
-                    update_student(
-                        db=db, whatsapp_number=phone, state="verify_combination"
-                    )
-        if isinstance(message, ImageMessage):
-            print("handling image message")
-            handle_image_upload(db, whatsapp, phone, message, student_state)
-        elif isinstance(message, DocumentMessage):
-            print(f"Received document: {message.filename}")
-        elif isinstance(message, AudioMessage):
-            print(f"Received audio. Voice note: {message.is_voice}")
-        elif isinstance(message, VideoMessage):
-            print("Received video")
-        elif isinstance(message, LocationMessage):
-            print(f"Received location: {message.latitude}, {message.longitude}")
-        elif isinstance(message, InteractiveListMessage):
-            user_choice = message.reply_id
-            if user_choice == "class_enrollment":
-                result = enrollment_welcome_message(whatsapp, phone)
-                if result:
-                    message_sent, res = result
-            elif user_choice == "form_1":
-                pass
-            elif user_choice == "lower_six":
-                student = get_student_by_whatsapp_number(db=db, whatsapp_number=phone)
-                student_state = student.state
-                if student_state == "none":
-                    get_student_fullname(whatsapp, phone)
-                    update_student(
-                        db=db, whatsapp_number=phone, state="collecting_name"
-                    )
-            elif user_choice == "review_images":
-                pass
-            elif user_choice == "reupload_images":
-                delete_academic_history(db=db, whatsapp_number=phone)
-                create_academic_history(whatsapp_number=phone)
-                reupload_olevel_results(whatsapp, phone)
-            elif user_choice == "continue_application":
-                update_student(
-                    db=db, whatsapp_number=phone, state="collecting_combination"
-                )
-                request_preferred_combination(whatsapp, phone)
-            elif user_choice == "confirm_combination":
-                information_confirmation_message(whatsapp, phone)
-            elif user_choice == "edit_combination":
-                edit_combination_message(whatsapp, phone)
-            elif user_choice == "edit_option_A":
-                update_student(
-                    db=db, whatsapp_number=phone, state="editing_combination_1"
-                )
-                request_preferred_combination(whatsapp, phone)
-            elif user_choice == "edit_option_B":
-                update_student(
-                    db=db, whatsapp_number=phone, state="editing_combination_2"
-                )
-                request_second_combination(whatsapp, phone)
-            elif user_choice == "edit_option_C":
-                update_student(
-                    db=db, whatsapp_number=phone, state="editing_combination_3"
-                )
-                request_third_combination(whatsapp, phone)
-            elif user_choice == "confirm_accuracy":
-                lower_six_application_success_message(whatsapp, phone, username)
-                update_student(db=db, whatsapp_number=phone, state="none")
-            elif user_choice == "tuition_fees":
-                pass
-            elif user_choice == "school_schedule":
-                pass
-            elif user_choice == "other_options":
-                pass
-        return {"status": "processed"}
+        events = list(parse_webhook_events(body))
     except Exception as e:
+        print(f"Error parsing webhook: {e}")
         return {"status": "error", "message": str(e)}
 
+    messages = []
+    for event in events:
+        if isinstance(event, MessageStatus):
+            status_buffer.add(event)
+        else:
+            messages.append(event)
+    return process_messages(messages)
+
+
+async def route_webhook(entry):
+    """
+    Splits a queued inbox entry into per-student groups and hands each group to
+    the lane owning that WhatsApp number, so one student's messages stay ordered
+    while different students are processed in parallel. The entry leaves the
+    inbox once every group has been handled.
+    """
+    entry_id, body = entry
+    try:
+        events = list(parse_webhook_events(body))
+    except Exception as e:
+        print(f"Dropping unparseable webhook {entry_id}: {e}")
+        await asyncio.to_thread(webhook_inbox.remove, entry_id)
+        return
+
+    groups = {}
+    for event in events:
+        if isinstance(event, MessageStatus):
+            # Statuses skip the conversation machinery and are written in batches
+            status_buffer.add(event)
+            continue
+        groups.setdefault(event.user.phone_number, []).append(event)
+    handled = [
+        await lane_scheduler.submit(phone, messages)
+        for phone, messages in groups.items()
+    ]
+    # Wait for the lanes off the router, so the next body is routed meanwhile
+    track_inbox_task(remove_when_handled(entry, handled))
+
+
+def track_inbox_task(coroutine):
+    # Keeps a reference, so the task is not garbage collected while it runs
+    task = asyncio.create_task(coroutine)
+    inbox_tasks.add(task)
+    task.add_done_callback(inbox_tasks.discard)
+
+
+async def remove_when_handled(entry, handled):
+    """
+    Removes an inbox entry once every message in it has been committed or
+    skipped as a duplicate. If any failed, the entry stays and the whole body is
+    routed again after a backoff; the messages already committed are dropped
+    as duplicates then.
+    """
+    entry_id, _ = entry
+    results = await asyncio.gather(*handled, return_exceptions=True)
+    errors = [
+        str(result) if isinstance(result, Exception) else "; ".join(result["errors"])
+        for result in results
+        if isinstance(result, Exception) or result["status"] == "error"
+    ]
+    try:
+        if not errors:
+            await asyncio.to_thread(webhook_inbox.remove, entry_id)
+            return
+        attempts = await asyncio.to_thread(
+            webhook_inbox.record_failure, entry_id, "; ".join(errors)
+        )
+    except Exception as e:
+        # The entry is replayed on the next start; its messages are deduplicated
+        print(f"Failed to update webhook {entry_id} in the inbox: {e}")
+        return
+    if attempts is not None:
+        track_inbox_task(retry_webhook(entry, webhook_inbox.retry_delay(attempts)))
+
+
+async def retry_webhook(entry, delay):
+    await asyncio.sleep(delay)
+    await webhook_queue.put(entry)
+
+
+webhook_inbox = WebhookInbox(SessionLocal)
+inbox_tasks = set()
+lane_scheduler = LaneScheduler(handler=process_messages, lanes=WEBHOOK_LANES)
+# A single router keeps bodies in arrival order on their way to the lanes
+webhook_queue = WebhookQueue(handler=route_webhook, workers=1)
+
+
+@app.on_event("startup")
+async def start_webhook_queue():
+    status_buffer.start()
+    outbox_dispatcher.start()
+    rendition_builder.start()
+    fingerprint_indexer.start()
+    media_fetcher.start()
+    counter_reconciler.start()
+    broadcast_runner.resume_interrupted()
+    if WEBHOOK_INGESTION_MODE == "queue":
+        await lane_scheduler.start()
+        await webhook_queue.start()
+        # Bodies acknowledged before a crash or restart but never processed
+        pending = await run_in_threadpool(webhook_inbox.pending)
+        if pending:
+            print(f"Replaying {len(pending)} webhooks from the inbox")
+        for entry_id, body in pending:
+            await webhook_queue.put((entry_id, body))
+
+
+@app.on_event("shutdown")
+async def stop_webhook_queue():
+    await webhook_queue.stop()
+    await lane_scheduler.stop()
+    status_buffer.stop()
+    broadcast_runner.stop()
+    counter_reconciler.stop()
+    outbox_dispatcher.stop()
+    media_fetcher.stop()
+    rendition_builder.stop()
+    fingerprint_indexer.stop()
+
+
+@app.post("/webhook")
+async def receive_message(request: Request):
+    body = await request.body()
+    if not validate_webhook_body(body):
+        raise HTTPException(status_code=400, detail="Invalid webhook payload")
+    if WEBHOOK_INGESTION_MODE != "queue":
+        result = await run_in_threadpool(process_webhook, body)
+        if result["status"] == "error" and "errors" not in result:
+            raise HTTPException(status_code=400, detail=result["message"])
+        if result["status"] == "error":
+            # Meta redelivers non-2xx deliveries; the messages that did commit
+            # are dropped as duplicates then
+            raise HTTPException(status_code=500, detail=result)
+        return result
+    # Stored before the 200, so a crash cannot lose an acknowledged body
+    entry_id = await run_in_threadpool(webhook_inbox.add, body)
+    if not webhook_queue.enqueue((entry_id, body)):
+        await run_in_threadpool(webhook_inbox.remove, entry_id)
+        # Meta retries non-2xx deliveries, so shedding load here is safe.
+        raise HTTPException(status_code=503, detail="Webhook queue is full")
+    return {"status": "queued"}
+
+
+STUDENT_PAGE_SIZE = 50
+STUDENT_MAX_PAGE_SIZE = 500
+
 
 @app.get("/api/students")
-async def get_students(db: Session = Depends(get_db)):
-    students = get_all_students_with_details(db)
+def get_students(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = STUDENT_PAGE_SIZE,
+    sort: str = "id",
+    state: Optional[str] = None,
+    combination_state: Optional[str] = None,
+    gender: Optional[str] = None,
+    has_images: Optional[bool] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    One page of students with their details. Pass the X-Next-Cursor header of a
+    response as `cursor` to get the next page; it is absent on the last page.
+    X-Total-Count is the number of students matching the filters. `sort` is
+    id or name, prefixed with "-" for descending.
+    """
+    filters = {
+        "state": state,
+        "combination_state": combination_state,
+        "gender": gender,
+        "has_images": has_images,
+    }
+    try:
+        students, next_cursor = get_students_page(
+            db,
+            limit=max(1, min(limit, STUDENT_MAX_PAGE_SIZE)),
+            cursor=cursor,
+            sort=sort,
+            **filters,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    response.headers["X-Total-Count"] = str(count_students(db, **filters))
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = next_cursor
     return students
 
 
@@ -516,75 +553,31 @@ class DashboardStats(BaseModel):
     academic_performance: Dict[str, int]
 
 
-# Utility function to get counts based on conditions
-def get_count(db: Session, model, filter_by=None):
-    query = db.query(model)
-    if filter_by:
-        query = query.filter(filter_by)
-    return query.count()
-
-
-# Utility function for grouping data
-def get_grouped_data(db: Session, model, group_by, count_field):
-    return dict(db.query(group_by, func.count(count_field)).group_by(group_by).all())
+# Browsers may keep the dashboard but must revalidate it with the ETag
+DASHBOARD_CACHE_CONTROL = "private, no-cache"
 
 
 @app.get("/api/dashboard", response_model=DashboardStats)
-async def get_dashboard_data(
-    current_user: User = Depends(get_current_user), db: Session = Depends(get_db)
+def get_dashboard_data(
+    request: Request,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
 ):
-    # Fetch all necessary counts and data
-    total_students = get_count(db, Student)
-    pending_registrations = get_count(db, Student, Student.state == "collecting_name")
-    pending_combinations = get_count(
-        db,
-        SubjectCombination,
-        SubjectCombination.subject_combination_state == "Pending",
-    )
-    total_academic_records = get_count(db, StudentAcademicHistory)
-    students_by_state = get_grouped_data(db, Student, Student.state, Student.id)
-
-    # Fetch recent students
-    recent_students = [
-        {
-            "name": student.name or "Pending",
-            "whatsapp_number": student.whatsapp_number,
-            "state": student.state,
-        }
-        for student in db.query(Student).order_by(desc(Student.id)).limit(5).all()
-    ]
-
-    # Fetch subject combinations stats
-    subject_combinations_stats = get_grouped_data(
-        db,
-        SubjectCombination,
-        SubjectCombination.subject_combination_state,
-        SubjectCombination.id,
-    )
-
-    # Calculate academic performance
-    academic_records = db.query(StudentAcademicHistory).all()
-    performance_stats = {"A": 0, "B": 0, "C": 0, "D": 0, "E": 0, "F": 0}
-    for record in academic_records:
-        symbols = [
-            getattr(record, f"symbol{i}")
-            for i in range(1, 15)
-            if getattr(record, f"symbol{i}")
-        ]
-        for symbol in symbols:
-            if symbol:
-                performance_stats[symbol[0]] += 1
-
-    return DashboardStats(
-        total_students=total_students,
-        pending_registrations=pending_registrations,
-        pending_combinations=pending_combinations,
-        total_academic_records=total_academic_records,
-        students_by_state=students_by_state,
-        recent_students=recent_students,
-        subject_combinations_stats=subject_combinations_stats,
-        academic_performance=performance_stats,
-    )
+    """
+    The ETag is the dashboard version, which every write that changes the stats
+    increments. A poll with the current ETag costs one indexed read and gets a
+    304; otherwise the cached payload is served, recomputed once per version.
+    """
+    version = read_dashboard_version(db)
+    etag = f'"dashboard-{version}"'
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag, DASHBOARD_CACHE_CONTROL)
+
+    version, stats = dashboard_cache.get(version)
+    response.headers["ETag"] = f'"dashboard-{version}"'
+    response.headers["Cache-Control"] = DASHBOARD_CACHE_CONTROL
+    return DashboardStats(**stats)
 
 
 @app.get("/api/dashboard/students/{whatsapp_number}")
@@ -625,3 +618,279 @@ async def get_student_details(
         "academic_history": academic_history,
         "subject_combination": subject_combination,
     }
+
+
+@app.get("/api/academic-results")
+async def search_academic_results(
+    response: Response,
+    subject: str,
+    min_grade: str = "E",
+    cursor: Optional[str] = None,
+    limit: int = STUDENT_PAGE_SIZE,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """
+    One page of the students with `min_grade` or better in `subject`, best
+    first. Pass the X-Next-Cursor header of a response as `cursor` to get the
+    next page; it is absent on the last page.
+    """
+    try:
+        results, next_cursor = find_students_by_result(
+            db,
+            subject,
+            min_grade,
+            limit=max(1, min(limit, STUDENT_MAX_PAGE_SIZE)),
+            cursor=cursor,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return [
+        {
+            "whatsapp_number": result.whatsapp_number,
+            "subject": result.subject,
+            "grade": result.grade,
+            "points": result.points,
+        }
+        for result in results
+    ]
+
+
+@app.get("/api/academic-results/subjects")
+async def list_result_subjects(
+    current_user: User = Depends(get_current_user), db: Session = Depends(get_db)
+):
+    return [
+        {"subject": subject, "students": students}
+        for subject, students in get_result_subjects(db)
+    ]
+
+
+# Most stored images one /api/media/duplicates page checks
+DUPLICATE_MAX_PAGE_SIZE = 500
+
+
+@app.get("/api/media/duplicates")
+async def get_duplicate_media(
+    response: Response,
+    max_distance: int = SIMILAR_DISTANCE,
+    cursor: Optional[int] = None,
+    limit: int = DUPLICATE_PAGE_SIZE,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Lists images uploaded by more than one WhatsApp number: identical files, and
+    pairs whose perceptual hashes differ by at most `max_distance` bits. Each
+    page checks `limit` stored images and can be short or empty; pass the
+    X-Next-Cursor header of a response as `cursor` to get the next page, until
+    it is absent.
+    """
+    if not 0 <= max_distance <= EXACT_RECALL_DISTANCE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"max_distance must be between 0 and {EXACT_RECALL_DISTANCE}",
+        )
+    duplicates, next_cursor = find_cross_applicant_duplicates(
+        db,
+        max_distance,
+        limit=max(1, min(limit, DUPLICATE_MAX_PAGE_SIZE)),
+        cursor=cursor,
+    )
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = str(next_cursor)
+    return duplicates
+
+
+@app.get("/api/media/{sha256}/similar")
+async def get_similar_media(
+    sha256: str,
+    max_distance: int = SIMILAR_DISTANCE,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Lists stored images that look like `sha256`, nearest first, with the
+    WhatsApp numbers that uploaded each.
+    """
+    if not 0 <= max_distance <= EXACT_RECALL_DISTANCE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"max_distance must be between 0 and {EXACT_RECALL_DISTANCE}",
+        )
+    matches = find_similar(db, sha256, max_distance)
+    if matches is None:
+        raise HTTPException(status_code=404, detail="Image has not been fingerprinted")
+    uploaders = get_uploaders(db, [sha256] + [match for match, _ in matches])
+    return {
+        "sha256": sha256,
+        "whatsapp_numbers": sorted(uploaders[sha256]),
+        "similar": [
+            {
+                "sha256": match,
+                "distance": distance,
+                "whatsapp_numbers": sorted(uploaders[match]),
+            }
+            for match, distance in matches
+        ],
+    }
+
+
+@app.get("/api/media/{sha256}")
+async def get_media(
+    sha256: str,
+    request: Request,
+    rendition: str = "display",
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Serves an uploaded image by content hash. `rendition` is "thumb", "display"
+    or "original"; the original is served until the rendition has been built.
+
+    The ETag is the content hash plus the rendition, so a matching If-None-Match
+    is answered with 304 before the database or the file is touched.
+    Range requests are served by FileResponse; If-Range is checked against the
+    same ETag here. With MEDIA_ACCEL_REDIRECT set, the reverse proxy sends the
+    file (and answers Range) instead.
+    """
+    if rendition != "original" and rendition not in RENDITIONS:
+        raise HTTPException(status_code=400, detail="Unknown rendition")
+    etag = f'"{sha256}-{rendition}"'
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+
+    media = get_media_object(db, sha256)
+    if not media:
+        raise HTTPException(status_code=404, detail="Media not found")
+
+    path, media_type = media.path, media.mime_type
+    cache_control = IMMUTABLE_CACHE_CONTROL
+    if rendition != "original":
+        rendered = get_rendition(db, sha256, rendition)
+        if rendered:
+            path, media_type = rendered.path, rendered.mime_type
+        else:
+            # Not built yet: serve the original under its own ETag, briefly
+            etag = f'"{sha256}-original"'
+            cache_control = "private, max-age=60"
+            if etag_matches(request.headers.get("if-none-match"), etag):
+                return not_modified(etag, cache_control)
+
+    local_path = media_store.local_path(path)
+    if not os.path.isfile(local_path):
+        print(f"Media file {local_path} of {sha256} is missing")
+        raise HTTPException(status_code=404, detail="Media not found")
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if MEDIA_ACCEL_REDIRECT:
+        location = MEDIA_ACCEL_REDIRECT + path[len(MEDIA_URL_PREFIX) :]
+        return accel_redirect(location, media_type, headers)
+    evaluate_if_range(request, etag)
+    return FileResponse(local_path, media_type=media_type, headers=headers)
+
+
+class BroadcastCreate(BaseModel):
+    message: str
+    target_field: str  # "state" or "subject_combination_state"
+    target_value: str
+    # An approved template to send the message in, as its {{1}}. Without one the
+    # message is free-form text, which WhatsApp only delivers to students who
+    # wrote in the last 24 hours.
+    template_name: Optional[str] = None
+    template_language: Optional[str] = None
+
+
+def get_broadcast_or_404(db: Session, broadcast_id: int):
+    broadcast = db.get(Broadcast, broadcast_id)
+    if not broadcast:
+        raise HTTPException(status_code=404, detail="Broadcast not found")
+    return broadcast
+
+
+@app.post("/api/broadcasts")
+def start_broadcast(
+    request: BroadcastCreate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    try:
+        broadcast = create_broadcast(
+            db,
+            message=request.message,
+            target_field=request.target_field,
+            target_value=request.target_value,
+            created_by=current_user.username,
+            template_name=request.template_name,
+            template_language=request.template_language,
+        )
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+    db.commit()
+    broadcast_runner.start(broadcast.id)
+    return broadcast_progress(broadcast)
+
+
+@app.get("/api/broadcasts/{broadcast_id}")
+def get_broadcast(
+    broadcast_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    return broadcast_progress(get_broadcast_or_404(db, broadcast_id))
+
+
+@app.get("/api/broadcasts/{broadcast_id}/recipients")
+def get_broadcast_recipient_results(
+    broadcast_id: int,
+    status: Optional[str] = None,
+    after_id: int = 0,
+    limit: int = 100,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    get_broadcast_or_404(db, broadcast_id)
+    return get_broadcast_recipients(
+        db, broadcast_id, status=status, after_id=after_id, limit=min(limit, 1000)
+    )
+
+
+@app.post("/api/broadcasts/{broadcast_id}/cancel")
+def cancel_broadcast(
+    broadcast_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    broadcast = get_broadcast_or_404(db, broadcast_id)
+    if broadcast.status in ("pending", "running"):
+        broadcast.status = "cancelled"
+        broadcast.finished_at = datetime.utcnow()
+        db.commit()
+    return broadcast_progress(broadcast)
+
+
+@app.post("/api/broadcasts/{broadcast_id}/resume")
+def resume_broadcast(
+    broadcast_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Resumes a cancelled broadcast, or one whose run was interrupted (it is
+    pending or running, but nothing is sending it).
+    """
+    broadcast = get_broadcast_or_404(db, broadcast_id)
+    interrupted = broadcast.status in (
+        "pending",
+        "running",
+    ) and not broadcast_runner.is_running(broadcast.id)
+    if broadcast.status != "cancelled" and not interrupted:
+        raise HTTPException(status_code=409, detail=f"Broadcast is {broadcast.status}")
+    if broadcast.status == "cancelled":
+        broadcast.status = "running"
+        broadcast.finished_at = None
+        db.commit()
+    broadcast_runner.start(broadcast.id)
+    return broadcast_progress(broadcast)
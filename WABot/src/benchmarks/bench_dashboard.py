@@ -0,0 +1,166 @@
+"""
+Benchmark of /api/dashboard aggregation as the number of applicants grows.
+
+Compares three ways of building the payload: the original query pattern (five
+separate counts/groupings plus reading the 14 symbol columns of every academic
+history row in Python), the grouped SQL queries that rebuild the dashboard
+counters, and compute_dashboard_stats(), which reads the counters. Runs against
+a scratch SQLite database seeded with students, academic histories (wide
+columns and academic_results rows) and subject combinations.
+
+Usage: python benchmarks/bench_dashboard.py [--sizes 1000 5000 20000] [--repeat 5]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import create_engine, desc, func, insert
+from sqlalchemy.orm import sessionmaker
+
+from dashboard import (
+    compute_dashboard_stats,
+    count_dashboard_counters,
+    reconcile_dashboard_counters,
+)
+from models import (
+    Base,
+    Student,
+    StudentAcademicHistory,
+    SubjectCombination,
+    AcademicResult,
+)
+
+STATES = ["collecting_name", "collecting_dob", "upload_photo", "none"]
+SUBJECTS = ["Maths", "English", "Physics", "Chemistry", "Biology", "History"]
+GRADES = ["A", "B", "C", "D", "E"]
+
+
+def seed(db, size):
+    rng = random.Random(size)
+    students, histories, results, combinations = [], [], [], []
+    for i in range(size):
+        number = f"26377{i:07d}"
+        students.append(
+            {"whatsapp_number": number, "name": f"S{i}", "state": rng.choice(STATES)}
+        )
+        history = {"whatsapp_number": number}
+        for position, subject in enumerate(rng.sample(SUBJECTS, 5), start=1):
+            grade = rng.choice(GRADES)
+            history[f"subject{position}"] = subject
+            history[f"symbol{position}"] = grade
+            results.append(
+                {
+                    "whatsapp_number": number,
+                    "position": position,
+                    "subject": subject,
+                    "grade": grade,
+                    "points": 5 - GRADES.index(grade),
+                }
+            )
+        histories.append(history)
+        combinations.append(
+            {
+                "whatsapp_number": number,
+                "subject_combination_state": rng.choice(["Pending", "Approved"]),
+            }
+        )
+    db.execute(insert(Student), students)
+    db.execute(insert(StudentAcademicHistory), histories)
+    db.execute(insert(AcademicResult), results)
+    db.execute(insert(SubjectCombination), combinations)
+    db.commit()
+
+
+def old_dashboard(db):
+    """
+    The aggregation as get_dashboard_data did it before compute_dashboard_stats.
+    """
+    total_students = db.query(Student).count()
+    pending_registrations = (
+        db.query(Student).filter(Student.state == "collecting_name").count()
+    )
+    pending_combinations = (
+        db.query(SubjectCombination)
+        .filter(SubjectCombination.subject_combination_state == "Pending")
+        .count()
+    )
+    total_academic_records = db.query(StudentAcademicHistory).count()
+    students_by_state = dict(
+        db.query(Student.state, func.count(Student.id)).group_by(Student.state).all()
+    )
+    recent_students = db.query(Student).order_by(desc(Student.id)).limit(5).all()
+    subject_combinations_stats = dict(
+        db.query(
+            SubjectCombination.subject_combination_state,
+            func.count(SubjectCombination.id),
+        )
+        .group_by(SubjectCombination.subject_combination_state)
+        .all()
+    )
+    performance_stats = {"A": 0, "B": 0, "C": 0, "D": 0, "E": 0, "F": 0}
+    for record in db.query(StudentAcademicHistory).all():
+        for i in range(1, 15):
+            symbol = getattr(record, f"symbol{i}")
+            if symbol:
+                performance_stats[symbol[0]] += 1
+    return (
+        total_students,
+        pending_registrations,
+        pending_combinations,
+        total_academic_records,
+        students_by_state,
+        recent_students,
+        subject_combinations_stats,
+        performance_stats,
+    )
+
+
+def best_of(fn, session_factory, repeat):
+    best = None
+    for _ in range(repeat):
+        db = session_factory()
+        try:
+            start = time.perf_counter()
+            fn(db)
+            elapsed = time.perf_counter() - start
+        finally:
+            db.close()
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000, 20000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'students':>9} {'old ms':>9} {'grouped ms':>11} {'counters ms':>12}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+            Base.metadata.create_all(engine)
+            session_factory = sessionmaker(bind=engine)
+            db = session_factory()
+            seed(db, size)
+            reconcile_dashboard_counters(db)
+            db.close()
+
+            old = best_of(old_dashboard, session_factory, args.repeat)
+            grouped = best_of(count_dashboard_counters, session_factory, args.repeat)
+            counters = best_of(compute_dashboard_stats, session_factory, args.repeat)
+            print(
+                f"{size:>9} {old * 1000:>9.1f} {grouped * 1000:>11.1f} "
+                f"{counters * 1000:>12.2f}"
+            )
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Throughput benchmark for LaneScheduler.
+
+Simulates a burst of webhook messages from many students, where handling each
+message blocks for a fixed time (standing in for DB and Graph API round trips),
+and reports throughput for different lane counts. It also checks that every
+student's messages were handled in the order they were submitted.
+
+Usage: python benchmarks/bench_lane_scheduler.py [--students 200] [--messages 5] [--latency-ms 20]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from lane_scheduler import LaneScheduler
+
+
+async def run(lanes, students, messages_per_student, latency):
+    handled = {}
+    lock = threading.Lock()
+
+    def handler(item):
+        phone, sequence = item
+        time.sleep(latency)
+        with lock:
+            handled.setdefault(phone, []).append(sequence)
+
+    scheduler = LaneScheduler(handler=handler, lanes=lanes)
+    await scheduler.start()
+    started = time.perf_counter()
+    for sequence in range(messages_per_student):
+        for student in range(students):
+            phone = f"26377{student:07d}"
+            await scheduler.submit(phone, (phone, sequence))
+    await asyncio.gather(*(queue.join() for queue in scheduler.queues))
+    elapsed = time.perf_counter() - started
+    await scheduler.stop()
+
+    in_order = all(seq == sorted(seq) for seq in handled.values())
+    return elapsed, in_order
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--students", type=int, default=200)
+    parser.add_argument("--messages", type=int, default=5)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--lanes", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    total = args.students * args.messages
+    print(
+        f"{total} messages from {args.students} students, "
+        f"{args.latency_ms:.0f} ms simulated handling latency"
+    )
+    print(f"{'lanes':>6} {'seconds':>9} {'msg/s':>9} {'ordered':>8}")
+    for lanes in args.lanes:
+        elapsed, in_order = asyncio.run(
+            run(lanes, args.students, args.messages, args.latency_ms / 1000)
+        )
+        print(f"{lanes:>6} {elapsed:>9.2f} {total / elapsed:>9.1f} {str(in_order):>8}")
+
+
+if __name__ == "__main__":
+    main()
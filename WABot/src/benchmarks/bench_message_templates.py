@@ -0,0 +1,134 @@
+"""
+Micro-benchmark of the per-send cost of building a message body.
+
+Compares building the ListSection/SectionRow objects and serializing them with
+json.dumps on every send (what the helpers in messages/option_messages.py used
+to do) against rendering the precompiled MessageTemplate. Nothing is sent.
+
+Usage: python benchmarks/bench_message_templates.py [--number 50000]
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from wa_cloud_py.components.messages import ListSection, SectionRow
+
+from whatsapp_client import interactive_list_payload
+from messages.option_messages import (
+    WELCOME_MESSAGE_TEMPLATE,
+    EDIT_COMBINATION_MESSAGE_TEMPLATE,
+    GET_STUDENT_FULLNAME_TEMPLATE,
+)
+
+PHONE = "263770000000"
+USERNAME = "Tendai"
+
+
+def build_welcome():
+    return interactive_list_payload(
+        to=PHONE,
+        body=f"👋Hello {USERNAME} \n Welcome to the *Mufakose 2 Secondary School WhatsApp Chatbot*! 🎒\n\nHow may we assist you today? 😊\nPlease select an option from the menu below:",
+        button="📋 Select",
+        sections=[
+            ListSection(
+                title="📚 Main Menu",
+                rows=[
+                    SectionRow(
+                        id="class_enrollment",
+                        title="📖 Class Enrollment",
+                        description="Get help with student enrollment. 📝",
+                    ),
+                    SectionRow(
+                        id="tuition_fees",
+                        title="💰 Tuition Fees",
+                        description="Learn about tuition fees and payment options. 🏦",
+                    ),
+                    SectionRow(
+                        id="school_schedule",
+                        title="🗓️ School Schedule",
+                        description="View the school calendar and timetable. 📆",
+                    ),
+                    SectionRow(
+                        id="other_options",
+                        title="🔍 Other Options",
+                        description="Explore additional services. 🛠️",
+                    ),
+                ],
+            ),
+        ],
+    )
+
+
+def build_edit_combination():
+    return interactive_list_payload(
+        to=PHONE,
+        body=(
+            "Please select the combination option you'd like to edit. 📝\n\n"
+            "Choose an option below to proceed. If you're satisfied with the current combination, you can confirm it as well. ⚙️\n\n"
+            "Choose an option below to continue:"
+        ),
+        button="Choose Option",
+        sections=[
+            ListSection(
+                title="Combination",
+                rows=[
+                    SectionRow(id="edit_option_A", title="✏️ Edit Option A"),
+                    SectionRow(id="edit_option_B", title="✏️ Edit Option B"),
+                    SectionRow(id="edit_option_C", title="✏️ Edit Option C"),
+                    SectionRow(id="confirm_combination", title="✅ Confirm"),
+                ],
+            ),
+        ],
+    )
+
+
+def build_fullname():
+    return {
+        "messaging_product": "whatsapp",
+        "recipient_type": "individual",
+        "to": PHONE,
+        "type": "text",
+        "text": {
+            "preview_url": True,
+            "body": "😊 Great choice! Let's get to know you better.\n\nPlease reply with your **Full Name** (e.g., *Mufaro Conel Nyakudya*). 🌟\n\nThis will help us personalize your enrollment process. 📝",
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--number", type=int, default=50000)
+    args = parser.parse_args()
+
+    cases = {
+        "welcome (dynamic)": (
+            build_welcome,
+            lambda: WELCOME_MESSAGE_TEMPLATE.render(PHONE, username=USERNAME),
+        ),
+        "edit combination": (
+            build_edit_combination,
+            lambda: EDIT_COMBINATION_MESSAGE_TEMPLATE.render(PHONE),
+        ),
+        "text prompt": (
+            build_fullname,
+            lambda: GET_STUDENT_FULLNAME_TEMPLATE.render(PHONE),
+        ),
+    }
+
+    print(f"{'case':<20} {'build+dumps us':>15} {'template us':>12} {'speedup':>8}")
+    for name, (build, render) in cases.items():
+        rebuilt = timeit.timeit(lambda: json.dumps(build()), number=args.number)
+        rendered = timeit.timeit(render, number=args.number)
+        print(
+            f"{name:<20} {rebuilt / args.number * 1e6:>15.2f} "
+            f"{rendered / args.number * 1e6:>12.2f} {rebuilt / rendered:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
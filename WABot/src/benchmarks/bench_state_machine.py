@@ -0,0 +1,124 @@
+"""
+Micro-benchmark of conversation dispatch cost per message.
+
+Compares the StateMachine registry lookup against the linear if/elif chain it
+replaced in receive_message, using the same states and list reply ids. Handlers
+are no-ops so only the dispatch itself is measured.
+
+Usage: python benchmarks/bench_state_machine.py [--number 200000]
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from wa_cloud_py.messages.types import TextMessage, InteractiveListMessage, User
+
+from state_machine import StateMachine, ANY_STATE, message_type_of
+
+TEXT_STATES = [
+    "none",
+    "collecting_name",
+    "collecting_dob",
+    "collecting_gender",
+    "collecting_address",
+    "collecting_academics",
+    "collecting_combination",
+    "collecting_combination_2",
+    "collecting_combination_3",
+    "editing_combination_1",
+    "editing_combination_2",
+    "editing_combination_3",
+]
+
+REPLY_IDS = [
+    "class_enrollment",
+    "form_1",
+    "lower_six",
+    "review_images",
+    "reupload_images",
+    "continue_application",
+    "confirm_combination",
+    "edit_combination",
+    "edit_option_A",
+    "edit_option_B",
+    "edit_option_C",
+    "confirm_accuracy",
+    "tuition_fees",
+    "school_schedule",
+    "other_options",
+]
+
+
+def noop(ctx=None):
+    return {}
+
+
+def build_machine():
+    machine = StateMachine()
+    for state in TEXT_STATES:
+        machine.on(state, "text")(noop)
+    for reply_id in REPLY_IDS:
+        machine.on(ANY_STATE, "list_reply", reply_id)(noop)
+    return machine
+
+
+def linear_dispatch(message, state):
+    """
+    Mirrors the shape of the old chain: an isinstance check followed by a
+    sequence of string comparisons until one matches.
+    """
+    if isinstance(message, TextMessage):
+        for candidate in TEXT_STATES:
+            if state == candidate:
+                return noop
+    if isinstance(message, InteractiveListMessage):
+        for candidate in REPLY_IDS:
+            if message.reply_id == candidate:
+                return noop
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--number", type=int, default=200000)
+    args = parser.parse_args()
+
+    user = User({"wa_id": "263770000000", "profile": {"name": "Bench"}})
+    machine = build_machine()
+    cases = {
+        "text, first state": (TextMessage({"text": {"body": "hi"}}, user), "none"),
+        "text, last state": (
+            TextMessage({"text": {"body": "hi"}}, user),
+            "editing_combination_3",
+        ),
+        "list, last reply id": (
+            InteractiveListMessage(
+                {"interactive": {"list_reply": {"id": "other_options"}}}, user
+            ),
+            "none",
+        ),
+    }
+
+    print(f"{'case':<22} {'linear ns':>10} {'registry ns':>12}")
+    for name, (message, state) in cases.items():
+        linear = timeit.timeit(
+            lambda: linear_dispatch(message, state), number=args.number
+        )
+        registry = timeit.timeit(
+            lambda: machine.resolve(
+                state, message_type_of(message), getattr(message, "reply_id", None)
+            ),
+            number=args.number,
+        )
+        print(
+            f"{name:<22} {linear / args.number * 1e9:>10.0f} "
+            f"{registry / args.number * 1e9:>12.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
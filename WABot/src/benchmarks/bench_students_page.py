@@ -0,0 +1,146 @@
+"""
+Benchmark of GET /api/students paging as the number of students grows.
+
+Times get_all_students_with_details (the whole table in one response) against
+get_students_page reading its first page and a page near the end, by id and by
+name, and count_students with and without a filter. Runs against a scratch
+SQLite database created from the models, so the indexes are those of models.py.
+
+Note that importing db_operations runs initialize_db() on the configured
+database, as the app does.
+
+Usage: python benchmarks/bench_students_page.py [--sizes 1000 10000 50000] [--limit 50]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from dashboard import reconcile_dashboard_counters
+from db_operations import (
+    count_students,
+    encode_student_cursor,
+    get_all_students_with_details,
+    get_students_page,
+)
+from models import (
+    Base,
+    Student,
+    StudentAcademicHistory,
+    SubjectCombination,
+    STUDENT_SORT_NAME,
+)
+
+STATES = ["collecting_name", "collecting_dob", "upload_photo", "none"]
+
+
+def seed(db, size):
+    rng = random.Random(size)
+    numbers = [f"26377{i:07d}" for i in range(size)]
+    db.execute(
+        insert(Student),
+        [
+            {
+                "whatsapp_number": n,
+                "name": f"S{rng.randrange(size)}",
+                "state": rng.choice(STATES),
+                "gender": rng.choice(["Male", "Female"]),
+            }
+            for n in numbers
+        ],
+    )
+    db.execute(
+        insert(StudentAcademicHistory),
+        [
+            {"whatsapp_number": n, "path1": f"/media/{n}.jpg", "subject1": "Maths"}
+            for i, n in enumerate(numbers)
+            if i % 4
+        ],
+    )
+    db.execute(
+        insert(SubjectCombination),
+        [
+            {"whatsapp_number": n, "subject_combination_state": "Pending"}
+            for n in numbers[::2]
+        ],
+    )
+    db.commit()
+    reconcile_dashboard_counters(db)
+
+
+def deep_cursor(db, sort, size):
+    # The cursor a client would hold after paging through 90% of the table
+    key = Student.id if sort == "id" else STUDENT_SORT_NAME
+    value, student_id = db.execute(
+        select(key, Student.id).order_by(key, Student.id).offset(size * 9 // 10)
+    ).first()
+    return encode_student_cursor(sort, value, student_id)
+
+
+def best_of(fn, session_factory, repeat=5):
+    best = None
+    for _ in range(repeat):
+        db = session_factory()
+        try:
+            start = time.perf_counter()
+            fn(db)
+            elapsed = time.perf_counter() - start
+        finally:
+            db.close()
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args()
+    limit = args.limit
+
+    print(
+        f"{'students':>9} {'all ms':>9} {'first ms':>9} {'deep id ms':>11} "
+        f"{'deep name ms':>13} {'count ms':>9} {'count filtered ms':>18}"
+    )
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+            Base.metadata.create_all(engine)
+            session_factory = sessionmaker(bind=engine)
+            db = session_factory()
+            seed(db, size)
+            by_id = deep_cursor(db, "id", size)
+            by_name = deep_cursor(db, "name", size)
+            assert db.scalar(select(func.count(Student.id))) == size
+            db.close()
+
+            every = best_of(get_all_students_with_details, session_factory, 1)
+            first = best_of(lambda db: get_students_page(db, limit), session_factory)
+            deep_id = best_of(
+                lambda db: get_students_page(db, limit, cursor=by_id), session_factory
+            )
+            deep_name = best_of(
+                lambda db: get_students_page(db, limit, cursor=by_name, sort="name"),
+                session_factory,
+            )
+            total = best_of(count_students, session_factory)
+            filtered = best_of(
+                lambda db: count_students(db, state="none"), session_factory
+            )
+            print(
+                f"{size:>9} {every:>9.1f} {first:>9.2f} {deep_id:>11.2f} "
+                f"{deep_name:>13.2f} {total:>9.2f} {filtered:>18.2f}"
+            )
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
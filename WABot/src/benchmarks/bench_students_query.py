@@ -0,0 +1,131 @@
+"""
+Benchmark of get_all_students_with_details as the number of students grows.
+
+Counts the SQL statements each implementation issues and times it: the old
+loop (list_all_students, then one academic history and one subject combination
+lookup per student, printing as it goes) against the single outer-joined query.
+Runs against a scratch SQLite database; the old loop's prints are discarded.
+
+Note that importing db_operations runs initialize_db() on the configured
+database, as the app does.
+
+Usage: python benchmarks/bench_students_query.py [--sizes 10 100 1000 5000]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import sessionmaker
+
+from db_operations import (
+    get_academic_history_by_whatsapp_number,
+    get_all_students_with_details,
+    get_subject_combination_by_whatsapp_number,
+    list_all_students,
+)
+from models import Base, Student, StudentAcademicHistory, SubjectCombination
+
+
+def old_get_all_students_with_details(db):
+    students = list_all_students(db)
+    result = []
+    for student in students:
+        academic_history = get_academic_history_by_whatsapp_number(
+            db, student.whatsapp_number
+        )
+        subject_combination = get_subject_combination_by_whatsapp_number(
+            db, student.whatsapp_number
+        )
+        result.append(
+            {
+                "student": student,
+                "academic_history": academic_history,
+                "subject_combination": subject_combination,
+            }
+        )
+    return result
+
+
+def seed(db, size):
+    numbers = [f"26377{i:07d}" for i in range(size)]
+    db.execute(
+        insert(Student),
+        [{"whatsapp_number": n, "name": f"S{i}"} for i, n in enumerate(numbers)],
+    )
+    # Most students have an academic history, fewer have chosen a combination
+    db.execute(
+        insert(StudentAcademicHistory),
+        [
+            {"whatsapp_number": n, "subject1": "Maths", "symbol1": "A"}
+            for i, n in enumerate(numbers)
+            if i % 4
+        ],
+    )
+    db.execute(
+        insert(SubjectCombination),
+        [{"whatsapp_number": n, "subject1": "Physics"} for n in numbers[::2]],
+    )
+    db.commit()
+
+
+def measure(fn, engine, session_factory):
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", count)
+    db = session_factory()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            rows = fn(db)
+            elapsed = time.perf_counter() - start
+    finally:
+        db.close()
+        event.remove(engine, "before_cursor_execute", count)
+    return len(rows), len(statements), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 5000])
+    args = parser.parse_args()
+
+    print(
+        f"{'students':>9} {'old queries':>12} {'old ms':>9} "
+        f"{'new queries':>12} {'new ms':>9}"
+    )
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+            Base.metadata.create_all(engine)
+            session_factory = sessionmaker(bind=engine)
+            db = session_factory()
+            seed(db, size)
+            db.close()
+
+            old_rows, old_queries, old = measure(
+                old_get_all_students_with_details, engine, session_factory
+            )
+            new_rows, new_queries, new = measure(
+                get_all_students_with_details, engine, session_factory
+            )
+            assert old_rows == new_rows == size
+            print(
+                f"{size:>9} {old_queries:>12} {old * 1000:>9.1f} "
+                f"{new_queries:>12} {new * 1000:>9.1f}"
+            )
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
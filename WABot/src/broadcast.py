@@ -0,0 +1,369 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from string import Formatter
+
+from sqlalchemy import func, insert, literal, select, update
+
+from messages.templates import MessageTemplate, PLACEHOLDER, RECIPIENT, field
+from models import (
+    Broadcast,
+    BroadcastRecipient,
+    OutboundMessageStatus,
+    Student,
+    SubjectCombination,
+)
+from whatsapp_client import template_payload, text_payload
+
+# Columns a broadcast audience can be selected on. A student whose combination
+# nobody has reviewed, or who has not chosen one yet, counts as "Pending".
+TARGETS = {
+    "state": Student.state,
+    "subject_combination_state": func.coalesce(
+        SubjectCombination.subject_combination_state, "Pending"
+    ),
+}
+
+# Per-recipient fields a broadcast message may use, e.g. "Hello {name}"
+MESSAGE_FIELDS = ("name", "whatsapp_number")
+
+# Graph API error code for a free-form message to someone who has not written
+# in the last 24 hours; only approved templates reach them
+OUTSIDE_WINDOW_ERROR_CODE = 131047
+OUTSIDE_WINDOW_ERROR = (
+    "Outside the 24-hour customer service window; send this broadcast with an "
+    "approved template"
+)
+
+
+def compile_message(message, template_name=None, template_language=None):
+    """
+    Compiles a broadcast message into a MessageTemplate, so each recipient only
+    costs a substitution of their number and name.
+
+    Free-form text only reaches students who wrote in the last 24 hours. With a
+    `template_name`, the broadcast is sent as that approved WhatsApp template
+    instead, with the message as its single body variable ({{1}}), which
+    reaches everyone.
+
+    Raises:
+    ValueError: If the message uses a field other than MESSAGE_FIELDS, or
+    cannot be a template variable.
+    """
+    if PLACEHOLDER.search(message):
+        raise ValueError("Broadcast messages cannot contain @@...@@")
+    for _, name, spec, conversion in Formatter().parse(message):
+        if name is None:
+            continue
+        if name not in MESSAGE_FIELDS or spec or conversion:
+            raise ValueError(f"Unsupported field {{{name}}} in broadcast message")
+    body = message.format(**{name: field(name) for name in MESSAGE_FIELDS})
+    if not template_name:
+        return MessageTemplate(text_payload(RECIPIENT, body))
+    if "\n" in message or "\t" in message or "     " in message:
+        raise ValueError(
+            "Template variables cannot contain new lines, tabs or more than four "
+            "consecutive spaces"
+        )
+    return MessageTemplate(
+        template_payload(RECIPIENT, template_name, template_language or "en", [body])
+    )
+
+
+def failure_reason(body):
+    """
+    The error recorded for a recipient the broadcast could not be sent to.
+    """
+    error = body.get("error")
+    try:
+        code = json.loads(error)["error"]["code"]
+    except (TypeError, ValueError, KeyError):
+        code = None
+    if code == OUTSIDE_WINDOW_ERROR_CODE:
+        return OUTSIDE_WINDOW_ERROR
+    return str(error)
+
+
+def create_broadcast(
+    db,
+    message,
+    target_field,
+    target_value,
+    created_by=None,
+    template_name=None,
+    template_language=None,
+):
+    """
+    Creates a broadcast and snapshots its audience into broadcast_recipients with
+    a single INSERT ... SELECT, so no student rows pass through Python.
+
+    Raises:
+    ValueError: If the target or the message is not valid.
+    """
+    if target_field not in TARGETS:
+        raise ValueError(f"Unknown broadcast target {target_field}")
+    compile_message(message, template_name, template_language)
+
+    broadcast = Broadcast(
+        message=message,
+        target_field=target_field,
+        target_value=target_value,
+        template_name=template_name or None,
+        template_language=(template_language or "en") if template_name else None,
+        status="pending",
+        created_by=created_by,
+    )
+    db.add(broadcast)
+    db.flush()
+
+    audience = select(
+        literal(broadcast.id),
+        Student.whatsapp_number,
+        Student.name,
+        literal("pending"),
+    )
+    if target_field == "subject_combination_state":
+        audience = audience.outerjoin(
+            SubjectCombination,
+            SubjectCombination.whatsapp_number == Student.whatsapp_number,
+        )
+    audience = audience.where(TARGETS[target_field] == target_value)
+    db.execute(
+        insert(BroadcastRecipient).from_select(
+            ["broadcast_id", "whatsapp_number", "name", "status"], audience
+        )
+    )
+    broadcast.total = db.scalar(
+        select(func.count())
+        .select_from(BroadcastRecipient)
+        .where(BroadcastRecipient.broadcast_id == broadcast.id)
+    )
+    db.flush()
+    return broadcast
+
+
+def broadcast_progress(broadcast):
+    return {
+        "id": broadcast.id,
+        "target_field": broadcast.target_field,
+        "target_value": broadcast.target_value,
+        "template_name": broadcast.template_name,
+        "status": broadcast.status,
+        "total": broadcast.total,
+        "sent": broadcast.sent,
+        "failed": broadcast.failed,
+        "pending": broadcast.total - broadcast.sent - broadcast.failed,
+        "created_by": broadcast.created_by,
+        "created_at": broadcast.created_at,
+        "started_at": broadcast.started_at,
+        "finished_at": broadcast.finished_at,
+    }
+
+
+def get_broadcast_recipients(db, broadcast_id, status=None, after_id=0, limit=100):
+    """
+    Returns one page of a broadcast's recipients, ordered by id, with the latest
+    delivery status reported by the status webhooks for each sent message.
+    """
+    query = (
+        select(
+            BroadcastRecipient.id,
+            BroadcastRecipient.whatsapp_number,
+            BroadcastRecipient.name,
+            BroadcastRecipient.status,
+            BroadcastRecipient.message_id,
+            BroadcastRecipient.error,
+            BroadcastRecipient.updated_at,
+            OutboundMessageStatus.status.label("delivery_status"),
+        )
+        .outerjoin(
+            OutboundMessageStatus,
+            OutboundMessageStatus.message_id == BroadcastRecipient.message_id,
+        )
+        .where(
+            BroadcastRecipient.broadcast_id == broadcast_id,
+            BroadcastRecipient.id > after_id,
+        )
+        .order_by(BroadcastRecipient.id)
+        .limit(limit)
+    )
+    if status:
+        query = query.where(BroadcastRecipient.status == status)
+    return [dict(row._mapping) for row in db.execute(query)]
+
+
+class BroadcastRunner:
+    """
+    Sends broadcasts on background threads. Pending recipients are read in
+    batches ordered by id. Each batch is sent concurrently through
+    OutboundQueue.deliver(), which shares the per-number rate limit and retry
+    policy with conversation replies. The batch results are then written back
+    in one commit.
+
+    Progress lives in the database. A run that is stopped or interrupted leaves
+    the broadcast "running", and resume_interrupted() picks it up again at its
+    first pending recipient. Only the batch that was in flight at a crash can be
+    sent twice.
+    """
+
+    def __init__(self, outbound, session_factory, workers=16, batch_size=200):
+        self.outbound = outbound
+        self.session_factory = session_factory
+        self.workers = workers
+        self.batch_size = batch_size
+        self._threads = {}
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+
+    def start(self, broadcast_id):
+        """
+        Starts (or resumes) sending a broadcast in the background.
+
+        Returns:
+        bool: False if the broadcast is already being sent.
+        """
+        with self._lock:
+            thread = self._threads.get(broadcast_id)
+            if thread is not None and thread.is_alive():
+                return False
+            thread = threading.Thread(
+                target=self.run,
+                args=(broadcast_id,),
+                name=f"broadcast-{broadcast_id}",
+                daemon=True,
+            )
+            self._threads[broadcast_id] = thread
+            thread.start()
+            return True
+
+    def is_running(self, broadcast_id):
+        with self._lock:
+            thread = self._threads.get(broadcast_id)
+            return thread is not None and thread.is_alive()
+
+    def resume_interrupted(self):
+        db = self.session_factory()
+        try:
+            broadcast_ids = db.scalars(
+                select(Broadcast.id).where(Broadcast.status.in_(("pending", "running")))
+            ).all()
+        finally:
+            db.close()
+        for broadcast_id in broadcast_ids:
+            print(f"Resuming broadcast {broadcast_id}")
+            self.start(broadcast_id)
+
+    def stop(self):
+        """
+        Lets each running broadcast finish its current batch, then stops.
+        """
+        self._stopping.set()
+        with self._lock:
+            threads = list(self._threads.values())
+        for thread in threads:
+            thread.join()
+        self._threads = {}
+        self._stopping.clear()
+
+    def send(self, template, recipient):
+        """
+        Sends the broadcast to one recipient and returns the row update for it.
+        """
+        result = {"id": recipient.id, "updated_at": datetime.utcnow()}
+        try:
+            payload = template.render(
+                recipient.whatsapp_number,
+                name=recipient.name or "",
+                whatsapp_number=recipient.whatsapp_number,
+            )
+            ok, body = self.outbound.deliver(payload, recipient.whatsapp_number)
+        except Exception as e:
+            ok, body = False, {"error": str(e)}
+        if ok:
+            messages = body.get("messages") or [{}]
+            result.update(status="sent", message_id=messages[0].get("id"), error=None)
+        else:
+            result.update(status="failed", error=failure_reason(body))
+        return result
+
+    def run(self, broadcast_id):
+        db = self.session_factory()
+        try:
+            broadcast = db.get(Broadcast, broadcast_id)
+            if broadcast is None or broadcast.status in ("completed", "cancelled"):
+                return
+            template = compile_message(
+                broadcast.message, broadcast.template_name, broadcast.template_language
+            )
+            db.execute(
+                update(Broadcast)
+                .where(Broadcast.id == broadcast_id)
+                .values(
+                    status="running",
+                    started_at=func.coalesce(Broadcast.started_at, datetime.utcnow()),
+                )
+            )
+            db.commit()
+
+            last_id = 0
+            with ThreadPoolExecutor(
+                max_workers=self.workers,
+                thread_name_prefix=f"broadcast-{broadcast_id}-send",
+            ) as executor:
+                while True:
+                    if self._stopping.is_set():
+                        print(f"Broadcast {broadcast_id} paused at recipient {last_id}")
+                        return
+                    batch = db.execute(
+                        select(
+                            BroadcastRecipient.id,
+                            BroadcastRecipient.whatsapp_number,
+                            BroadcastRecipient.name,
+                        )
+                        .where(
+                            BroadcastRecipient.broadcast_id == broadcast_id,
+                            BroadcastRecipient.status == "pending",
+                            BroadcastRecipient.id > last_id,
+                        )
+                        .order_by(BroadcastRecipient.id)
+                        .limit(self.batch_size)
+                    ).all()
+                    if not batch:
+                        break
+                    last_id = batch[-1].id
+
+                    results = list(
+                        executor.map(lambda row: self.send(template, row), batch)
+                    )
+                    sent = sum(1 for result in results if result["status"] == "sent")
+                    db.execute(update(BroadcastRecipient), results)
+                    db.execute(
+                        update(Broadcast)
+                        .where(Broadcast.id == broadcast_id)
+                        .values(
+                            sent=Broadcast.sent + sent,
+                            failed=Broadcast.failed + len(results) - sent,
+                        )
+                    )
+                    db.commit()
+
+                    status = db.scalar(
+                        select(Broadcast.status).where(Broadcast.id == broadcast_id)
+                    )
+                    if status == "cancelled":
+                        print(f"Broadcast {broadcast_id} cancelled")
+                        return
+
+            db.execute(
+                update(Broadcast)
+                .where(Broadcast.id == broadcast_id, Broadcast.status == "running")
+                .values(status="completed", finished_at=datetime.utcnow())
+            )
+            db.commit()
+            print(f"Broadcast {broadcast_id} completed")
+        except Exception as e:
+            db.rollback()
+            print(f"Broadcast {broadcast_id} stopped with an error: {e}")
+        finally:
+            db.close()
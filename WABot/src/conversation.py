@@ -0,0 +1,332 @@
+import sys
+
+from whatsapp_config import outbound_queue
+from db_operations import (
+    get_student_by_whatsapp_number,
+    create_student,
+    update_student,
+    create_academic_history,
+    delete_academic_history,
+    create_or_update_subject_combination,
+    update_academic_history,
+    get_academic_history_by_whatsapp_number,
+)
+from messages.option_messages import (
+    send_welcome_message,
+    enrollment_welcome_message,
+    get_student_fullname,
+    get_student_birth,
+    get_student_address,
+    get_olevel_results,
+    get_student_gender,
+    reupload_olevel_results,
+    request_preferred_combination,
+    request_second_combination,
+    send_invalid_combination_message,
+    request_third_combination,
+    confirm_combination,
+    edit_combination_message,
+    information_confirmation_message,
+    lower_six_application_success_message,
+    get_olevel_results_by_subject,
+)
+from validation.personal_details_validation import convert_to_datetime
+from other_operations import handle_image_upload
+from subject_combination_validator import (
+    validate_combination,
+    separate_combination,
+    parse_academic_results,
+)
+from state_machine import StateMachine, ANY_STATE, message_type_of
+from outbox import OutboxWhatsApp
+
+TEXT = "text"
+LIST_REPLY = "list_reply"
+
+# SubjectCombination columns holding each of the three combination choices
+COMBINATION_FIELDS = {
+    1: ("subject1", "subject2", "subject3"),
+    2: ("subject1_option2", "subject2_option2", "subject3_option2"),
+    3: ("subject1_option3", "subject2_option3", "subject3_option3"),
+}
+
+machine = StateMachine()
+
+
+class ConversationContext:
+    """
+    Everything a handler needs to process one inbound message.
+    """
+
+    def __init__(self, db, message, state):
+        self.db = db
+        self.message = message
+        self.state = state
+        self.phone = message.user.phone_number
+        self.username = message.user.name
+        # Replies are written to the outbox and sent once the unit of work commits
+        self.whatsapp = OutboxWhatsApp(db, outbound_queue)
+
+
+def handle_message(db, message):
+    """
+    Runs the conversation state machine for a single inbound message using the
+    caller's database session.
+
+    Handlers return the student fields to update, or None to reject the message
+    and stay in the current state. When a handler accepts the message, the
+    declared next state of its transition is saved along with those fields.
+    """
+    phone = message.user.phone_number
+    student_state = None
+    student = get_student_by_whatsapp_number(db=db, whatsapp_number=phone)
+    if student:
+        student_state = student.state
+        print(f"student with state {student_state} found")
+    else:
+        student = create_student(db, phone=phone, state="none", email=None, name=None)
+        print("student not found")
+
+    transition = machine.resolve(
+        student_state, message_type_of(message), getattr(message, "reply_id", None)
+    )
+    if transition is None:
+        return
+
+    fields = transition.handler(ConversationContext(db, message, student_state))
+    if fields is None:
+        return
+    if transition.next_state:
+        fields["state"] = transition.next_state
+    if fields:
+        update_student(db=db, whatsapp_number=phone, student=student, **fields)
+
+
+# Text replies, keyed on the student's state
+
+
+@machine.on("none", TEXT)
+def greet(ctx):
+    send_welcome_message(ctx.whatsapp, ctx.phone, ctx.username)
+    return {}
+
+
+@machine.on("collecting_name", TEXT, next_state="collecting_dob")
+def collect_name(ctx):
+    get_student_birth(ctx.whatsapp, ctx.phone)
+    return {"name": ctx.message.body}
+
+
+@machine.on("collecting_dob", TEXT, next_state="collecting_gender")
+def collect_dob(ctx):
+    dob = convert_to_datetime(ctx.message.body)
+    get_student_gender(ctx.whatsapp, ctx.phone)
+    return {"dob": dob}
+
+
+@machine.on("collecting_gender", TEXT, next_state="collecting_address")
+def collect_gender(ctx):
+    get_student_address(ctx.whatsapp, ctx.phone)
+    return {"gender": ctx.message.body}
+
+
+@machine.on("collecting_address", TEXT, next_state="collecting_academics")
+def collect_address(ctx):
+    get_olevel_results_by_subject(ctx.whatsapp, ctx.phone)
+    return {"address": ctx.message.body}
+
+
+@machine.on("collecting_academics", TEXT, next_state="upload_photo")
+def collect_academics(ctx):
+    print("passing academic history")
+    results = parse_academic_results(ctx.message.body)
+    print(results)
+    academic_history = get_academic_history_by_whatsapp_number(
+        db=ctx.db, whatsapp_number=ctx.phone
+    )
+    if not academic_history:
+        academic_history = create_academic_history(ctx.db, whatsapp_number=ctx.phone)
+    update_academic_history(
+        db=ctx.db,
+        whatsapp_number=ctx.phone,
+        results=results,
+        history=academic_history,
+    )
+    get_olevel_results(ctx.whatsapp, ctx.phone)
+    return {}
+
+
+def register_combination_handler(state, option, prompt, next_state):
+    """
+    Registers the handler that validates a "Subject1, Subject2, Subject3" reply
+    and saves it as combination `option` (1, 2 or 3).
+    """
+
+    def collect_combination(ctx):
+        combination = ctx.message.body
+        print("validating combination")
+        if not validate_combination(combination):
+            # Stay in this state, so the student can send it again
+            send_invalid_combination_message(ctx.whatsapp, ctx.phone)
+            return None
+        print("separating subjects")
+        subjects = separate_combination(combination)
+        prompt(ctx.whatsapp, ctx.phone)
+        create_or_update_subject_combination(
+            db=ctx.db,
+            whatsapp_number=ctx.phone,
+            **dict(zip(COMBINATION_FIELDS[option], subjects)),
+        )
+        return {}
+
+    collect_combination.__name__ = f"collect_combination_{state}"
+    machine.on(state, TEXT, next_state=next_state)(collect_combination)
+
+
+register_combination_handler(
+    "collecting_combination", 1, request_second_combination, "collecting_combination_2"
+)
+register_combination_handler(
+    "collecting_combination_2", 2, request_third_combination, "collecting_combination_3"
+)
+register_combination_handler(
+    "collecting_combination_3", 3, confirm_combination, "verify_combination"
+)
+for option in (1, 2, 3):
+    register_combination_handler(
+        f"editing_combination_{option}",
+        option,
+        confirm_combination,
+        "verify_combination",
+    )
+
+
+# Interactive list replies, keyed on the selected row id
+
+
+def ignore_choice(ctx):
+    return {}
+
+
+for reply_id in (
+    "form_1",
+    "review_images",
+    "tuition_fees",
+    "school_schedule",
+    "other_options",
+):
+    machine.on(ANY_STATE, LIST_REPLY, reply_id)(ignore_choice)
+
+
+@machine.on(ANY_STATE, LIST_REPLY, "class_enrollment")
+def choose_enrollment(ctx):
+    enrollment_welcome_message(ctx.whatsapp, ctx.phone)
+    return {}
+
+
+# A student created by this very message has no state yet (None)
+@machine.on(None, LIST_REPLY, "lower_six", next_state="collecting_name")
+@machine.on("none", LIST_REPLY, "lower_six", next_state="collecting_name")
+def choose_lower_six(ctx):
+    get_student_fullname(ctx.whatsapp, ctx.phone)
+    return {}
+
+
+@machine.on(ANY_STATE, LIST_REPLY, "reupload_images")
+def choose_reupload_images(ctx):
+    delete_academic_history(db=ctx.db, whatsapp_number=ctx.phone)
+    create_academic_history(ctx.db, whatsapp_number=ctx.phone)
+    reupload_olevel_results(ctx.whatsapp, ctx.phone)
+    return {}
+
+
+@machine.on(
+    ANY_STATE, LIST_REPLY, "continue_application", next_state="collecting_combination"
+)
+def choose_continue_application(ctx):
+    request_preferred_combination(ctx.whatsapp, ctx.phone)
+    return {}
+
+
+@machine.on(ANY_STATE, LIST_REPLY, "confirm_combination")
+def choose_confirm_combination(ctx):
+    information_confirmation_message(ctx.whatsapp, ctx.phone)
+    return {}
+
+
+@machine.on(ANY_STATE, LIST_REPLY, "edit_combination")
+def choose_edit_combination(ctx):
+    edit_combination_message(ctx.whatsapp, ctx.phone)
+    return {}
+
+
+@machine.on(ANY_STATE, LIST_REPLY, "edit_option_A", next_state="editing_combination_1")
+def choose_edit_option_a(ctx):
+    request_preferred_combination(ctx.whatsapp, ctx.phone)
+    return {}
+
+
+@machine.on(ANY_STATE, LIST_REPLY, "edit_option_B", next_state="editing_combination_2")
+def choose_edit_option_b(ctx):
+    request_second_combination(ctx.whatsapp, ctx.phone)
+    return {}
+
+
+@machine.on(ANY_STATE, LIST_REPLY, "edit_option_C", next_state="editing_combination_3")
+def choose_edit_option_c(ctx):
+    request_third_combination(ctx.whatsapp, ctx.phone)
+    return {}
+
+
+@machine.on(ANY_STATE, LIST_REPLY, "confirm_accuracy", next_state="none")
+def choose_confirm_accuracy(ctx):
+    lower_six_application_success_message(ctx.whatsapp, ctx.phone, ctx.username)
+    return {}
+
+
+# Media and other message types
+
+
+@machine.on(ANY_STATE, "image")
+def receive_image(ctx):
+    print("handling image message")
+    handle_image_upload(ctx.db, ctx.whatsapp, ctx.phone, ctx.message, ctx.state)
+    return {}
+
+
+@machine.on(ANY_STATE, "document")
+def receive_document(ctx):
+    print(f"Received document: {ctx.message.filename}")
+    return {}
+
+
+@machine.on(ANY_STATE, "audio")
+def receive_audio(ctx):
+    print(f"Received audio. Voice note: {ctx.message.is_voice}")
+    return {}
+
+
+@machine.on(ANY_STATE, "video")
+def receive_video(ctx):
+    print("Received video")
+    return {}
+
+
+@machine.on(ANY_STATE, "location")
+def receive_location(ctx):
+    print(f"Received location: {ctx.message.latitude}, {ctx.message.longitude}")
+    return {}
+
+
+if __name__ == "__main__":
+    # python conversation.py        -> transition table
+    # python conversation.py --dot  -> Graphviz DOT (pipe into `dot -Tsvg`)
+    if "--dot" in sys.argv:
+        print(machine.to_dot())
+    else:
+        for row in machine.transitions():
+            print(
+                f"{str(row['state']):<26} {row['message_type']:<11} "
+                f"{row['reply_id'] or '-':<22} -> {row['next_state'] or '-':<26} "
+                f"{row['handler']}"
+            )
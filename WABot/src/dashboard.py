@@ -0,0 +1,381 @@
+import threading
+from concurrent.futures import Future
+
+from sqlalchemy import delete, desc, event, func, insert, select, text
+
+from database import SessionLocal, upsert
+from models import (
+    AcademicResult,
+    DashboardCounter,
+    Student,
+    StudentAcademicHistory,
+    SubjectCombination,
+)
+
+# Grades always present in the academic performance histogram
+PERFORMANCE_GRADES = ("A", "B", "C", "D", "E", "F")
+
+# Counter names; each holds one value per key (a state, a grade letter, or "")
+STUDENTS_BY_STATE = "students_by_state"
+COMBINATIONS_BY_STATE = "subject_combinations_stats"
+RESULTS_BY_GRADE = "academic_performance"
+ACADEMIC_RECORDS = "academic_records"
+# Incremented by every unit of work that changes what the dashboard shows;
+# never rebuilt
+DASHBOARD_VERSION = "version"
+# Session.info flag set by bump_dashboard_version() until the commit
+DASHBOARD_CHANGED = "dashboard_changed"
+
+
+def student_state_key(state):
+    # Students without a state are counted in the state they start in
+    return state or "collecting_name"
+
+
+def combination_state_key(state):
+    # A combination nobody has reviewed yet is pending
+    return state or "Pending"
+
+
+def grade_key(grade):
+    # Grade histogram by letter, so "B+" counts as a B
+    return (grade or "")[:1].upper()
+
+
+def increment(db, name, key, delta):
+    statement = upsert(DashboardCounter.__table__).values(
+        name=name, key=key, value=delta
+    )
+    db.execute(
+        statement.on_conflict_do_update(
+            index_elements=["name", "key"],
+            set_={
+                "value": DashboardCounter.__table__.c.value + statement.excluded.value
+            },
+        )
+    )
+
+
+def bump_counter(db, name, key, delta=1):
+    """
+    Adds `delta` to a dashboard counter in the caller's transaction, and moves
+    the dashboard version on. The increment is done by the database, so
+    concurrent bumps are not lost.
+    """
+    if not delta:
+        return
+    increment(db, name, key, delta)
+    bump_dashboard_version(db)
+
+
+def bump_dashboard_version(db):
+    """
+    Marks the dashboard as changed, for writes that change what it shows
+    without moving a counter (e.g. a student's name). The version row is
+    incremented once, when the unit of work commits, however many changes it
+    made, so the hot row is written (and locked) once per transaction.
+    """
+    db.info[DASHBOARD_CHANGED] = True
+
+
+def commit_dashboard_version(session):
+    if session.info.pop(DASHBOARD_CHANGED, False):
+        increment(session, DASHBOARD_VERSION, "", 1)
+
+
+def discard_dashboard_version(session):
+    session.info.pop(DASHBOARD_CHANGED, None)
+
+
+def track_dashboard_version(session_factory):
+    """
+    Makes the sessions of `session_factory` move the dashboard version when a
+    unit of work marked by bump_dashboard_version commits. The hooks are only
+    attached to the app's sessionmaker (and the tests'), so other sessions in
+    the process, such as Alembic's, do not run them.
+    """
+    for name, listener in (
+        ("before_commit", commit_dashboard_version),
+        ("after_rollback", discard_dashboard_version),
+    ):
+        if not event.contains(session_factory, name, listener):
+            event.listen(session_factory, name, listener)
+
+
+track_dashboard_version(SessionLocal)
+
+
+def read_dashboard_version(db):
+    return (
+        db.scalar(
+            select(DashboardCounter.value).where(
+                DashboardCounter.name == DASHBOARD_VERSION, DashboardCounter.key == ""
+            )
+        )
+        or 0
+    )
+
+
+def move_counter(db, name, old_key, new_key):
+    if old_key != new_key:
+        bump_counter(db, name, old_key, -1)
+        bump_counter(db, name, new_key, 1)
+
+
+def count_dashboard_counters(db):
+    """
+    Counts every dashboard counter from the tables it summarises, with one
+    grouped query per counter.
+
+    Returns:
+    Dict[str, Dict[str, int]]: name -> key -> value.
+    """
+    state = func.coalesce(Student.state, "collecting_name")
+    combination_state = func.coalesce(
+        SubjectCombination.subject_combination_state, "Pending"
+    )
+    letter = func.upper(func.substr(AcademicResult.grade, 1, 1))
+    return {
+        STUDENTS_BY_STATE: dict(
+            db.execute(select(state, func.count(Student.id)).group_by(state)).all()
+        ),
+        COMBINATIONS_BY_STATE: dict(
+            db.execute(
+                select(combination_state, func.count(SubjectCombination.id)).group_by(
+                    combination_state
+                )
+            ).all()
+        ),
+        RESULTS_BY_GRADE: dict(
+            db.execute(
+                select(letter, func.count(AcademicResult.id)).group_by(letter)
+            ).all()
+        ),
+        ACADEMIC_RECORDS: {
+            "": db.scalar(select(func.count(StudentAcademicHistory.id)))
+        },
+    }
+
+
+def read_counter_total(db, name):
+    """
+    Returns the sum of a counter's values, e.g. the number of students.
+    """
+    return db.scalar(
+        select(func.coalesce(func.sum(DashboardCounter.value), 0)).where(
+            DashboardCounter.name == name
+        )
+    )
+
+
+def read_dashboard_counters(db):
+    """
+    Returns: Dict[str, Dict[str, int]]: name -> key -> value, zeros left out.
+    """
+    counters = {
+        STUDENTS_BY_STATE: {},
+        COMBINATIONS_BY_STATE: {},
+        RESULTS_BY_GRADE: {},
+        ACADEMIC_RECORDS: {},
+    }
+    rows = db.execute(
+        select(DashboardCounter.name, DashboardCounter.key, DashboardCounter.value)
+    )
+    for name, key, value in rows:
+        if value:
+            counters.setdefault(name, {})[key] = value
+    return counters
+
+
+def reconcile_dashboard_counters(db):
+    """
+    Rebuilds the counters from scratch and commits. Writers are held off while
+    it runs (SQLite allows one writer; on PostgreSQL the counters table is
+    locked first), so no bump can land between the count and the rewrite.
+
+    Returns:
+    Dict[str, Dict[str, Tuple[int, int]]]: The drift found, as name -> key ->
+    (counter value, actual count). Empty if the counters were right.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("LOCK TABLE dashboard_counters IN SHARE ROW EXCLUSIVE MODE"))
+    current = read_dashboard_counters(db)
+    db.execute(
+        delete(DashboardCounter).where(DashboardCounter.name != DASHBOARD_VERSION)
+    )
+    actual = count_dashboard_counters(db)
+    rows = [
+        {"name": name, "key": key, "value": value}
+        for name, values in actual.items()
+        for key, value in values.items()
+        if value
+    ]
+    if rows:
+        db.execute(insert(DashboardCounter), rows)
+
+    drift = {}
+    for name in actual:
+        for key in set(current.get(name, {})) | set(actual[name]):
+            counted = current.get(name, {}).get(key, 0)
+            value = actual[name].get(key, 0)
+            if counted != value:
+                drift.setdefault(name, {})[key] = (counted, value)
+    if drift:
+        bump_dashboard_version(db)
+    db.commit()
+    return drift
+
+
+class CounterReconciler:
+    """
+    Rebuilds the dashboard counters on a background thread, once on start and
+    then every `interval` seconds, and reports any drift it corrects. Drift
+    means some write path changed a counted table without bumping its counter.
+    """
+
+    def __init__(self, session_factory, interval=6 * 3600):
+        self.session_factory = session_factory
+        self.interval = interval
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def reconcile(self):
+        db = self.session_factory()
+        try:
+            drift = reconcile_dashboard_counters(db)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        for name, keys in drift.items():
+            for key, (counted, actual) in keys.items():
+                print(f"Dashboard counter {name}[{key!r}] was {counted}, is {actual}")
+        return drift
+
+    def start(self):
+        self._stopping.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="counter-reconciler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                self.reconcile()
+            except Exception as e:
+                print(f"Dashboard counter reconciliation failed: {e}")
+            self._stopping.wait(self.interval)
+
+
+def compute_dashboard_stats(db):
+    """
+    Builds the /api/dashboard payload from the dashboard counters and the five
+    newest students, so its cost does not grow with the number of applicants.
+
+    Returns:
+    dict: The fields of DashboardStats.
+    """
+    counters = read_dashboard_counters(db)
+    students_by_state = counters[STUDENTS_BY_STATE]
+    subject_combinations_stats = counters[COMBINATIONS_BY_STATE]
+    academic_performance = dict.fromkeys(PERFORMANCE_GRADES, 0)
+    academic_performance.update(counters[RESULTS_BY_GRADE])
+
+    recent_students = [
+        {
+            "name": name or "Pending",
+            "whatsapp_number": whatsapp_number,
+            "state": state,
+        }
+        for name, whatsapp_number, state in db.execute(
+            select(Student.name, Student.whatsapp_number, Student.state)
+            .order_by(desc(Student.id))
+            .limit(5)
+        )
+    ]
+
+    return {
+        "total_students": sum(students_by_state.values()),
+        "pending_registrations": students_by_state.get("collecting_name", 0),
+        "pending_combinations": subject_combinations_stats.get("Pending", 0),
+        "total_academic_records": counters[ACADEMIC_RECORDS].get("", 0),
+        "students_by_state": students_by_state,
+        "recent_students": recent_students,
+        "subject_combinations_stats": subject_combinations_stats,
+        "academic_performance": academic_performance,
+    }
+
+
+class DashboardCache:
+    """
+    Keeps the last computed dashboard payload with the dashboard version it was
+    computed at. A request that finds the cache older than the current version
+    recomputes it; requests that miss at the same time wait for that one
+    computation instead of running their own.
+    """
+
+    def __init__(self, session_factory):
+        self.session_factory = session_factory
+        self._lock = threading.Lock()
+        self._version = None
+        self._payload = None
+        self._pending = None
+
+    def compute(self):
+        db = self.session_factory()
+        try:
+            # Read the version first: the payload is at least that new
+            version = read_dashboard_version(db)
+            return version, compute_dashboard_stats(db)
+        finally:
+            db.close()
+
+    def get(self, version):
+        """
+        Returns (version, payload) computed at `version` or later.
+        """
+        while True:
+            with self._lock:
+                if self._payload is not None and self._version >= version:
+                    return self._version, self._payload
+                pending = self._pending
+                computing = pending is None
+                if computing:
+                    pending = self._pending = Future()
+
+            if computing:
+                try:
+                    result = self.compute()
+                except Exception as e:
+                    with self._lock:
+                        self._pending = None
+                    pending.set_exception(e)
+                    raise
+                with self._lock:
+                    if self._version is None or result[0] >= self._version:
+                        self._version, self._payload = result
+                    self._pending = None
+                pending.set_result(result)
+                return result
+
+            result = pending.result()
+            # A computation that started before `version` was reached is too
+            # old for this caller; go round and start (or join) a newer one
+            if result[0] >= version:
+                return result
+
+
+if __name__ == "__main__":
+    # python dashboard.py  -> rebuild the counters and report drift
+    drift = CounterReconciler(SessionLocal).reconcile()
+    print(
+        "Dashboard counters were correct" if not drift else "Dashboard counters rebuilt"
+    )
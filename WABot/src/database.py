@@ -1,8 +1,13 @@
+from contextlib import contextmanager
+
 from sqlalchemy import create_engine
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import sessionmaker
 from db_config import DATABASE_URL
 
-engine = create_engine(DATABASE_URL)
+# SQLite connections are shared with the webhook worker threads
+connect_args = {"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
+engine = create_engine(DATABASE_URL, connect_args=connect_args)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 def get_db():
@@ -11,3 +16,30 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+@contextmanager
+def session_scope():
+    """
+    Provides a single unit of work: the session is committed if the block
+    succeeds, rolled back if it raises, and always closed.
+    """
+    db = SessionLocal()
+    try:
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def upsert(table):
+    """
+    Returns an INSERT for `table` that supports on_conflict_do_update() and
+    on_conflict_do_nothing() on the configured database (SQLite or PostgreSQL).
+    """
+    if engine.dialect.name == "postgresql":
+        return postgresql.insert(table)
+    return sqlite.insert(table)
@@ -1,21 +1,31 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from models import Student, StudentAcademicHistory, SubjectCombination, Base
-from database import get_db  # Assuming this is your get_db function
-
-# Create the database engine and session
-DATABASE_URL = "sqlite:///./test.db"  # Adjust the DB URL as needed
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-
-# Dependency to get the DB session
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+import base64
+import json
+from collections import Counter
+
+from sqlalchemy import and_, delete, func, insert, not_, or_, select, update
+
+from models import (
+    Student,
+    StudentAcademicHistory,
+    SubjectCombination,
+    AcademicResult,
+    Base,
+    STUDENT_SORT_NAME,
+)
+from database import engine, upsert
+from dashboard import (
+    STUDENTS_BY_STATE,
+    COMBINATIONS_BY_STATE,
+    RESULTS_BY_GRADE,
+    ACADEMIC_RECORDS,
+    bump_counter,
+    bump_dashboard_version,
+    move_counter,
+    read_counter_total,
+    student_state_key,
+    combination_state_key,
+    grade_key,
+)
 
 
 # The function to add a student
@@ -39,8 +49,8 @@ def add_student(
         address=address,
     )
     db.add(student)
-    db.commit()
-    db.refresh(student)
+    db.flush()
+    bump_counter(db, STUDENTS_BY_STATE, student_state_key(student.state))
     return student
 
 
@@ -51,10 +61,10 @@ def initialize_db():
 
 
 # Create a student
-def create_student(phone, name, email, state, dob=None, gender=None, address=None):
-    db = next(get_db())  # Get the database session
+def create_student(db, phone, name, email, state, dob=None, gender=None, address=None):
     student = add_student(db, phone, name, email, state, dob, gender, address)
     print(f"Student {student.name} created with ID {student.id}")
+    return student
 
 
 # Function to retrieve a student by WhatsApp number
@@ -79,19 +89,32 @@ def update_student(
     dob: str = None,
     gender: str = None,
     address: str = None,
+    student: Student = None,
 ):
-    student = (
-        db.query(Student).filter(Student.whatsapp_number == whatsapp_number).first()
-    )
+    # Callers that already loaded the student can pass it to skip the lookup
+    if student is None:
+        student = (
+            db.query(Student)
+            .filter(Student.whatsapp_number == whatsapp_number)
+            .first()
+        )
     if not student:
         print(f"No student found with WhatsApp number: {whatsapp_number}")
         return None
 
     if name:
+        if name != student.name:
+            bump_dashboard_version(db)
         student.name = name
     if email:
         student.email = email
     if state:
+        move_counter(
+            db,
+            STUDENTS_BY_STATE,
+            student_state_key(student.state),
+            student_state_key(state),
+        )
         student.state = state
     if dob:
         student.dob = dob
@@ -100,8 +123,7 @@ def update_student(
     if address:
         student.address = address
 
-    db.commit()
-    db.refresh(student)
+    db.flush()
     print(f"Student with WhatsApp number {whatsapp_number} has been updated.")
     return student
 
@@ -116,7 +138,8 @@ def delete_student(db, whatsapp_number: str):
         return False
 
     db.delete(student)
-    db.commit()
+    bump_counter(db, STUDENTS_BY_STATE, student_state_key(student.state), -1)
+    db.flush()
     print(f"Student with WhatsApp number {whatsapp_number} has been deleted.")
     return True
 
@@ -142,13 +165,12 @@ def save_academic_history(db, whatsapp_number, path1=None, path2=None, path3=Non
         whatsapp_number=whatsapp_number, path1=path1, path2=path2, path3=path3
     )
     db.add(history)
-    db.commit()
-    db.refresh(history)
+    db.flush()
+    bump_counter(db, ACADEMIC_RECORDS, "")
     return history
 
 
-def create_academic_history(whatsapp_number, path1=None, path2=None, path3=None):
-    db = next(get_db())  # Get the database session
+def create_academic_history(db, whatsapp_number, path1=None, path2=None, path3=None):
     history = save_academic_history(db, whatsapp_number, path1, path2, path3)
     print(f"Academic history created for WhatsApp number {history.whatsapp_number}")
     return history
@@ -171,6 +193,9 @@ def update_academic_history(
     path2: str = None,
     path3: str = None,
     results: str = None,
+    history: StudentAcademicHistory = None,
+    confirmation_sent: bool = None,
+    error_message_sent: bool = None,
 ):
     """
     Updates the academic history for a student, including paths and subjects/symbols if provided.
@@ -180,13 +205,16 @@ def update_academic_history(
     whatsapp_number (str): The WhatsApp number of the student.
     path1, path2, path3 (str): File paths for the academic results images.
     results (str): A semicolon-separated string of subjects and their grades (e.g., "Maths, A; Physics, B").
+    history (StudentAcademicHistory): The already loaded record, if the caller has it.
+    confirmation_sent, error_message_sent (bool): New values of the upload message flags.
     """
     # Retrieve the student's academic history based on their WhatsApp number
-    history = (
-        db.query(StudentAcademicHistory)
-        .filter(StudentAcademicHistory.whatsapp_number == whatsapp_number)
-        .first()
-    )
+    if history is None:
+        history = (
+            db.query(StudentAcademicHistory)
+            .filter(StudentAcademicHistory.whatsapp_number == whatsapp_number)
+            .first()
+        )
 
     if not history:
         print(f"No academic history found for WhatsApp number: {whatsapp_number}")
@@ -199,6 +227,10 @@ def update_academic_history(
         history.path2 = path2
     if path3:
         history.path3 = path3
+    if confirmation_sent is not None:
+        history.confirmation_sent = confirmation_sent
+    if error_message_sent is not None:
+        history.error_message_sent = error_message_sent
 
     # Parse the results if provided
     if results:
@@ -211,9 +243,11 @@ def update_academic_history(
                 setattr(history, subject_column, subject)
                 setattr(history, symbol_column, grade)
 
-    # Commit the changes to the database
-    db.commit()
-    db.refresh(history)
+        # Keep the one-row-per-result table in step with the wide columns
+        save_academic_results(db, whatsapp_number, results)
+
+    # Flush the changes; the caller's unit of work commits them
+    db.flush()
     print(f"Academic history for WhatsApp number {whatsapp_number} has been updated.")
     return history
 
@@ -229,13 +263,223 @@ def delete_academic_history(db, whatsapp_number: str):
         return False
 
     db.delete(history)
-    db.commit()
+    bump_counter(db, ACADEMIC_RECORDS, "", -1)
+    save_academic_results(db, whatsapp_number, [])
+    db.flush()
     print(f"Academic history for WhatsApp number {whatsapp_number} has been deleted.")
     return True
 
 
-def get_existing_academic_images(phone):
-    db = next(get_db())  # Get the database session
+# Points per O-level grade, so grades can be compared ("at least a B")
+GRADE_POINTS = {"A": 5, "B": 4, "C": 3, "D": 2, "E": 1, "F": 0, "U": 0}
+
+
+# Sort key recorded in find_students_by_result cursors
+RESULT_CURSOR_SORT = "-points"
+
+
+def grade_points(grade: str):
+    """
+    Returns the points of a grade such as "A" or "b+", or None if it is not an
+    O-level grade.
+    """
+    grade = (grade or "").strip().upper()
+    return GRADE_POINTS.get(grade[:1]) if grade else None
+
+
+def save_academic_results(db, whatsapp_number: str, results):
+    """
+    Replaces a student's rows in academic_results.
+
+    Args:
+    db: Database session.
+    whatsapp_number (str): The WhatsApp number of the student.
+    results (list): (subject, grade) tuples, as parse_academic_results() returns.
+    """
+    grades = Counter(
+        grade_key(grade)
+        for grade in db.scalars(
+            select(AcademicResult.grade).where(
+                AcademicResult.whatsapp_number == whatsapp_number
+            )
+        )
+    )
+    db.execute(
+        delete(AcademicResult).where(AcademicResult.whatsapp_number == whatsapp_number)
+    )
+    # Positions are numbered densely over the non-empty results, as the
+    # migration's backfill numbers them
+    results = [
+        (subject.strip(), grade.strip().upper())
+        for subject, grade in results
+        if subject.strip() and grade.strip()
+    ]
+    rows = [
+        {
+            "whatsapp_number": whatsapp_number,
+            "position": position,
+            "subject": subject,
+            "grade": grade,
+            "points": grade_points(grade),
+        }
+        for position, (subject, grade) in enumerate(results, start=1)
+    ]
+    if rows:
+        db.execute(insert(AcademicResult), rows)
+
+    grades.subtract(grade_key(row["grade"]) for row in rows)
+    for grade, removed in grades.items():
+        bump_counter(db, RESULTS_BY_GRADE, grade, -removed)
+
+
+def get_academic_results(db, whatsapp_number: str):
+    return (
+        db.query(AcademicResult)
+        .filter(AcademicResult.whatsapp_number == whatsapp_number)
+        .order_by(AcademicResult.position)
+        .all()
+    )
+
+
+def find_students_by_result(
+    db, subject: str, min_grade: str, limit: int, cursor: str = None
+):
+    """
+    Returns one page of the results in `subject` that are `min_grade` or better,
+    best first, e.g. every applicant with at least a B in Maths, and the cursor
+    of the next page (None on the last page). Pages are read by seeking past the
+    last (points, id) of the previous page, as get_students_page does, so each
+    page is one range scan of the (subject, points) index.
+    """
+    min_points = grade_points(min_grade)
+    if min_points is None:
+        raise ValueError(f"Unknown grade: {min_grade}")
+    query = db.query(AcademicResult).filter(
+        AcademicResult.subject == subject.strip(),
+        AcademicResult.points >= min_points,
+    )
+    if cursor is not None:
+        points, result_id = decode_student_cursor(cursor, RESULT_CURSOR_SORT)
+        query = query.filter(
+            AcademicResult.points <= points,
+            or_(AcademicResult.points < points, AcademicResult.id < result_id),
+        )
+
+    # One extra row tells whether there is a next page
+    results = (
+        query.order_by(AcademicResult.points.desc(), AcademicResult.id.desc())
+        .limit(limit + 1)
+        .all()
+    )
+    next_cursor = None
+    if len(results) > limit:
+        results = results[:limit]
+        last = results[-1]
+        next_cursor = encode_student_cursor(RESULT_CURSOR_SORT, last.points, last.id)
+    return results, next_cursor
+
+
+def get_result_subjects(db):
+    """
+    Returns each subject in academic_results with the number of students who
+    gave a result in it, most common first.
+    """
+    return (
+        db.query(AcademicResult.subject, func.count(AcademicResult.id))
+        .group_by(AcademicResult.subject)
+        .order_by(func.count(AcademicResult.id).desc(), AcademicResult.subject)
+        .all()
+    )
+
+
+ACADEMIC_IMAGE_SLOTS = ("path1", "path2", "path3")
+
+
+def claim_academic_image_slot(db, whatsapp_number: str, path: str):
+    """
+    Stores `path` in the first empty image slot of a student's academic history,
+    creating the record if needed. Each slot is claimed with a conditional
+    UPDATE, so concurrent uploads from the same number never take the same slot
+    and never overwrite each other.
+
+    Returns:
+    str: The slot that holds `path` (also when it was already stored), or None
+    if all slots are taken.
+    """
+    created = db.execute(
+        upsert(StudentAcademicHistory.__table__)
+        .values(whatsapp_number=whatsapp_number)
+        .on_conflict_do_nothing(index_elements=["whatsapp_number"])
+    )
+    if created.rowcount:
+        bump_counter(db, ACADEMIC_RECORDS, "")
+    slots = [getattr(StudentAcademicHistory, column) for column in ACADEMIC_IMAGE_SLOTS]
+    for column, slot in zip(ACADEMIC_IMAGE_SLOTS, slots):
+        result = db.execute(
+            update(StudentAcademicHistory)
+            .where(
+                StudentAcademicHistory.whatsapp_number == whatsapp_number,
+                or_(slot.is_(None), slot == ""),
+                # A redelivered upload keeps the slot it already has
+                and_(*[or_(other.is_(None), other != path) for other in slots]),
+            )
+            .values({column: path})
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount:
+            return column
+
+    history = (
+        db.query(StudentAcademicHistory)
+        .filter(StudentAcademicHistory.whatsapp_number == whatsapp_number)
+        .populate_existing()
+        .first()
+    )
+    for column in ACADEMIC_IMAGE_SLOTS:
+        if getattr(history, column) == path:
+            return column
+    return None
+
+
+def count_academic_images(db, whatsapp_number: str):
+    """
+    Returns the number of filled image slots in a student's academic history,
+    including images whose download is still pending.
+    """
+    history = (
+        db.query(StudentAcademicHistory)
+        .filter(StudentAcademicHistory.whatsapp_number == whatsapp_number)
+        .populate_existing()
+        .first()
+    )
+    if not history:
+        return 0
+    return sum(1 for column in ACADEMIC_IMAGE_SLOTS if getattr(history, column))
+
+
+def claim_academic_message_flag(db, whatsapp_number: str, flag: str):
+    """
+    Sets the "confirmation_sent" or "error_message_sent" flag of a student's
+    academic history, if it is not set yet. The conditional UPDATE lets exactly
+    one of several concurrent uploads win, so that one sends the message.
+
+    Returns:
+    bool: True if this call set the flag.
+    """
+    column = getattr(StudentAcademicHistory, flag)
+    result = db.execute(
+        update(StudentAcademicHistory)
+        .where(
+            StudentAcademicHistory.whatsapp_number == whatsapp_number,
+            column.is_(False),
+        )
+        .values({flag: True})
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
+def get_existing_academic_images(db, phone):
     # Query for academic history based on WhatsApp number
     history = (
         db.query(StudentAcademicHistory)
@@ -273,6 +517,9 @@ def reinitialize_academic_history(
             record.path1 = path1
             record.path2 = path2
             record.path3 = path3
+            # New uploads get their own confirmation
+            record.confirmation_sent = False
+            record.error_message_sent = False
             db.commit()  # Save the changes to the database
         else:
             # If no record is found, send a notification to the user
@@ -337,6 +584,12 @@ def create_or_update_subject_combination(
         if subject3_option3:
             subject_combination.subject3_option3 = subject3_option3
         if subject_combination_state:
+            move_counter(
+                db,
+                COMBINATIONS_BY_STATE,
+                combination_state_key(subject_combination.subject_combination_state),
+                combination_state_key(subject_combination_state),
+            )
             subject_combination.subject_combination_state = subject_combination_state
         if suggested_subject1:
             subject_combination.suggested_subject1 = suggested_subject1
@@ -345,8 +598,7 @@ def create_or_update_subject_combination(
         if suggested_subject3:
             subject_combination.suggested_subject3 = suggested_subject3
 
-        db.commit()
-        db.refresh(subject_combination)
+        db.flush()
         print(
             f"Subject combination for WhatsApp number {whatsapp_number} has been updated."
         )
@@ -369,8 +621,10 @@ def create_or_update_subject_combination(
             suggested_subject3=suggested_subject3,
         )
         db.add(subject_combination)
-        db.commit()
-        db.refresh(subject_combination)
+        db.flush()
+        bump_counter(
+            db, COMBINATIONS_BY_STATE, combination_state_key(subject_combination_state)
+        )
         print(f"Subject combination created for WhatsApp number {whatsapp_number}")
 
     return subject_combination
@@ -400,7 +654,13 @@ def delete_subject_combination(db, whatsapp_number: str):
         return False
 
     db.delete(subject_combination)
-    db.commit()
+    bump_counter(
+        db,
+        COMBINATIONS_BY_STATE,
+        combination_state_key(subject_combination.subject_combination_state),
+        -1,
+    )
+    db.flush()
     print(
         f"Subject combination for WhatsApp number {whatsapp_number} has been deleted."
     )
@@ -429,25 +689,161 @@ def get_complete_student_info(db, whatsapp_number: str):
     }
 
 
+def students_with_details():
+    """
+    Selects (Student, StudentAcademicHistory, SubjectCombination) rows, with the
+    academic history and subject combination outer-joined on the WhatsApp number
+    (unique in both tables).
+    """
+    return (
+        select(Student, StudentAcademicHistory, SubjectCombination)
+        .outerjoin(
+            StudentAcademicHistory,
+            StudentAcademicHistory.whatsapp_number == Student.whatsapp_number,
+        )
+        .outerjoin(
+            SubjectCombination,
+            SubjectCombination.whatsapp_number == Student.whatsapp_number,
+        )
+    )
+
+
+def student_details(rows):
+    return [
+        {
+            "student": student,
+            "academic_history": academic_history,
+            "subject_combination": subject_combination,
+        }
+        for student, academic_history, subject_combination in rows
+    ]
+
+
 def get_all_students_with_details(db):
-    """Get all students with their complete information"""
-    students = list_all_students(db)
-    result = []
+    """
+    Get all students with their complete information, in one query however
+    many students there are.
+    """
+    return student_details(db.execute(students_with_details().order_by(Student.id)))
+
+
+# Sort orders of get_students_page, each served by an index ending in the id;
+# prefix with "-" for descending
+STUDENT_SORTS = {"id": Student.id, "name": STUDENT_SORT_NAME}
 
-    for student in students:
-        academic_history = get_academic_history_by_whatsapp_number(
-            db, student.whatsapp_number
+
+def student_filters(state=None, combination_state=None, gender=None, has_images=None):
+    """
+    The conditions for the get_students_page filters that are set. The
+    combination state is compared as broadcasts target it, so "Pending"
+    includes combinations nobody has reviewed and students without one.
+    """
+    conditions = []
+    if state is not None:
+        conditions.append(Student.state == state)
+    if gender is not None:
+        conditions.append(Student.gender == gender)
+    if combination_state is not None:
+        # Students without a subject combination row count as Pending too, as
+        # in broadcasts
+        conditions.append(
+            func.coalesce(SubjectCombination.subject_combination_state, "Pending")
+            == combination_state
         )
-        subject_combination = get_subject_combination_by_whatsapp_number(
-            db, student.whatsapp_number
+    if has_images is not None:
+        uploaded = or_(
+            *[
+                and_(column.isnot(None), column != "")
+                for column in (
+                    StudentAcademicHistory.path1,
+                    StudentAcademicHistory.path2,
+                    StudentAcademicHistory.path3,
+                )
+            ]
         )
+        conditions.append(uploaded if has_images else not_(uploaded))
+    return conditions
 
-        result.append(
-            {
-                "student": student,
-                "academic_history": academic_history,
-                "subject_combination": subject_combination,
-            }
-        )
 
-    return result
+def encode_student_cursor(sort: str, value, student_id: int):
+    raw = json.dumps([sort, value, student_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_student_cursor(cursor: str, sort: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort, value, student_id = json.loads(raw)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if cursor_sort != sort or not isinstance(student_id, int):
+        raise ValueError("Cursor was issued for a different sort")
+    return value, student_id
+
+
+def get_students_page(db, limit: int, cursor: str = None, sort: str = "id", **filters):
+    """
+    Returns one page of students with their details, as
+    get_all_students_with_details does, and the cursor of the next page (None on
+    the last page). Pages are read by seeking past the last (sort key, id) of the
+    previous page rather than with OFFSET, so every page costs the same however
+    deep it is. Filters are those of student_filters.
+    """
+    descending = sort.startswith("-")
+    key = STUDENT_SORTS.get(sort.lstrip("-"))
+    if key is None:
+        raise ValueError(f"Unknown sort: {sort}")
+
+    query = students_with_details().where(*student_filters(**filters))
+    if cursor is not None:
+        value, student_id = decode_student_cursor(cursor, sort)
+        if key is Student.id:
+            query = query.where(
+                Student.id < student_id if descending else Student.id > student_id
+            )
+        elif descending:
+            # Written as a range on the key first, so the index can seek to it
+            query = query.where(
+                key <= value, or_(key < value, Student.id < student_id)
+            )
+        else:
+            query = query.where(
+                key >= value, or_(key > value, Student.id > student_id)
+            )
+    if key is Student.id:
+        order = [Student.id.desc() if descending else Student.id]
+    else:
+        order = [key.desc(), Student.id.desc()] if descending else [key, Student.id]
+
+    # One extra row tells whether there is a next page
+    rows = db.execute(query.order_by(*order).limit(limit + 1)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1][0]
+        value = last.id if key is Student.id else last.name or ""
+        next_cursor = encode_student_cursor(sort, value, last.id)
+    return student_details(rows), next_cursor
+
+
+def count_students(db, **filters):
+    """
+    Counts the students get_students_page would return with these filters. The
+    unfiltered total comes from the dashboard counters; a state or gender alone
+    is counted from its index.
+    """
+    conditions = student_filters(**filters)
+    if not conditions:
+        return read_counter_total(db, STUDENTS_BY_STATE)
+    query = select(func.count(Student.id)).where(*conditions)
+    if filters.get("combination_state") is not None:
+        query = query.outerjoin(
+            SubjectCombination,
+            SubjectCombination.whatsapp_number == Student.whatsapp_number,
+        )
+    if filters.get("has_images") is not None:
+        query = query.outerjoin(
+            StudentAcademicHistory,
+            StudentAcademicHistory.whatsapp_number == Student.whatsapp_number,
+        )
+    return db.scalar(query)
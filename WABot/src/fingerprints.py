@@ -0,0 +1,330 @@
+import queue
+import threading
+from datetime import datetime
+from itertools import combinations
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+from sqlalchemy import or_, select, union_all
+
+from database import upsert
+from media_store import MediaStore
+from models import ImageFingerprint, MediaObject, StudentAcademicHistory
+
+BAND_BITS = 16
+BANDS = 4
+# Lookups probe every band value within PROBE_RADIUS bits of the image's own.
+# Two hashes within d bits differ in at most d // BANDS bits in some band
+# (pigeonhole over BANDS bands), so probing up to that radius finds all of them:
+# recall is exhaustive up to EXACT_RECALL_DISTANCE bits. The price of a larger
+# radius is the number of probes per band (1 + 16 + 120 = 137 at radius 2) and
+# more candidates whose full distance has to be checked; beyond radius 2 both
+# grow too fast to be worth it, so larger distances are not supported.
+PROBE_RADIUS = 2
+EXACT_RECALL_DISTANCE = BANDS * (PROBE_RADIUS + 1) - 1
+# Re-saved, rescaled or re-photographed copies of one document typically land
+# within 10 bits of each other; unrelated documents are usually 20+ bits apart.
+SIMILAR_DISTANCE = 10
+# Stored objects checked per page of /api/media/duplicates
+DUPLICATE_PAGE_SIZE = 100
+
+
+def dhash(path):
+    """
+    Computes the 64-bit difference hash of an image: shrink to 9x8 greyscale and
+    record, for each row, whether each pixel is brighter than its right-hand
+    neighbour. Robust to rescaling, recompression and small lighting changes.
+    """
+    with Image.open(path) as image:
+        image.draft("L", (64, 64))
+        image = ImageOps.exif_transpose(image).convert("L").resize((9, 8))
+        pixels = list(image.getdata())
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            right = pixels[row * 9 + col + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+
+def bands_of(value):
+    mask = (1 << BAND_BITS) - 1
+    return [(value >> (BAND_BITS * i)) & mask for i in range(BANDS)]
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+def probe_radius(max_distance):
+    """
+    The smallest per-band radius that still finds every hash within
+    `max_distance` bits.
+    """
+    return max_distance // BANDS
+
+
+def band_neighbours(band, radius):
+    """
+    Every BAND_BITS-bit value within `radius` bits of `band`, itself included.
+    """
+    values = [band]
+    for flips in range(1, radius + 1):
+        for bits in combinations(range(BAND_BITS), flips):
+            value = band
+            for bit in bits:
+                value ^= 1 << bit
+            values.append(value)
+    return values
+
+
+def band_columns(model=ImageFingerprint):
+    return [getattr(model, f"band{i}") for i in range(BANDS)]
+
+
+def near_bands(value, max_distance):
+    """
+    The condition selecting, on the band indexes, every fingerprint with a band
+    within probe_radius(max_distance) bits of the same band of `value`. It holds
+    for every hash within `max_distance` bits of `value` (up to
+    EXACT_RECALL_DISTANCE), and for some farther ones, so callers still check
+    the full distance.
+    """
+    radius = probe_radius(max_distance)
+    return or_(
+        *[
+            column.in_(band_neighbours(band, radius))
+            for column, band in zip(band_columns(), bands_of(value))
+        ]
+    )
+
+
+def find_similar(db, sha256, max_distance=SIMILAR_DISTANCE):
+    """
+    Returns the stored images whose hash is within `max_distance` bits of the
+    image `sha256`, nearest first, as (sha256, distance) tuples. Candidates are
+    looked up on the band indexes; recall is exhaustive up to
+    EXACT_RECALL_DISTANCE bits.
+    """
+    target = db.scalar(
+        select(ImageFingerprint).where(ImageFingerprint.sha256 == sha256)
+    )
+    if target is None:
+        return None
+    value = int(target.dhash, 16)
+    candidates = db.execute(
+        select(ImageFingerprint.sha256, ImageFingerprint.dhash).where(
+            ImageFingerprint.sha256 != sha256, near_bands(value, max_distance)
+        )
+    ).all()
+    matches = []
+    for candidate_sha, candidate_hash in candidates:
+        distance = hamming(value, int(candidate_hash, 16))
+        if distance <= max_distance:
+            matches.append((candidate_sha, distance))
+    matches.sort(key=lambda match: match[1])
+    return matches
+
+
+def find_later_matches(db, media_id, value, max_distance):
+    """
+    Returns the images stored after media object `media_id` whose hash is within
+    `max_distance` bits of `value`, as (sha256, distance) tuples, looked up on
+    the band indexes. Pairing each image only with later ones reports every pair
+    once.
+    """
+    candidates = db.execute(
+        select(ImageFingerprint.sha256, ImageFingerprint.dhash)
+        .join(MediaObject, MediaObject.sha256 == ImageFingerprint.sha256)
+        .where(MediaObject.id > media_id, near_bands(value, max_distance))
+    )
+    matches = []
+    for candidate_sha, candidate_hash in candidates:
+        distance = hamming(value, int(candidate_hash, 16))
+        if distance <= max_distance:
+            matches.append((candidate_sha, distance))
+    return matches
+
+
+def image_slots():
+    """
+    The academic history image slots as one (whatsapp_number, path) relation.
+    """
+    return union_all(
+        *[
+            select(
+                StudentAcademicHistory.whatsapp_number.label("whatsapp_number"),
+                getattr(StudentAcademicHistory, column).label("path"),
+            ).where(getattr(StudentAcademicHistory, column).isnot(None))
+            for column in ("path1", "path2", "path3")
+        ]
+    ).subquery()
+
+
+def get_uploaders(db, sha256s):
+    """
+    Maps each image hash to the WhatsApp numbers whose academic history
+    references it.
+    """
+    slots = image_slots()
+    uploaders = {sha256: set() for sha256 in sha256s}
+    rows = db.execute(
+        select(MediaObject.sha256, slots.c.whatsapp_number)
+        .join(slots, slots.c.path == MediaObject.path)
+        .where(MediaObject.sha256.in_(sha256s))
+    )
+    for sha256, whatsapp_number in rows:
+        uploaders[sha256].add(whatsapp_number)
+    return uploaders
+
+
+def find_cross_applicant_duplicates(
+    db, max_distance=SIMILAR_DISTANCE, limit=DUPLICATE_PAGE_SIZE, cursor=None
+):
+    """
+    Returns near-duplicate image pairs uploaded by different WhatsApp numbers,
+    including identical files (one stored object) referenced by several numbers,
+    and the cursor of the next page (None on the last page).
+
+    A page covers the `limit` stored objects after media object id `cursor`:
+    each is checked for several uploaders, and paired with the later images
+    within `max_distance` bits, found on the band indexes as find_similar does.
+    A page holds only the duplicates found among its objects, so it can be
+    short or empty while later pages are not.
+    """
+    query = (
+        select(MediaObject.id, MediaObject.sha256, ImageFingerprint.dhash)
+        .outerjoin(ImageFingerprint, ImageFingerprint.sha256 == MediaObject.sha256)
+        .order_by(MediaObject.id)
+    )
+    if cursor is not None:
+        query = query.where(MediaObject.id > cursor)
+    # One extra row tells whether there is a next page
+    sources = db.execute(query.limit(limit + 1)).all()
+    next_cursor = None
+    if len(sources) > limit:
+        sources = sources[:limit]
+        next_cursor = sources[-1].id
+
+    pairs = []
+    for media_id, sha256, dhash in sources:
+        if dhash is not None:
+            for match, distance in find_later_matches(
+                db, media_id, int(dhash, 16), max_distance
+            ):
+                pairs.append((sha256, match, distance))
+    uploaders = get_uploaders(
+        db, list({source.sha256 for source in sources} | {pair[1] for pair in pairs})
+    )
+
+    results = []
+    for source in sources:
+        numbers = uploaders[source.sha256]
+        if len(numbers) > 1:
+            results.append(
+                {
+                    "images": [source.sha256],
+                    "distance": 0,
+                    "whatsapp_numbers": sorted(numbers),
+                }
+            )
+    for sha_a, sha_b, distance in pairs:
+        numbers_a, numbers_b = uploaders[sha_a], uploaders[sha_b]
+        if numbers_a and numbers_b and numbers_a != numbers_b:
+            results.append(
+                {
+                    "images": [sha_a, sha_b],
+                    "distance": distance,
+                    "whatsapp_numbers": sorted(numbers_a | numbers_b),
+                }
+            )
+    results.sort(key=lambda result: result["distance"])
+    return results, next_cursor
+
+
+class FingerprintIndexer:
+    """
+    Computes perceptual hashes of stored images on a background thread and
+    stores them in image_fingerprints, one indexed column per 16-bit band. New
+    uploads are queued by the media fetcher; images stored before the indexer
+    ran are picked up on start.
+    """
+
+    def __init__(self, session_factory, store=None):
+        self.session_factory = session_factory
+        self.store = store or MediaStore()
+        self._queue = queue.Queue()
+        self._thread = None
+
+    def submit(self, sha256):
+        self._queue.put(sha256)
+
+    def index(self, sha256):
+        db = self.session_factory()
+        try:
+            media = db.scalar(select(MediaObject).where(MediaObject.sha256 == sha256))
+            if media is None or not (media.mime_type or "").startswith("image/"):
+                return
+            try:
+                value = dhash(self.store.local_path(media.path))
+            except (OSError, UnidentifiedImageError, Image.DecompressionBombError) as e:
+                print(f"Could not fingerprint {sha256}: {e}")
+                return
+            bands = bands_of(value)
+            db.execute(
+                upsert(ImageFingerprint.__table__)
+                .values(
+                    sha256=sha256,
+                    dhash=f"{value:016x}",
+                    created_at=datetime.utcnow(),
+                    **{f"band{i}": band for i, band in enumerate(bands)},
+                )
+                .on_conflict_do_nothing(index_elements=["sha256"])
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def queue_missing(self):
+        db = self.session_factory()
+        try:
+            missing = db.scalars(
+                select(MediaObject.sha256)
+                .outerjoin(
+                    ImageFingerprint, ImageFingerprint.sha256 == MediaObject.sha256
+                )
+                .where(
+                    MediaObject.mime_type.like("image/%"),
+                    ImageFingerprint.id.is_(None),
+                )
+            ).all()
+        finally:
+            db.close()
+        for sha256 in missing:
+            self.submit(sha256)
+        return len(missing)
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._run, name="fingerprints", daemon=True
+        )
+        self._thread.start()
+        queued = self.queue_missing()
+        if queued:
+            print(f"Queued fingerprints for {queued} stored images")
+
+    def stop(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while True:
+            sha256 = self._queue.get()
+            if sha256 is None:
+                break
+            try:
+                self.index(sha256)
+            except Exception as e:
+                print(f"Fingerprint indexer failed on {sha256}: {e}")
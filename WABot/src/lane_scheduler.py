@@ -0,0 +1,86 @@
+import asyncio
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+
+class LaneScheduler:
+    """
+    Runs work items on a fixed set of sequential lanes. Each key (a student's
+    WhatsApp number) is hashed to one lane, so items for the same key are handled
+    strictly in submission order while different keys run in parallel.
+
+    Every lane owns one thread of a dedicated pool, so a blocking handler in one
+    lane never holds up another.
+    """
+
+    def __init__(self, handler, lanes=8, maxsize=1000):
+        self.handler = handler
+        self.lanes = lanes
+        self.maxsize = maxsize
+        self.queues = []
+        self._tasks = []
+        self._executor = None
+
+    def lane_for(self, key):
+        # crc32 is stable across processes, unlike the salted built-in hash()
+        return zlib.crc32(str(key).encode("utf-8")) % self.lanes
+
+    async def start(self):
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.lanes, thread_name_prefix="lane"
+        )
+        self.queues = [asyncio.Queue(maxsize=self.maxsize) for _ in range(self.lanes)]
+        self._tasks = [
+            asyncio.create_task(self._run_lane(lane)) for lane in range(self.lanes)
+        ]
+        print(f"Lane scheduler started with {self.lanes} lanes")
+
+    async def stop(self, timeout=10):
+        """
+        Gives the lanes up to `timeout` seconds to finish queued items, then
+        cancels them and shuts the thread pool down.
+        """
+        if not self.queues:
+            return
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(queue.join() for queue in self.queues)),
+                timeout=timeout,
+            )
+        except asyncio.TimeoutError:
+            pending = sum(queue.qsize() for queue in self.queues)
+            print(f"Lane scheduler stopped with {pending} items pending")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._executor.shutdown(wait=False)
+        self.queues = []
+        self._tasks = []
+
+    async def submit(self, key, item):
+        """
+        Queues an item on the lane owned by `key`, waiting if that lane is full.
+
+        Returns:
+        asyncio.Future: The handler's result for the item, or its exception.
+        """
+        done = asyncio.get_running_loop().create_future()
+        await self.queues[self.lane_for(key)].put((item, done))
+        return done
+
+    async def _run_lane(self, lane):
+        loop = asyncio.get_running_loop()
+        queue = self.queues[lane]
+        while True:
+            item, done = await queue.get()
+            try:
+                result = await loop.run_in_executor(self._executor, self.handler, item)
+            except Exception as e:
+                print(f"Lane {lane} failed to process item: {e}")
+                if not done.done():
+                    done.set_exception(e)
+            else:
+                if not done.done():
+                    done.set_result(result)
+            finally:
+                queue.task_done()
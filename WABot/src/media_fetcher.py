@@ -0,0 +1,353 @@
+import hashlib
+import os
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import requests
+from sqlalchemy import select, update
+from wa_cloud_py.messages.types import MIME_TYPES
+
+from database import upsert
+from messages.option_messages import send_academic_image_failed_message
+from models import MediaDownload, StudentAcademicHistory
+from media_store import (
+    MediaStore,
+    normalize_sha256,
+    pending_media_path,
+    record_media_object,
+    get_media_object,
+    replace_image_path,
+)
+from outbox import OutboxWhatsApp
+
+
+def queue_media_download(db, media_id, message_id, phone, filename, sha256=None):
+    """
+    Records a download job for `media_id` in the caller's unit of work. A
+    redelivered message does not create a second job.
+    """
+    db.execute(
+        upsert(MediaDownload.__table__)
+        .values(
+            media_id=media_id,
+            message_id=message_id,
+            whatsapp_number=phone,
+            filename=filename,
+            expected_sha256=sha256,
+            status="pending",
+            attempts=0,
+            next_attempt_at=datetime.utcnow(),
+            created_at=datetime.utcnow(),
+        )
+        .on_conflict_do_nothing(index_elements=["media_id"])
+    )
+
+
+class MediaDownloadError(Exception):
+    def __init__(self, message, retriable=True):
+        super().__init__(message)
+        self.retriable = retriable
+
+
+class MediaFetcher:
+    """
+    Downloads queued media on a bounded pool of worker threads, off the webhook
+    path. Each body is streamed to a temporary file in chunks while its SHA-256
+    is computed. The file is fsynced and then moved into the content-addressed
+    MediaStore, so a stored file is never partially written and identical
+    uploads are stored once. When the webhook's hash is already in the store,
+    nothing is downloaded at all.
+
+    Once a file is stored, the image slot holding pending_media_path(media_id)
+    is pointed at its store URL. When a download fails for good the slot is
+    freed instead, and the student is asked through the outbox to send the
+    image again.
+
+    Job state lives in media_downloads. Failed attempts are retried with jittered
+    exponential backoff, up to max_attempts. Jobs left "downloading" by a crash
+    are picked up again on start.
+    """
+
+    def __init__(
+        self,
+        client,
+        session_factory,
+        store=None,
+        workers=4,
+        max_attempts=5,
+        base_delay=2,
+        max_delay=300,
+        chunk_size=64 * 1024,
+        poll_interval=2.0,
+        on_stored=None,
+        outbound=None,
+    ):
+        self.client = client
+        # Passed to OutboxWhatsApp for the message sent when a download fails
+        self.outbound = outbound
+        self.session_factory = session_factory
+        self.store = store or MediaStore()
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.chunk_size = chunk_size
+        self.poll_interval = poll_interval
+        # Called with the SHA-256 of each newly downloaded file, after commit
+        self.on_stored = on_stored
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._executor = None
+
+    def notify(self):
+        """
+        Wakes the fetcher after a unit of work that queued a download commits.
+        """
+        self._wake.set()
+
+    def backoff(self, attempt):
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+    def download(self, media_id):
+        """
+        Streams one media object into the store.
+
+        Returns:
+        dict: url, mime_type, size and sha256 of the stored file.
+        """
+        try:
+            metadata, res = self.client.open_media(media_id)
+        except (requests.Timeout, requests.ConnectionError, ValueError) as e:
+            raise MediaDownloadError(str(e))
+        if res is None:
+            # Expired or unknown media ids do not come back
+            raise MediaDownloadError(str(metadata.get("error", metadata)), False)
+
+        with res:
+            if res.status_code != 200:
+                raise MediaDownloadError(
+                    f"Media download returned {res.status_code}",
+                    res.status_code == 429 or res.status_code >= 500,
+                )
+            mime_type = metadata.get("mime_type")
+            ext = MIME_TYPES.get(mime_type, "")
+            digest = hashlib.sha256()
+            size = 0
+            fd, tmp_path = self.store.temp_file()
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    for chunk in res.iter_content(chunk_size=self.chunk_size):
+                        f.write(chunk)
+                        digest.update(chunk)
+                        size += len(chunk)
+                    f.flush()
+                    os.fsync(f.fileno())
+                sha256 = digest.hexdigest()
+                self.store.put(tmp_path, sha256, ext)
+            except (requests.RequestException, OSError) as e:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                raise MediaDownloadError(str(e))
+        return {
+            "url": self.store.url_for(sha256, ext),
+            "mime_type": mime_type,
+            "size": size,
+            "sha256": sha256,
+        }
+
+    def finish(self, db, job, url, mime_type, size):
+        job.status = "done"
+        job.error = None
+        job.path = url
+        job.mime_type = mime_type
+        job.size = size
+        job.updated_at = datetime.utcnow()
+        replace_image_path(
+            db, job.whatsapp_number, pending_media_path(job.media_id), url
+        )
+
+    def fail(self, db, job):
+        """
+        Frees the image slot of a download that will not be retried, so the
+        student can fill it again. The confirmation and upload limit flags are
+        reset, so the next upload gets its reply.
+        """
+        job.status = "failed"
+        freed = replace_image_path(
+            db, job.whatsapp_number, pending_media_path(job.media_id), None
+        )
+        if not freed:
+            # The slot was reset or re-uploaded in the meantime
+            return
+        db.execute(
+            update(StudentAcademicHistory)
+            .where(StudentAcademicHistory.whatsapp_number == job.whatsapp_number)
+            .values(confirmation_sent=False, error_message_sent=False)
+        )
+        send_academic_image_failed_message(
+            OutboxWhatsApp(db, self.outbound), job.whatsapp_number
+        )
+
+    def claim(self, limit):
+        """
+        Marks up to `limit` due jobs as downloading and returns their ids. The
+        conditional UPDATE keeps two fetchers from claiming the same job.
+        """
+        db = self.session_factory()
+        try:
+            candidates = db.scalars(
+                select(MediaDownload.id)
+                .where(
+                    MediaDownload.status == "pending",
+                    MediaDownload.next_attempt_at <= datetime.utcnow(),
+                )
+                .order_by(MediaDownload.id)
+                .limit(limit)
+            ).all()
+            claimed = []
+            for job_id in candidates:
+                result = db.execute(
+                    update(MediaDownload)
+                    .where(
+                        MediaDownload.id == job_id, MediaDownload.status == "pending"
+                    )
+                    .values(status="downloading", updated_at=datetime.utcnow())
+                )
+                if result.rowcount:
+                    claimed.append(job_id)
+            db.commit()
+            return claimed
+        finally:
+            db.close()
+
+    def process(self, job_id):
+        db = self.session_factory()
+        stored = None
+        try:
+            job = db.get(MediaDownload, job_id)
+            expected = normalize_sha256(job.expected_sha256)
+            existing = get_media_object(db, expected)
+            if existing is not None:
+                # Same content as an earlier upload: reuse it without downloading
+                self.finish(db, job, existing.path, existing.mime_type, existing.size)
+                job.sha256 = existing.sha256
+                print(f"Media {job.media_id} is already stored as {existing.path}")
+                db.commit()
+                return
+
+            job.attempts += 1
+            try:
+                saved = self.download(job.media_id)
+            except MediaDownloadError as e:
+                job.error = str(e)
+                if e.retriable and job.attempts < self.max_attempts:
+                    job.status = "pending"
+                    job.next_attempt_at = datetime.utcnow() + timedelta(
+                        seconds=self.backoff(job.attempts)
+                    )
+                else:
+                    self.fail(db, job)
+                print(f"Media download {job.media_id} failed ({job.status}): {e}")
+            else:
+                record_media_object(
+                    db,
+                    saved["sha256"],
+                    saved["size"],
+                    saved["mime_type"],
+                    saved["url"],
+                )
+                self.finish(db, job, saved["url"], saved["mime_type"], saved["size"])
+                job.sha256 = saved["sha256"]
+                if expected and expected != job.sha256:
+                    print(f"SHA-256 of media {job.media_id} does not match the webhook")
+                print(f"Media {job.media_id} saved to {job.path} ({job.size} bytes)")
+            job.updated_at = datetime.utcnow()
+            db.commit()
+            stored = job.sha256 if job.status == "done" else None
+        except Exception as e:
+            db.rollback()
+            print(f"Media download job {job_id} crashed: {e}")
+            db.execute(
+                update(MediaDownload)
+                .where(MediaDownload.id == job_id)
+                .values(
+                    status="pending",
+                    error=str(e),
+                    next_attempt_at=datetime.utcnow()
+                    + timedelta(seconds=self.max_delay),
+                    updated_at=datetime.utcnow(),
+                )
+            )
+            db.commit()
+        finally:
+            db.close()
+            with self._lock:
+                self._in_flight -= 1
+            self._wake.set()
+        if stored is not None and self.on_stored is not None:
+            # The job is committed as done; a failure here must not reset it
+            try:
+                self.on_stored(stored)
+            except Exception as e:
+                print(f"Post-processing of media {stored} failed: {e}")
+
+    def recover(self):
+        """
+        Returns jobs interrupted mid-download to the queue.
+        """
+        db = self.session_factory()
+        try:
+            db.execute(
+                update(MediaDownload)
+                .where(MediaDownload.status == "downloading")
+                .values(status="pending")
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def start(self):
+        self.recover()
+        self._stopping.clear()
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="media-fetch"
+        )
+        self._thread = threading.Thread(
+            target=self._run, name="media-fetcher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stops claiming jobs and waits for the downloads in progress.
+        """
+        self._stopping.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def _run(self):
+        while not self._stopping.is_set():
+            with self._lock:
+                free = self.workers - self._in_flight
+            if free > 0:
+                try:
+                    job_ids = self.claim(free)
+                except Exception as e:
+                    print(f"Media fetcher failed to claim jobs: {e}")
+                    job_ids = []
+                for job_id in job_ids:
+                    with self._lock:
+                        self._in_flight += 1
+                    self._executor.submit(self.process, job_id)
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
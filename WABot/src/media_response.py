@@ -0,0 +1,64 @@
+from starlette.responses import Response
+
+# Content-addressed files never change, so clients may keep them for a year
+IMMUTABLE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+
+
+def etag_matches(if_none_match, etag):
+    """
+    Evaluates an If-None-Match header against `etag` using the weak comparison
+    RFC 9110 prescribes for it.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def not_modified(etag, cache_control=IMMUTABLE_CACHE_CONTROL):
+    return Response(
+        status_code=304, headers={"ETag": etag, "Cache-Control": cache_control}
+    )
+
+
+def evaluate_if_range(request, etag):
+    """
+    Evaluates If-Range against `etag` before the request reaches FileResponse,
+    which would compare it with an ETag of its own, derived from mtime and
+    size. A matching validator (strong comparison, as RFC 9110 requires) keeps
+    the Range; anything else drops it, so the whole file is sent. Either way
+    If-Range is removed from the request, leaving FileResponse only the Range.
+    """
+    if_range = request.headers.get("if-range")
+    if if_range is None:
+        return
+    drop = {b"if-range"}
+    if if_range.strip() != etag or etag.startswith("W/"):
+        drop.add(b"range")
+    request.scope["headers"] = [
+        (name, value)
+        for name, value in request.scope["headers"]
+        if name.lower() not in drop
+    ]
+
+
+def accel_redirect(location, media_type, headers):
+    """
+    An empty response telling the reverse proxy in front of the app to send the
+    file at its internal `location` itself (nginx's X-Accel-Redirect), with
+    sendfile, so the file's bytes never pass through the app. The proxy also
+    answers Range requests for it. With nginx, the location is declared
+    `internal` and aliased to the media store root, e.g.
+
+        location /internal-media/ { internal; alias /srv/wabot/media/; }
+    """
+    return Response(
+        media_type=media_type, headers={**headers, "X-Accel-Redirect": location}
+    )
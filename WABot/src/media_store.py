@@ -0,0 +1,203 @@
+import base64
+import binascii
+import hashlib
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+from sqlalchemy import or_, select, update
+from wa_cloud_py.messages.types import MIME_TYPES
+
+from database import upsert
+from models import MediaObject, StudentAcademicHistory
+
+# URL prefix of the paths stored in the academic history image slots
+MEDIA_URL_PREFIX = "/media/"
+
+
+def normalize_sha256(value):
+    """
+    Returns a SHA-256 digest as lowercase hex. Accepts hex or base64 (the form
+    Meta uses in webhook payloads); returns None for anything else.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if len(value) == 64:
+        try:
+            return bytes.fromhex(value).hex()
+        except ValueError:
+            pass
+    try:
+        raw = base64.b64decode(value, validate=True)
+    except (binascii.Error, ValueError):
+        return None
+    return raw.hex() if len(raw) == 32 else None
+
+
+def pending_media_path(media_id):
+    """
+    Placeholder stored in an image slot until the download of `media_id` is done.
+    """
+    return f"{MEDIA_URL_PREFIX}pending/{media_id}"
+
+
+class MediaStore:
+    """
+    Content-addressed file store. A file with SHA-256 abcdef... is kept once, at
+    <root>/objects/ab/cd/abcdef...<ext>, however many times it is uploaded. The
+    two levels of 256 shards keep directories small enough to list and back up.
+    """
+
+    def __init__(self, root="./media/"):
+        self.root = root
+        self.tmp = os.path.join(root, "tmp")
+
+    def relative_path(self, sha256, ext=""):
+        return f"objects/{sha256[:2]}/{sha256[2:4]}/{sha256}{ext}"
+
+    def path_for(self, sha256, ext=""):
+        return os.path.join(self.root, self.relative_path(sha256, ext))
+
+    def url_for(self, sha256, ext=""):
+        return MEDIA_URL_PREFIX + self.relative_path(sha256, ext)
+
+    def rendition_relative_path(self, sha256, kind, ext=".jpeg"):
+        return f"renditions/{sha256[:2]}/{sha256[2:4]}/{sha256}_{kind}{ext}"
+
+    def local_path(self, url):
+        """
+        Maps a /media/... path stored in the database to the file on disk.
+        """
+        return os.path.join(self.root, url[len(MEDIA_URL_PREFIX) :])
+
+    def temp_file(self):
+        """
+        Opens a temporary file on the same filesystem as the store, so it can be
+        renamed into place atomically.
+
+        Returns:
+        Tuple[int, str]: The file descriptor and path, as tempfile.mkstemp().
+        """
+        os.makedirs(self.tmp, exist_ok=True)
+        return tempfile.mkstemp(dir=self.tmp, suffix=".part")
+
+    def put(self, tmp_path, sha256, ext=""):
+        """
+        Moves a fully written, fsynced temporary file into the store. If the
+        content is already stored, the temporary file is discarded.
+
+        Returns:
+        Tuple[str, bool]: The stored file's path, and whether it was new.
+        """
+        path = self.path_for(sha256, ext)
+        if os.path.exists(path):
+            os.unlink(tmp_path)
+            return path, False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp_path, path)
+        return path, True
+
+    def hash_file(self, source):
+        """
+        Returns:
+        Tuple[str, int]: The SHA-256 and the size of a file.
+        """
+        digest = hashlib.sha256()
+        size = 0
+        with open(source, "rb") as f:
+            for chunk in iter(lambda: f.read(64 * 1024), b""):
+                digest.update(chunk)
+                size += len(chunk)
+        return digest.hexdigest(), size
+
+
+def record_media_object(db, sha256, size, mime_type, url):
+    db.execute(
+        upsert(MediaObject.__table__)
+        .values(
+            sha256=sha256,
+            size=size,
+            mime_type=mime_type,
+            path=url,
+            created_at=datetime.utcnow(),
+        )
+        .on_conflict_do_nothing(index_elements=["sha256"])
+    )
+
+
+def get_media_object(db, sha256):
+    if not sha256:
+        return None
+    return db.scalar(select(MediaObject).where(MediaObject.sha256 == sha256))
+
+
+def replace_image_path(db, phone, old_path, new_path):
+    """
+    Points whichever image slot of `phone` holds `old_path` at `new_path`.
+
+    Returns:
+    int: The number of slots updated.
+    """
+    updated = 0
+    for column in ("path1", "path2", "path3"):
+        slot = getattr(StudentAcademicHistory, column)
+        result = db.execute(
+            update(StudentAcademicHistory)
+            .where(StudentAcademicHistory.whatsapp_number == phone, slot == old_path)
+            .values({column: new_path})
+        )
+        updated += result.rowcount
+    return updated
+
+
+def import_flat_media(db, store, source_dir):
+    """
+    Moves files saved flat as <source_dir>/image_<wamid><ext> into the store,
+    records them in media_objects, and repoints the image slots that referred
+    to them (with or without the extension).
+
+    Each file is recorded and committed before it is moved, so an interrupted
+    import can be run again: a file still in source_dir is simply imported
+    again, and one already moved has nothing left to do.
+    """
+    mime_by_ext = {ext: mime for mime, ext in MIME_TYPES.items()}
+    imported = 0
+    for name in sorted(os.listdir(source_dir)):
+        source = os.path.join(source_dir, name)
+        if not os.path.isfile(source):
+            continue
+        stem, ext = os.path.splitext(name)
+        sha256, size = store.hash_file(source)
+        url = store.url_for(sha256, ext)
+        record_media_object(db, sha256, size, mime_by_ext.get(ext), url)
+        for column in ("path1", "path2", "path3"):
+            slot = getattr(StudentAcademicHistory, column)
+            db.execute(
+                update(StudentAcademicHistory)
+                .where(
+                    or_(
+                        slot == f"{MEDIA_URL_PREFIX}{stem}",
+                        slot == f"{MEDIA_URL_PREFIX}{name}",
+                    )
+                )
+                .values({column: url})
+            )
+        db.commit()
+        store.put(source, sha256, ext)
+        imported += 1
+    return imported
+
+
+if __name__ == "__main__":
+    # python media_store.py ./media  -> move flat files into ./media/objects
+    from database import SessionLocal
+
+    source_dir = sys.argv[1] if len(sys.argv) > 1 else "./media/"
+    db = SessionLocal()
+    try:
+        count = import_flat_media(db, MediaStore(source_dir), source_dir)
+        print(f"Imported {count} files into {os.path.join(source_dir, 'objects')}")
+    finally:
+        db.close()
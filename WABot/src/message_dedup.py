@@ -0,0 +1,99 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from database import upsert
+from models import ProcessedMessage
+
+
+class MessageDeduplicator:
+    """
+    Drops webhook redeliveries by WhatsApp message id (wamid).
+
+    A bounded in-memory LRU with a TTL answers most repeats without touching the
+    database. Misses fall through to the processed_messages table, whose unique
+    index makes the claim atomic across workers and survives restarts.
+    """
+
+    def __init__(self, session_factory, maxsize=10000, ttl=3600, retention_days=7):
+        self.session_factory = session_factory
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.retention = timedelta(days=retention_days)
+        self._seen = OrderedDict()  # message_id -> expiry (monotonic seconds)
+        self._lock = threading.Lock()
+        self._claims = 0
+
+    def _seen_recently(self, message_id):
+        with self._lock:
+            expiry = self._seen.get(message_id)
+            if expiry is None:
+                return False
+            if expiry < time.monotonic():
+                del self._seen[message_id]
+                return False
+            self._seen.move_to_end(message_id)
+            return True
+
+    def _remember(self, message_id):
+        with self._lock:
+            self._seen[message_id] = time.monotonic() + self.ttl
+            self._seen.move_to_end(message_id)
+            while len(self._seen) > self.maxsize:
+                self._seen.popitem(last=False)
+
+    def claim(self, db, message_id):
+        """
+        Records a message id as processed in the caller's unit of work, so the
+        claim commits or rolls back together with the handler's writes. A
+        concurrent claim of the same id waits on the unique index until the first
+        one commits (then counts as a duplicate) or rolls back.
+
+        Returns:
+        bool: True the first time an id is seen, False for a duplicate.
+        """
+        if not message_id:
+            return True
+        if self._seen_recently(message_id):
+            return False
+
+        inserted = db.execute(
+            upsert(ProcessedMessage.__table__)
+            .values(message_id=message_id, processed_at=datetime.utcnow())
+            .on_conflict_do_nothing(index_elements=["message_id"])
+        ).rowcount
+        if not inserted:
+            self._remember(message_id)
+            return False
+        return True
+
+    def mark_processed(self, message_id):
+        """
+        Remembers an id whose unit of work committed, so redeliveries of it are
+        dropped without a query.
+        """
+        if not message_id:
+            return
+        self._remember(message_id)
+        # Purged here rather than in claim(), outside the caller's transaction
+        self._claims += 1
+        if self._claims % 1000 == 0:
+            self.purge_expired()
+
+    def purge_expired(self):
+        """
+        Deletes processed message ids older than the retention window.
+        """
+        cutoff = datetime.utcnow() - self.retention
+        db = self.session_factory()
+        try:
+            deleted = (
+                db.query(ProcessedMessage)
+                .filter(ProcessedMessage.processed_at < cutoff)
+                .delete()
+            )
+            db.commit()
+            print(f"Purged {deleted} processed message ids")
+        finally:
+            db.close()
@@ -9,11 +9,14 @@ from wa_cloud_py.messages.types import (
     InteractiveListMessage,
 )
 
+from whatsapp_client import text_payload, interactive_list_payload
+from messages.templates import MessageTemplate, RECIPIENT, field
 
-def send_welcome_message(whatsapp, phone, username):
-    whatsapp.send_interactive_list(
-        to=phone,
-        body=f"👋Hello {username} \n Welcome to the *Mufakose 2 Secondary School WhatsApp Chatbot*! 🎒\n\nHow may we assist you today? 😊\nPlease select an option from the menu below:",
+
+WELCOME_MESSAGE_TEMPLATE = MessageTemplate(
+    interactive_list_payload(
+        to=RECIPIENT,
+        body=f"👋Hello {field('username')} \n Welcome to the *Mufakose 2 Secondary School WhatsApp Chatbot*! 🎒\n\nHow may we assist you today? 😊\nPlease select an option from the menu below:",
         button="📋 Select",
         sections=[
             ListSection(
@@ -43,11 +46,18 @@ def send_welcome_message(whatsapp, phone, username):
             ),
         ],
     )
+)
 
 
-def send_upload_limit_message(whatsapp, phone):
-    whatsapp.send_interactive_list(
-        to=phone,
+def send_welcome_message(whatsapp, phone, username):
+    whatsapp.send_payload(
+        WELCOME_MESSAGE_TEMPLATE.render(phone, username=username), phone
+    )
+
+
+UPLOAD_LIMIT_MESSAGE_TEMPLATE = MessageTemplate(
+    interactive_list_payload(
+        to=RECIPIENT,
         body="🚫 Upload Limit Reached\n\nYou can only upload a maximum of 3 images. What would you like to do next?",
         button="Choose an option",
         sections=[
@@ -73,12 +83,17 @@ def send_upload_limit_message(whatsapp, phone):
             ),
         ],
     )
+)
 
 
-def send_academic_images_uploaded_message(whatsapp, phone):
-    whatsapp.send_interactive_list(
-        to=phone,
-        body="📚 Academic Images Uploaded\n\nYour academic images have been successfully uploaded. What would you like to do next?",
+def send_upload_limit_message(whatsapp, phone):
+    whatsapp.send_payload(UPLOAD_LIMIT_MESSAGE_TEMPLATE.render(phone), phone)
+
+
+ACADEMIC_IMAGES_UPLOADED_MESSAGE_TEMPLATE = MessageTemplate(
+    interactive_list_payload(
+        to=RECIPIENT,
+        body=f"📚 Academic Images Uploaded\n\nWe've received {field('images')} from you. What would you like to do next?",
         button="Choose an option",
         sections=[
             ListSection(
@@ -103,11 +118,37 @@ def send_academic_images_uploaded_message(whatsapp, phone):
             ),
         ],
     )
+)
 
 
-def enrollment_welcome_message(whatsapp, phone):
-    whatsapp.send_interactive_list(
-        to=phone,
+def send_academic_images_uploaded_message(whatsapp, phone, count):
+    images = "1 academic image" if count == 1 else f"{count} academic images"
+    whatsapp.send_payload(
+        ACADEMIC_IMAGES_UPLOADED_MESSAGE_TEMPLATE.render(phone, images=images), phone
+    )
+
+
+ACADEMIC_IMAGE_FAILED_MESSAGE_TEMPLATE = MessageTemplate(
+    text_payload(
+        to=RECIPIENT,
+        body=(
+            "⚠️ We couldn't save one of the academic images you sent. 😞\n\n"
+            "Please send that image again. 📤"
+        ),
+    )
+)
+
+
+def send_academic_image_failed_message(whatsapp, phone):
+    """
+    Asks the student to send again an image whose download failed for good.
+    """
+    whatsapp.send_payload(ACADEMIC_IMAGE_FAILED_MESSAGE_TEMPLATE.render(phone), phone)
+
+
+ENROLLMENT_WELCOME_MESSAGE_TEMPLATE = MessageTemplate(
+    interactive_list_payload(
+        to=RECIPIENT,
         body="Welcome to Mufakose 2 High's Enrollment System! 🎓\n\nHi there! 👋 We're thrilled to have you here. Are you enrolling for:\n\n- 🏫 *Form 1 (O-Level)*\n- 🎓 *Lower Six (A-Level)*\n\nSelect your level below to get started on this exciting journey! ✨",
         button="Choose Level",
         sections=[
@@ -126,39 +167,64 @@ def enrollment_welcome_message(whatsapp, phone):
             ),
         ],
     )
+)
 
 
-def get_student_fullname(whatsapp, phone):
-    whatsapp.send_text(
-        to=phone,
+def enrollment_welcome_message(whatsapp, phone):
+    whatsapp.send_payload(ENROLLMENT_WELCOME_MESSAGE_TEMPLATE.render(phone), phone)
+
+
+GET_STUDENT_FULLNAME_TEMPLATE = MessageTemplate(
+    text_payload(
+        to=RECIPIENT,
         body="😊 Great choice! Let's get to know you better.\n\nPlease reply with your **Full Name** (e.g., *Mufaro Conel Nyakudya*). 🌟\n\nThis will help us personalize your enrollment process. 📝",
     )
+)
 
 
-def get_student_birth(whatsapp, phone):
-    whatsapp.send_text(
-        to=phone,
+def get_student_fullname(whatsapp, phone):
+    whatsapp.send_payload(GET_STUDENT_FULLNAME_TEMPLATE.render(phone), phone)
+
+
+GET_STUDENT_BIRTH_TEMPLATE = MessageTemplate(
+    text_payload(
+        to=RECIPIENT,
         body="🎉 Almost there! Now, let's confirm your **Date of Birth*.\n\nPlease reply with your **Date of Birth* in this format: *DD/MM/YYYY* (e.g., *25/12/2005*). 🗓️\n\nThis will help us ensure you're enrolled in the right level! 🌟",
     )
+)
 
 
-def get_student_gender(whatsapp, phone):
-    whatsapp.send_text(
-        to=phone,
+def get_student_birth(whatsapp, phone):
+    whatsapp.send_payload(GET_STUDENT_BIRTH_TEMPLATE.render(phone), phone)
+
+
+GET_STUDENT_GENDER_TEMPLATE = MessageTemplate(
+    text_payload(
+        to=RECIPIENT,
         body="🌟 Let's move forward! Please tell us your *Gender*.\n\nReply with **M for Male** or **F for Female**. 🙋‍♂️🙋‍♀️\n\nThis helps us customize your enrollment process! 😊",
     )
+)
 
 
-def get_student_address(whatsapp, phone):
-    whatsapp.send_text(
-        to=phone,
+def get_student_gender(whatsapp, phone):
+    whatsapp.send_payload(GET_STUDENT_GENDER_TEMPLATE.render(phone), phone)
+
+
+GET_STUDENT_ADDRESS_TEMPLATE = MessageTemplate(
+    text_payload(
+        to=RECIPIENT,
         body="🏠 Finally, could you please provide your *Address*?\n\nReply with your full address (e.g., *123 Street, City, Country*). 📍\n\nThis is needed for the registration process! 🌍",
     )
+)
 
 
-def get_student_alternative_phone(whatsapp, phone):
-    whatsapp.send_interactive_list(
-        to=phone,
+def get_student_address(whatsapp, phone):
+    whatsapp.send_payload(GET_STUDENT_ADDRESS_TEMPLATE.render(phone), phone)
+
+
+GET_STUDENT_ALTERNATIVE_PHONE_TEMPLATE = MessageTemplate(
+    interactive_list_payload(
+        to=RECIPIENT,
         body="📞 We also need an **Alternate Contact Number**.\n\nPlease provide a phone number that is different from the one you're using to contact us (e.g., *+263 77 123 4567*). This will help us reach you if needed! 📱 \n Click skip if you do not have an alternative phone✨",
         button="Next",
         sections=[
@@ -174,15 +240,16 @@ def get_student_alternative_phone(whatsapp, phone):
             ),
         ],
     )
+)
 
 
-def get_olevel_results(whatsapp, phone):
-    """
-    Sends a message prompting the user to upload their O-Level results slip,
-    with a maximum of 3 images allowed.
-    """
-    whatsapp.send_text(
-        to=phone,
+def get_student_alternative_phone(whatsapp, phone):
+    whatsapp.send_payload(GET_STUDENT_ALTERNATIVE_PHONE_TEMPLATE.render(phone), phone)
+
+
+GET_OLEVEL_RESULTS_TEMPLATE = MessageTemplate(
+    text_payload(
+        to=RECIPIENT,
         body=(
             "📄 Now let's extract your academic results! \n\n"
             "Please upload a **clear photo** of your **original O-Level result slip**. 📝\n\n"
@@ -190,13 +257,19 @@ def get_olevel_results(whatsapp, phone):
             "You are allowed to upload **a maximum of 3 images**. Please attach your file here or use the upload button below. 📤"
         ),
     )
+)
 
-def get_olevel_results_by_subject(whatsapp, phone):
+
+def get_olevel_results(whatsapp, phone):
     """
-    Sends a message prompting the user to enter their academic results in the specified format.
+    Sends a message prompting the user to upload their O-Level results slip,
+    with a maximum of 3 images allowed.
     """
-    whatsapp.send_text(
-        to=phone,
+    whatsapp.send_payload(GET_OLEVEL_RESULTS_TEMPLATE.render(phone), phone)
+
+GET_OLEVEL_RESULTS_BY_SUBJECT_TEMPLATE = MessageTemplate(
+    text_payload(
+        to=RECIPIENT,
         body=(
             "📄 Now let's extract your academic results! \n\n"
             "Please provide your **O-Level results** in the following format:\n\n"
@@ -207,15 +280,19 @@ def get_olevel_results_by_subject(whatsapp, phone):
             "Ensure that the subjects and grades are correct. If the format is incorrect, your application may be considered invalid. ❌"
         ),
     )
+)
 
 
-def reupload_olevel_results(whatsapp, phone):
+def get_olevel_results_by_subject(whatsapp, phone):
     """
-    Sends a message prompting the user to reupload their O-Level results slip
-    if the previous upload was not clear or invalid.
+    Sends a message prompting the user to enter their academic results in the specified format.
     """
-    whatsapp.send_text(
-        to=phone,
+    whatsapp.send_payload(GET_OLEVEL_RESULTS_BY_SUBJECT_TEMPLATE.render(phone), phone)
+
+
+REUPLOAD_OLEVEL_RESULTS_TEMPLATE = MessageTemplate(
+    text_payload(
+        to=RECIPIENT,
         body=(
             "🔄 Re-upload your O-Level results slip! \n\n"
             "It seems that the previous photo was either unclear or invalid. Please upload a **clear and readable** "
@@ -224,38 +301,57 @@ def reupload_olevel_results(whatsapp, phone):
             "You are allowed to upload **up to 3 images**. Kindly use the upload button below to attach the new file. 📤"
         ),
     )
+)
 
 
-def confirm_upload_success(whatsapp, phone):
+def reupload_olevel_results(whatsapp, phone):
     """
-    Sends a confirmation message to the user after successful file upload.
+    Sends a message prompting the user to reupload their O-Level results slip
+    if the previous upload was not clear or invalid.
     """
-    whatsapp.send_text(
-        to=phone,
+    whatsapp.send_payload(REUPLOAD_OLEVEL_RESULTS_TEMPLATE.render(phone), phone)
+
+
+CONFIRM_UPLOAD_SUCCESS_TEMPLATE = MessageTemplate(
+    text_payload(
+        to=RECIPIENT,
         body=(
             "✅ Thank you! We've received your **O-Level results slip** successfully. 🎉\n\n"
             "Your application is moving forward, and we’ll be in touch if we need anything else. 😊"
         ),
     )
+)
 
 
-def notify_upload_issue(whatsapp, phone):
+def confirm_upload_success(whatsapp, phone):
     """
-    Sends a message to the user if there’s an issue with the uploaded file.
+    Sends a confirmation message to the user after successful file upload.
     """
-    whatsapp.send_text(
-        to=phone,
+    whatsapp.send_payload(CONFIRM_UPLOAD_SUCCESS_TEMPLATE.render(phone), phone)
+
+
+NOTIFY_UPLOAD_ISSUE_TEMPLATE = MessageTemplate(
+    text_payload(
+        to=RECIPIENT,
         body=(
             "⚠️ Oops! It seems there was an issue with the file you uploaded. 😞\n\n"
             "Please ensure the file is clear and in one of these formats: JPG, PNG, or PDF. 📂\n"
             "Try uploading your **O-Level results slip** again. 📤"
         ),
     )
+)
 
 
-def get_science_combinations_list(whatsapp, phone):
-    whatsapp.send_interactive_list(
-        to=phone,
+def notify_upload_issue(whatsapp, phone):
+    """
+    Sends a message to the user if there’s an issue with the uploaded file.
+    """
+    whatsapp.send_payload(NOTIFY_UPLOAD_ISSUE_TEMPLATE.render(phone), phone)
+
+
+GET_SCIENCE_COMBINATIONS_LIST_TEMPLATE = MessageTemplate(
+    interactive_list_payload(
+        to=RECIPIENT,
         body=(
             "🔬 **Choose Your Science Combinations for A-Level**\n\n"
             "Please select one of the predefined combinations or define your own custom combination. "
@@ -301,11 +397,16 @@ def get_science_combinations_list(whatsapp, phone):
             ),
         ],
     )
+)
 
 
-def request_custom_combination(whatsapp, phone):
-    whatsapp.send_text(
-        to=phone,
+def get_science_combinations_list(whatsapp, phone):
+    whatsapp.send_payload(GET_SCIENCE_COMBINATIONS_LIST_TEMPLATE.render(phone), phone)
+
+
+REQUEST_CUSTOM_COMBINATION_TEMPLATE = MessageTemplate(
+    text_payload(
+        to=RECIPIENT,
         body=(
             "📝 **Define Your Own A-Level Combination**\n\n"
             "Please type your desired combination of **three subjects** in the following format:\n"
@@ -316,11 +417,16 @@ def request_custom_combination(whatsapp, phone):
             "**Important:** Ensure you only include three subjects, separated by commas."
         ),
     )
+)
 
 
-def enrollment_continue_message(whatsapp, phone):
-    whatsapp.send_interactive_list(
-        to=phone,
+def request_custom_combination(whatsapp, phone):
+    whatsapp.send_payload(REQUEST_CUSTOM_COMBINATION_TEMPLATE.render(phone), phone)
+
+
+ENROLLMENT_CONTINUE_MESSAGE_TEMPLATE = MessageTemplate(
+    interactive_list_payload(
+        to=RECIPIENT,
         body=(
             "It seems you didn't complete your enrollment application. Would you like to continue? 🤔\n\n"
             "Choose an option below to proceed:"
@@ -342,11 +448,16 @@ def enrollment_continue_message(whatsapp, phone):
             ),
         ],
     )
+)
 
 
-def send_academic_images_reviewed_message(whatsapp, phone):
-    whatsapp.send_interactive_list(
-        to=phone,
+def enrollment_continue_message(whatsapp, phone):
+    whatsapp.send_payload(ENROLLMENT_CONTINUE_MESSAGE_TEMPLATE.render(phone), phone)
+
+
+ACADEMIC_IMAGES_REVIEWED_MESSAGE_TEMPLATE = MessageTemplate(
+    interactive_list_payload(
+        to=RECIPIENT,
         body="📚 Academic Images Reviewed\n\nYou have successfully reviewed your academic images. What would you like to do next?",
         button="Choose an option",
         sections=[
@@ -367,11 +478,16 @@ def send_academic_images_reviewed_message(whatsapp, phone):
             ),
         ],
     )
+)
 
 
-def request_preferred_combination(whatsapp, phone):
-    whatsapp.send_text(
-        to=phone,
+def send_academic_images_reviewed_message(whatsapp, phone):
+    whatsapp.send_payload(ACADEMIC_IMAGES_REVIEWED_MESSAGE_TEMPLATE.render(phone), phone)
+
+
+REQUEST_PREFERRED_COMBINATION_TEMPLATE = MessageTemplate(
+    text_payload(
+        to=RECIPIENT,
         body=(
             "📚 **Choose Your Preferred A-Level Combination**\n\n"
             "Kindly send your preferred combination of **three subjects** in the exact format below:\n"
@@ -382,11 +498,37 @@ def request_preferred_combination(whatsapp, phone):
             "**Note:** Double-check your selection to ensure you include only three subjects, separated by commas with no extra spaces between the subjects."
         ),
     )
+)
 
 
-def request_second_combination(whatsapp, phone):
-    whatsapp.send_text(
-        to=phone,
+def request_preferred_combination(whatsapp, phone):
+    whatsapp.send_payload(REQUEST_PREFERRED_COMBINATION_TEMPLATE.render(phone), phone)
+
+
+INVALID_COMBINATION_TEMPLATE = MessageTemplate(
+    text_payload(
+        to=RECIPIENT,
+        body=(
+            "⚠️ We couldn't read that combination. 😕\n\n"
+            "Please send exactly **three subjects**, separated by commas:\n"
+            "\n📌 *Subject1, Subject2, Subject3*\n"
+            "\nExample: Physics, Chemistry, Pure Maths"
+        ),
+    )
+)
+
+
+def send_invalid_combination_message(whatsapp, phone):
+    """
+    Asks the student to send a combination again when it was not three
+    comma-separated subjects.
+    """
+    whatsapp.send_payload(INVALID_COMBINATION_TEMPLATE.render(phone), phone)
+
+
+REQUEST_SECOND_COMBINATION_TEMPLATE = MessageTemplate(
+    text_payload(
+        to=RECIPIENT,
         body=(
             "📚 **Second A-Level Combination Option**\n\n"
             "Now, kindly provide your **second choice** of combination, in the format:\n"
@@ -397,11 +539,16 @@ def request_second_combination(whatsapp, phone):
             "**Note:** Make sure your second combination follows the same format as the first one, with no extra spaces between the subjects."
         ),
     )
+)
 
 
-def request_third_combination(whatsapp, phone):
-    whatsapp.send_text(
-        to=phone,
+def request_second_combination(whatsapp, phone):
+    whatsapp.send_payload(REQUEST_SECOND_COMBINATION_TEMPLATE.render(phone), phone)
+
+
+REQUEST_THIRD_COMBINATION_TEMPLATE = MessageTemplate(
+    text_payload(
+        to=RECIPIENT,
         body=(
             "📚 **Third A-Level Combination Option**\n\n"
             "Finally, please provide your **third choice** of combination, in the format:\n"
@@ -412,11 +559,16 @@ def request_third_combination(whatsapp, phone):
             "**Note:** Please ensure that your third combination is formatted just like the previous ones."
         ),
     )
+)
 
 
-def information_confirmation_message(whatsapp, phone):
-    whatsapp.send_interactive_list(
-        to=phone,
+def request_third_combination(whatsapp, phone):
+    whatsapp.send_payload(REQUEST_THIRD_COMBINATION_TEMPLATE.render(phone), phone)
+
+
+INFORMATION_CONFIRMATION_MESSAGE_TEMPLATE = MessageTemplate(
+    interactive_list_payload(
+        to=RECIPIENT,
         body=(
             "Please confirm that the information you've provided is accurate. 📝\n\n"
             "Take note that any information found to be a mismatch with the actual details will result in the application being considered invalid. ⚠️\n\n"
@@ -435,11 +587,16 @@ def information_confirmation_message(whatsapp, phone):
             ),
         ],
     )
+)
 
 
-def confirm_combination(whatsapp, phone):
-    whatsapp.send_interactive_list(
-        to=phone,
+def information_confirmation_message(whatsapp, phone):
+    whatsapp.send_payload(INFORMATION_CONFIRMATION_MESSAGE_TEMPLATE.render(phone), phone)
+
+
+CONFIRM_COMBINATION_TEMPLATE = MessageTemplate(
+    interactive_list_payload(
+        to=RECIPIENT,
         body=(
             "Please review and confirm the subject combination you selected. 🎓\n\n"
             "If the combination is correct, confirm to proceed. If you'd like to make changes, select the edit option. ⚙️\n\n"
@@ -462,11 +619,16 @@ def confirm_combination(whatsapp, phone):
             ),
         ],
     )
+)
 
 
-def edit_combination_message(whatsapp, phone):
-    whatsapp.send_interactive_list(
-        to=phone,
+def confirm_combination(whatsapp, phone):
+    whatsapp.send_payload(CONFIRM_COMBINATION_TEMPLATE.render(phone), phone)
+
+
+EDIT_COMBINATION_MESSAGE_TEMPLATE = MessageTemplate(
+    interactive_list_payload(
+        to=RECIPIENT,
         body=(
             "Please select the combination option you'd like to edit. 📝\n\n"
             "Choose an option below to proceed. If you're satisfied with the current combination, you can confirm it as well. ⚙️\n\n"
@@ -497,13 +659,18 @@ def edit_combination_message(whatsapp, phone):
             ),
         ],
     )
+)
 
 
-def lower_six_application_success_message(whatsapp, phone, username):
-    whatsapp.send_interactive_list(
-        to=phone,
+def edit_combination_message(whatsapp, phone):
+    whatsapp.send_payload(EDIT_COMBINATION_MESSAGE_TEMPLATE.render(phone), phone)
+
+
+LOWER_SIX_APPLICATION_SUCCESS_MESSAGE_TEMPLATE = MessageTemplate(
+    interactive_list_payload(
+        to=RECIPIENT,
         body=(
-            f"👋 Hello {username},\n\n"
+            f"👋 Hello {field('username')},\n\n"
             "We are pleased to inform you that your application for the Lower Six program has been successfully submitted! 🎉\n\n"
             "We are currently verifying your details, and our team will contact you shortly to finalize the next steps. 📲\n\n"
             "In the meantime, feel free to explore the options below for additional assistance. 😊"
@@ -537,3 +704,11 @@ def lower_six_application_success_message(whatsapp, phone, username):
             ),
         ],
     )
+)
+
+
+def lower_six_application_success_message(whatsapp, phone, username):
+    whatsapp.send_payload(
+        LOWER_SIX_APPLICATION_SUCCESS_MESSAGE_TEMPLATE.render(phone, username=username),
+        phone,
+    )
@@ -0,0 +1,44 @@
+import json
+import re
+
+# Placeholders are written into a message body as @@name@@ and replaced at send time
+PLACEHOLDER = re.compile(r"@@(\w+)@@")
+RECIPIENT = "@@to@@"
+
+
+def field(name):
+    """
+    Returns the placeholder for a dynamic field, for use inside message text.
+    """
+    return f"@@{name}@@"
+
+
+class MessageTemplate:
+    """
+    A Graph API message body serialized to JSON once, when the module is
+    imported. Sending only escapes the recipient and any dynamic fields and
+    joins them with the pre-encoded chunks, instead of rebuilding the
+    ListSection/SectionRow objects and re-serializing the whole body per send.
+    """
+
+    def __init__(self, payload):
+        serialized = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+        parts = PLACEHOLDER.split(serialized)
+        # Even indexes are literal JSON, odd indexes are field names
+        self.chunks = [part.encode("utf-8") for part in parts[0::2]]
+        self.fields = parts[1::2]
+
+    def render(self, to, **values):
+        """
+        Returns the JSON body for `to` as bytes, ready for send_payload().
+        """
+        values["to"] = to
+        out = [self.chunks[0]]
+        for name, chunk in zip(self.fields, self.chunks[1:]):
+            # json.dumps escapes quotes, backslashes and control characters; the
+            # surrounding quotes are already part of the template
+            out.append(
+                json.dumps(str(values[name]), ensure_ascii=False)[1:-1].encode("utf-8")
+            )
+            out.append(chunk)
+        return b"".join(out)
@@ -1,4 +1,20 @@
-from sqlalchemy import Column, Integer, String, Date, ForeignKey
+from datetime import datetime
+
+from sqlalchemy import (
+    Boolean,
+    Column,
+    Integer,
+    String,
+    Text,
+    Date,
+    DateTime,
+    ForeignKey,
+    Index,
+    UniqueConstraint,
+    false,
+    func,
+    literal_column,
+)
 from sqlalchemy.ext.declarative import declarative_base
 
 Base = declarative_base()
@@ -13,6 +29,10 @@ class User(Base):
 
 class Student(Base):
     __tablename__ = "students"
+    __table_args__ = (
+        Index("ix_students_state_id", "state", "id"),
+        Index("ix_students_gender_id", "gender", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     whatsapp_number = Column(String, unique=True, index=True, nullable=False)
@@ -24,6 +44,12 @@ class Student(Base):
     address = Column(String, nullable=True)  # Address
 
 
+# The /api/students name sort; students without a name sort first. Queries must
+# use this exact expression for the index below to serve them.
+STUDENT_SORT_NAME = func.coalesce(Student.name, literal_column("''"))
+Index("ix_students_sort_name", STUDENT_SORT_NAME, Student.id)
+
+
 class StudentAcademicHistory(Base):
     __tablename__ = "student_academic_history"
 
@@ -62,6 +88,9 @@ class StudentAcademicHistory(Base):
     symbol13 = Column(String, nullable=True)
     subject14 = Column(String, nullable=True)
     symbol14 = Column(String, nullable=True)
+    # Set once the upload confirmation / upload limit message has been queued
+    confirmation_sent = Column(Boolean, nullable=False, default=False, server_default=false())
+    error_message_sent = Column(Boolean, nullable=False, default=False, server_default=false())
 
 
 class SubjectCombination(Base):
@@ -94,3 +123,200 @@ class SubjectCombination(Base):
     suggested_subject1 = Column(String, nullable=True)
     suggested_subject2 = Column(String, nullable=True)
     suggested_subject3 = Column(String, nullable=True)
+
+
+class ProcessedMessage(Base):
+    __tablename__ = "processed_messages"
+
+    id = Column(Integer, primary_key=True, index=True)
+    message_id = Column(String, nullable=False, unique=True, index=True)  # wamid
+    processed_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+
+class WebhookInboxEntry(Base):
+    __tablename__ = "webhook_inbox"
+
+    # Raw webhook bodies, kept from the moment they are acknowledged until every
+    # message in them has been handled
+    id = Column(Integer, primary_key=True, index=True)
+    body = Column(Text, nullable=False)
+    received_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    # pending until handled; failed once a message in it kept failing
+    status = Column(String, nullable=False, default="pending", server_default="pending")
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    error = Column(Text, nullable=True)
+
+
+class OutboundMessageStatus(Base):
+    __tablename__ = "message_statuses"
+
+    id = Column(Integer, primary_key=True, index=True)
+    message_id = Column(String, nullable=False, unique=True, index=True)  # wamid
+    recipient_phone = Column(String, nullable=True, index=True)
+    status = Column(String, nullable=False)  # sent, delivered, read or failed
+    status_rank = Column(Integer, nullable=False, default=0)  # orders the statuses
+    status_timestamp = Column(Integer, nullable=True)  # Unix time reported by Meta
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+class DeadLetterMessage(Base):
+    __tablename__ = "dead_letter_messages"
+
+    id = Column(Integer, primary_key=True, index=True)
+    recipient_phone = Column(String, nullable=False, index=True)
+    payload = Column(Text, nullable=False)  # JSON body that could not be sent
+    status_code = Column(Integer, nullable=True)  # Last HTTP status, if any
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+
+class Broadcast(Base):
+    __tablename__ = "broadcasts"
+
+    id = Column(Integer, primary_key=True, index=True)
+    message = Column(Text, nullable=False)  # May contain {name} and {whatsapp_number}
+    target_field = Column(String, nullable=False)  # state or subject_combination_state
+    target_value = Column(String, nullable=False)
+    # Approved WhatsApp template sent with the message as its {{1}}; free-form
+    # text when None
+    template_name = Column(String, nullable=True)
+    template_language = Column(String, nullable=True)
+    status = Column(String, nullable=False, default="pending", index=True)
+    total = Column(Integer, nullable=False, default=0)
+    sent = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
+    created_by = Column(String, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+
+class BroadcastRecipient(Base):
+    __tablename__ = "broadcast_recipients"
+    __table_args__ = (
+        UniqueConstraint("broadcast_id", "whatsapp_number"),
+        Index("ix_broadcast_recipients_broadcast_id_status", "broadcast_id", "status"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    broadcast_id = Column(Integer, ForeignKey("broadcasts.id"), nullable=False)
+    whatsapp_number = Column(String, nullable=False)
+    name = Column(String, nullable=True)
+    status = Column(String, nullable=False, default="pending")  # pending, sent or failed
+    message_id = Column(String, nullable=True, index=True)  # wamid of the sent message
+    error = Column(Text, nullable=True)
+    updated_at = Column(DateTime, nullable=True)
+
+
+class OutboxMessage(Base):
+    __tablename__ = "outbox_messages"
+    __table_args__ = (Index("ix_outbox_messages_status_id", "status", "id"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    recipient_phone = Column(String, nullable=False, index=True)
+    payload = Column(Text, nullable=False)  # JSON body for the messages endpoint
+    status = Column(String, nullable=False, default="pending")  # pending, sending, sent or failed
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+    # Held in the outbox until then: a requested delay, the backoff before a
+    # retry, or the lease of the dispatcher sending it
+    not_before = Column(DateTime, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    # Names a message that may be rewritten while it waits to be sent, e.g. the
+    # upload confirmation, which counts the images of a burst
+    collapse_key = Column(String, nullable=True)
+
+
+class MediaDownload(Base):
+    __tablename__ = "media_downloads"
+    __table_args__ = (
+        Index("ix_media_downloads_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    media_id = Column(String, nullable=False, unique=True, index=True)
+    message_id = Column(String, nullable=True)  # wamid of the image message
+    whatsapp_number = Column(String, nullable=True, index=True)
+    filename = Column(String, nullable=False)  # Saved as <filename><ext>
+    status = Column(String, nullable=False, default="pending")  # pending, downloading, done or failed
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    path = Column(String, nullable=True)
+    mime_type = Column(String, nullable=True)
+    size = Column(Integer, nullable=True)
+    sha256 = Column(String, nullable=True)  # Hex digest computed while writing
+    expected_sha256 = Column(String, nullable=True)  # As reported in the webhook
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = Column(DateTime, nullable=True)
+
+
+class MediaObject(Base):
+    __tablename__ = "media_objects"
+
+    id = Column(Integer, primary_key=True, index=True)
+    sha256 = Column(String, nullable=False, unique=True, index=True)  # Hex digest
+    size = Column(Integer, nullable=False)
+    mime_type = Column(String, nullable=True)
+    path = Column(String, nullable=False)  # /media/objects/ab/cd/<sha256><ext>
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+class MediaRendition(Base):
+    __tablename__ = "media_renditions"
+    __table_args__ = (UniqueConstraint("sha256", "kind"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    sha256 = Column(String, nullable=False, index=True)  # Hash of the original
+    kind = Column(String, nullable=False)  # thumb or display
+    path = Column(String, nullable=False)
+    mime_type = Column(String, nullable=False)
+    width = Column(Integer, nullable=False)
+    height = Column(Integer, nullable=False)
+    size = Column(Integer, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+class ImageFingerprint(Base):
+    __tablename__ = "image_fingerprints"
+
+    id = Column(Integer, primary_key=True, index=True)
+    sha256 = Column(String, nullable=False, unique=True, index=True)  # MediaObject hash
+    dhash = Column(String, nullable=False)  # 64-bit difference hash, as hex
+    # The hash split into four 16-bit bands, each indexed for candidate lookups
+    band0 = Column(Integer, nullable=False, index=True)
+    band1 = Column(Integer, nullable=False, index=True)
+    band2 = Column(Integer, nullable=False, index=True)
+    band3 = Column(Integer, nullable=False, index=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+class AcademicResult(Base):
+    __tablename__ = "academic_results"
+    __table_args__ = (
+        UniqueConstraint("whatsapp_number", "position"),
+        Index("ix_academic_results_subject_points", "subject", "points"),
+    )
+
+    # One O-level result per row, kept alongside subject1..14/symbol1..14 of
+    # StudentAcademicHistory so results can be filtered and counted in SQL
+    id = Column(Integer, primary_key=True, index=True)
+    whatsapp_number = Column(String, nullable=False, index=True)  # Link to student
+    position = Column(Integer, nullable=False)  # 1-based, in the order given
+    subject = Column(String, nullable=False)  # Indexed with points, below
+    grade = Column(String, nullable=False, index=True)
+    points = Column(Integer, nullable=True)  # A=5 ... E=1, F/U=0; None if unknown
+
+
+class DashboardCounter(Base):
+    __tablename__ = "dashboard_counters"
+    __table_args__ = (UniqueConstraint("name", "key"),)
+
+    # Kept up to date by db_operations in the same transaction as the rows they
+    # count, and rebuilt from scratch by dashboard.CounterReconciler
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, nullable=False)  # e.g. "students_by_state"
+    key = Column(String, nullable=False)  # e.g. a state or a grade letter
+    value = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,162 @@
+import json
+import random
+import threading
+import time
+
+import requests
+
+from models import DeadLetterMessage
+
+# Graph API responses worth retrying: throttling and transient server errors
+RETRIABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket allowing `rate` acquisitions per second on average,
+    with bursts of up to `capacity`.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Blocks until a token is available, then takes it.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated) * self.rate
+                )
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class OutboundQueue:
+    """
+    Sends Graph API message bodies at no more than the configured rate per
+    PHONE_NUMBER_ID. Retriable failures (429, 5xx, timeouts, connection errors)
+    are retried with jittered exponential backoff; permanent failures, or
+    messages that run out of attempts, are written to dead_letter_messages.
+
+    Used by the outbox dispatcher and the broadcast runner, which bring their
+    own threads.
+    """
+
+    def __init__(
+        self,
+        client,
+        session_factory,
+        rate=80,
+        max_attempts=5,
+        base_delay=0.5,
+        max_delay=30,
+    ):
+        self.client = client
+        self.session_factory = session_factory
+        self.rate = rate
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._buckets = {}
+        self._buckets_lock = threading.Lock()
+
+    def bucket(self, phone_number_id):
+        with self._buckets_lock:
+            bucket = self._buckets.get(phone_number_id)
+            if bucket is None:
+                bucket = TokenBucket(self.rate)
+                self._buckets[phone_number_id] = bucket
+            return bucket
+
+    def backoff(self, attempt, retry_after=None):
+        """
+        Full-jitter exponential backoff, honouring a Retry-After header if sent.
+        """
+        if retry_after:
+            try:
+                return min(float(retry_after), self.max_delay)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+    def attempt(self, payload):
+        """
+        Makes one rate-limited attempt to send a message body.
+
+        Returns:
+        Tuple[bool, bool, dict]: Whether the message was sent, whether a failure
+        is worth retrying, and the response body. On failure the body holds the
+        error, the status code and the Retry-After header, if any.
+        """
+        self.bucket(self.client.phone_number_id).acquire()
+        try:
+            res = self.client.post_payload(payload)
+        except (requests.Timeout, requests.ConnectionError) as e:
+            return False, True, {"error": str(e), "status_code": None}
+        if res.status_code == 200:
+            return True, False, res.json()
+        return (
+            False,
+            res.status_code in RETRIABLE_STATUS_CODES,
+            {
+                "error": res.text,
+                "status_code": res.status_code,
+                "retry_after": res.headers.get("Retry-After"),
+            },
+        )
+
+    def deliver(self, payload, to):
+        """
+        Sends one message body, retrying retriable failures. Blocks through the
+        backoff between attempts.
+
+        Returns:
+        Tuple[bool, dict]: Whether the message was sent, and the last response body.
+        """
+        for attempt in range(1, self.max_attempts + 1):
+            ok, retriable, body = self.attempt(payload)
+            if ok:
+                return True, body
+            if not retriable:
+                break
+            if attempt < self.max_attempts:
+                time.sleep(self.backoff(attempt, body.get("retry_after")))
+
+        error, status_code = body["error"], body["status_code"]
+        print(f"Giving up on message to {to} after {attempt} attempts: {error}")
+        self.dead_letter(payload, to, status_code, error, attempt)
+        return False, {"error": error, "status_code": status_code}
+
+    def dead_letter(self, payload, to, status_code, error, attempts):
+        if isinstance(payload, bytes):
+            payload = payload.decode("utf-8")
+        elif not isinstance(payload, str):
+            payload = json.dumps(payload)
+        db = self.session_factory()
+        try:
+            db.add(
+                DeadLetterMessage(
+                    recipient_phone=to,
+                    payload=payload,
+                    status_code=status_code,
+                    error=error,
+                    attempts=attempts,
+                )
+            )
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"Failed to dead-letter message to {to}: {e}")
+        finally:
+            db.close()
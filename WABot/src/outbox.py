@@ -0,0 +1,366 @@
+import json
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, exists, or_, select, update
+from sqlalchemy.orm import aliased
+
+from models import OutboxMessage
+from whatsapp_client import text_payload, interactive_list_payload
+
+
+class OutboxWhatsApp:
+    """
+    Stand-in for the WhatsApp client inside a unit of work, in the helpers of
+    messages/option_messages.py. send_* calls add an outbox row to the caller's
+    session instead of sending, so a reply is only sent if the state change it
+    belongs to commits. OutboxDispatcher sends it afterwards. Anything else
+    (e.g. download_media) is passed through to the real client.
+    """
+
+    def __init__(self, db, outbound, delay=None, collapse_key=None, revise=False):
+        self.db = db
+        self.outbound = outbound
+        self.delay = delay
+        self.collapse_key = collapse_key
+        self.revise = revise
+
+    def deferred(self, seconds, collapse_key=None):
+        """
+        Returns a client whose messages are held in the outbox for `seconds`
+        after commit. Replies sent without a delay in the meantime go first.
+        Messages queued with a `collapse_key` can be rewritten with revising()
+        until they are sent.
+        """
+        return OutboxWhatsApp(
+            self.db, self.outbound, timedelta(seconds=seconds), collapse_key
+        )
+
+    def revising(self, seconds, collapse_key):
+        """
+        Returns a client whose messages replace the payload of the recipient's
+        unsent `collapse_key` message, and hold it for another `seconds`,
+        instead of queueing a new one. Nothing is sent if no such message is
+        waiting any more.
+        """
+        return OutboxWhatsApp(
+            self.db, self.outbound, timedelta(seconds=seconds), collapse_key, True
+        )
+
+    def send_payload(self, payload, to):
+        if isinstance(payload, bytes):
+            payload = payload.decode("utf-8")
+        elif not isinstance(payload, str):
+            payload = json.dumps(payload, ensure_ascii=False)
+        not_before = datetime.utcnow() + self.delay if self.delay else None
+        if self.revise:
+            # Never attempted, so no dispatcher is sending it
+            result = self.db.execute(
+                update(OutboxMessage)
+                .where(
+                    OutboxMessage.recipient_phone == to,
+                    OutboxMessage.collapse_key == self.collapse_key,
+                    OutboxMessage.status == "pending",
+                    OutboxMessage.attempts == 0,
+                )
+                .values(payload=payload, not_before=not_before)
+                .execution_options(synchronize_session=False)
+            )
+            return result.rowcount > 0, {"queued": result.rowcount > 0}
+        self.db.add(
+            OutboxMessage(
+                recipient_phone=to,
+                payload=payload,
+                not_before=not_before,
+                collapse_key=self.collapse_key,
+            )
+        )
+        return True, {"queued": True}
+
+    def send_text(self, to, body, preview_url=True, context_message_id=None):
+        return self.send_payload(
+            text_payload(to, body, preview_url, context_message_id), to
+        )
+
+    def send_interactive_list(
+        self, to, body, button, sections, header=None, footer=None
+    ):
+        return self.send_payload(
+            interactive_list_payload(to, body, button, sections, header, footer), to
+        )
+
+    def __getattr__(self, name):
+        return getattr(self.outbound.client, name)
+
+
+class OutboxDispatcher:
+    """
+    Drains outbox_messages in id order on a background thread. A batch is
+    claimed in a short transaction (marked "sending", with a lease in
+    not_before), then sent outside it. Messages are grouped by recipient;
+    groups are sent in parallel, each in order, and each group commits its
+    results as soon as it is done.
+
+    Every message gets one OutboundQueue.attempt() per dispatch, so a recipient
+    whose sends keep failing cannot hold up anyone else. A retriable failure
+    puts the message back as pending with an exponential backoff in not_before;
+    that recipient's later messages wait behind it. A message that fails
+    permanently, or runs out of attempts, is dead-lettered.
+
+    A dispatcher that dies mid-batch leaves its messages "sending"; they are
+    claimed again when the lease runs out, so delivery is at least once.
+    """
+
+    def __init__(
+        self,
+        outbound,
+        session_factory,
+        batch_size=100,
+        workers=8,
+        poll_interval=1.0,
+        retention_days=7,
+        lease_seconds=120,
+    ):
+        self.outbound = outbound
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.retention = timedelta(days=retention_days)
+        self.lease = timedelta(seconds=lease_seconds)
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._executor = None
+        self._batches = 0
+
+    def notify(self):
+        """
+        Wakes the dispatcher after a unit of work that wrote to the outbox commits.
+        """
+        self._wake.set()
+
+    def claim(self):
+        """
+        Claims the next batch of due messages and commits the claim.
+
+        Returns:
+        List[Row]: id, recipient_phone, payload and attempts of each message.
+        """
+        now = datetime.utcnow()
+        # An earlier message to the same recipient that is being sent, or is
+        # waiting to be retried, must go first
+        earlier = aliased(OutboxMessage)
+        held_back = exists().where(
+            earlier.recipient_phone == OutboxMessage.recipient_phone,
+            earlier.id < OutboxMessage.id,
+            earlier.not_before > now,
+            or_(
+                earlier.status == "sending",
+                and_(earlier.status == "pending", earlier.attempts > 0),
+            ),
+        )
+        db = self.session_factory()
+        try:
+            rows = db.execute(
+                select(
+                    OutboxMessage.id,
+                    OutboxMessage.recipient_phone,
+                    OutboxMessage.payload,
+                    OutboxMessage.attempts,
+                )
+                .where(
+                    # "sending" rows here were claimed by a dispatcher that died
+                    OutboxMessage.status.in_(("pending", "sending")),
+                    or_(
+                        OutboxMessage.not_before.is_(None),
+                        OutboxMessage.not_before <= now,
+                    ),
+                    ~held_back,
+                )
+                .order_by(OutboxMessage.id)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            ).all()
+            if rows:
+                db.execute(
+                    update(OutboxMessage)
+                    .where(OutboxMessage.id.in_([row.id for row in rows]))
+                    .values(status="sending", not_before=now + self.lease)
+                )
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        return rows
+
+    def result(self, row, ok, retriable, body):
+        attempts = row.attempts + 1
+        now = datetime.utcnow()
+        if ok:
+            return {
+                "id": row.id,
+                "status": "sent",
+                "attempts": attempts,
+                "not_before": None,
+                "error": None,
+                "sent_at": now,
+            }
+        error = str(body.get("error"))
+        if retriable and attempts < self.outbound.max_attempts:
+            delay = self.outbound.backoff(attempts, body.get("retry_after"))
+            return {
+                "id": row.id,
+                "status": "pending",
+                "attempts": attempts,
+                "not_before": now + timedelta(seconds=delay),
+                "error": error,
+                "sent_at": None,
+            }
+        print(
+            f"Giving up on message to {row.recipient_phone} after {attempts} "
+            f"attempts: {error}"
+        )
+        self.outbound.dead_letter(
+            row.payload, row.recipient_phone, body.get("status_code"), error, attempts
+        )
+        return {
+            "id": row.id,
+            "status": "failed",
+            "attempts": attempts,
+            "not_before": None,
+            "error": error,
+            "sent_at": None,
+        }
+
+    def send_group(self, rows):
+        """
+        Makes one attempt at each of a recipient's messages, in order, and
+        commits the results. After a message that will be retried, the rest are
+        put back as pending without being tried.
+        """
+        results = []
+        retrying = False
+        for row in rows:
+            if retrying:
+                results.append(
+                    {
+                        "id": row.id,
+                        "status": "pending",
+                        "attempts": row.attempts,
+                        "not_before": None,
+                        "error": None,
+                        "sent_at": None,
+                    }
+                )
+                continue
+            try:
+                ok, retriable, body = self.outbound.attempt(row.payload)
+            except Exception as e:
+                ok, retriable, body = False, False, {"error": str(e)}
+            result = self.result(row, ok, retriable, body)
+            retrying = result["status"] == "pending"
+            results.append(result)
+
+        db = self.session_factory()
+        try:
+            db.execute(update(OutboxMessage), results)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        return results
+
+    def dispatch(self):
+        """
+        Sends one batch of due outbox messages.
+
+        Returns:
+        int: The number of messages claimed.
+        """
+        rows = self.claim()
+        if not rows:
+            return 0
+
+        groups = OrderedDict()
+        for row in rows:
+            groups.setdefault(row.recipient_phone, []).append(row)
+        if self._executor is None or len(groups) == 1:
+            for group in groups.values():
+                self.send_group(group)
+        else:
+            futures = [
+                self._executor.submit(self.send_group, group)
+                for group in groups.values()
+            ]
+            for future in futures:
+                try:
+                    future.result()
+                except Exception as e:
+                    # Its messages stay "sending" and are retried after the lease
+                    print(f"Outbox group failed: {e}")
+
+        self._batches += 1
+        if self._batches % 1000 == 0:
+            self.purge_sent()
+        return len(rows)
+
+    def purge_sent(self):
+        """
+        Deletes sent outbox messages older than the retention window.
+        """
+        cutoff = datetime.utcnow() - self.retention
+        db = self.session_factory()
+        try:
+            deleted = (
+                db.query(OutboxMessage)
+                .filter(OutboxMessage.status == "sent", OutboxMessage.sent_at < cutoff)
+                .delete()
+            )
+            db.commit()
+            print(f"Purged {deleted} sent outbox messages")
+        finally:
+            db.close()
+
+    def start(self):
+        self._stopping.clear()
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="outbox-send"
+        )
+        self._thread = threading.Thread(target=self._run, name="outbox", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Sends what is pending in the outbox, then stops.
+        """
+        self._stopping.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def _run(self):
+        while True:
+            try:
+                handled = self.dispatch()
+            except Exception as e:
+                print(f"Outbox dispatch failed: {e}")
+                handled = 0
+            # Keep draining while there is a backlog; otherwise sleep until
+            # notified or the poll interval passes.
+            if handled == self.batch_size:
+                continue
+            if self._stopping.is_set():
+                break
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
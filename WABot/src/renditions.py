@@ -0,0 +1,163 @@
+import os
+import queue
+import threading
+from datetime import datetime
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+from sqlalchemy import func, select
+
+from database import upsert
+from media_store import MediaStore, MEDIA_URL_PREFIX
+from models import MediaObject, MediaRendition
+
+# Longest edge in pixels and JPEG quality of each rendition, largest first
+RENDITIONS = {
+    "display": (1600, 82),
+    "thumb": (320, 75),
+}
+
+
+def get_rendition(db, sha256, kind):
+    return db.scalar(
+        select(MediaRendition).where(
+            MediaRendition.sha256 == sha256, MediaRendition.kind == kind
+        )
+    )
+
+
+class RenditionBuilder:
+    """
+    Produces a display-sized JPEG and a thumbnail for each stored image, on
+    background threads. They are written next to the originals, under
+    <store root>/renditions/, and recorded in media_renditions.
+
+    JPEGs are decoded in draft mode at the smallest scale that still covers the
+    largest rendition, and each smaller rendition is resized from the previous
+    one rather than from the original, so a 12 MP photo is never fully decoded.
+    Images pending on startup (stored but without renditions) are queued again.
+    """
+
+    def __init__(self, session_factory, store=None, workers=2):
+        self.session_factory = session_factory
+        self.store = store or MediaStore()
+        self.workers = workers
+        self._queue = queue.Queue()
+        self._threads = []
+
+    def submit(self, sha256):
+        """
+        Queues renditions for a stored media object. Safe to call more than once.
+        """
+        self._queue.put(sha256)
+
+    def render(self, source):
+        """
+        Builds every rendition of the image at `source`.
+
+        Returns:
+        Dict[str, Tuple[str, int, int, int]]: kind -> (temp path, width, height, size).
+        """
+        rendered = {}
+        with Image.open(source) as image:
+            largest = max(edge for edge, _ in RENDITIONS.values())
+            image.draft("RGB", (largest, largest))
+            image = ImageOps.exif_transpose(image).convert("RGB")
+            for kind, (edge, quality) in RENDITIONS.items():
+                image.thumbnail((edge, edge), Image.LANCZOS)
+                fd, tmp_path = self.store.temp_file()
+                with os.fdopen(fd, "wb") as f:
+                    image.save(
+                        f, "JPEG", quality=quality, optimize=True, progressive=True
+                    )
+                    f.flush()
+                    os.fsync(f.fileno())
+                rendered[kind] = (
+                    tmp_path,
+                    image.width,
+                    image.height,
+                    os.path.getsize(tmp_path),
+                )
+        return rendered
+
+    def build(self, sha256):
+        db = self.session_factory()
+        try:
+            media = db.scalar(select(MediaObject).where(MediaObject.sha256 == sha256))
+            if media is None or not (media.mime_type or "").startswith("image/"):
+                return
+            try:
+                rendered = self.render(self.store.local_path(media.path))
+            except (OSError, UnidentifiedImageError, Image.DecompressionBombError) as e:
+                print(f"Could not build renditions of {sha256}: {e}")
+                return
+
+            for kind, (tmp_path, width, height, size) in rendered.items():
+                relative = self.store.rendition_relative_path(sha256, kind)
+                path = os.path.join(self.store.root, relative)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(tmp_path, path)
+                db.execute(
+                    upsert(MediaRendition.__table__)
+                    .values(
+                        sha256=sha256,
+                        kind=kind,
+                        path=MEDIA_URL_PREFIX + relative,
+                        mime_type="image/jpeg",
+                        width=width,
+                        height=height,
+                        size=size,
+                        created_at=datetime.utcnow(),
+                    )
+                    .on_conflict_do_nothing(index_elements=["sha256", "kind"])
+                )
+            db.commit()
+            print(f"Built renditions of {sha256}")
+        finally:
+            db.close()
+
+    def queue_missing(self):
+        """
+        Queues every stored image that does not have all of its renditions.
+        """
+        db = self.session_factory()
+        try:
+            missing = db.scalars(
+                select(MediaObject.sha256)
+                .outerjoin(MediaRendition, MediaRendition.sha256 == MediaObject.sha256)
+                .where(MediaObject.mime_type.like("image/%"))
+                .group_by(MediaObject.sha256)
+                .having(func.count(MediaRendition.id) < len(RENDITIONS))
+            ).all()
+        finally:
+            db.close()
+        for sha256 in missing:
+            self.submit(sha256)
+        return len(missing)
+
+    def start(self):
+        self._threads = [
+            threading.Thread(target=self._run, name=f"renditions-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+        queued = self.queue_missing()
+        if queued:
+            print(f"Queued renditions for {queued} stored images")
+
+    def stop(self):
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def _run(self):
+        while True:
+            sha256 = self._queue.get()
+            if sha256 is None:
+                break
+            try:
+                self.build(sha256)
+            except Exception as e:
+                print(f"Rendition worker failed on {sha256}: {e}")
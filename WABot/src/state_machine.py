@@ -0,0 +1,115 @@
+from wa_cloud_py.messages.types import (
+    TextMessage,
+    ImageMessage,
+    DocumentMessage,
+    AudioMessage,
+    VideoMessage,
+    LocationMessage,
+    InteractiveListMessage,
+    InteractiveButtonMessage,
+)
+
+# Wildcard for handlers that apply whatever state the student is in
+ANY_STATE = "*"
+
+MESSAGE_TYPES = {
+    TextMessage: "text",
+    ImageMessage: "image",
+    DocumentMessage: "document",
+    AudioMessage: "audio",
+    VideoMessage: "video",
+    LocationMessage: "location",
+    InteractiveListMessage: "list_reply",
+    InteractiveButtonMessage: "button_reply",
+}
+
+
+def message_type_of(message):
+    return MESSAGE_TYPES.get(type(message))
+
+
+class Transition:
+    """
+    A registered handler together with the state it moves the student to.
+    """
+
+    def __init__(self, state, message_type, reply_id, handler, next_state):
+        self.state = state
+        self.message_type = message_type
+        self.reply_id = reply_id
+        self.handler = handler
+        self.next_state = next_state
+
+    def to_dict(self):
+        return {
+            "state": self.state,
+            "message_type": self.message_type,
+            "reply_id": self.reply_id,
+            "next_state": self.next_state,
+            "handler": self.handler.__name__,
+        }
+
+
+class StateMachine:
+    """
+    Registry of (state, message type, reply id) -> handler entries, built once at
+    import time. Dispatch is at most three dictionary lookups, in order:
+
+    1. the exact (state, message type, reply id) entry,
+    2. a reply id entry registered for any state,
+    3. a (state, message type) entry that ignores the reply id.
+    """
+
+    def __init__(self):
+        self._transitions = {}
+
+    def on(self, state, message_type, reply_id=None, next_state=None):
+        """
+        Decorator registering a handler. `next_state` declares the transition the
+        handler performs; it is applied by the caller when the handler accepts
+        the message.
+        """
+
+        def register(handler):
+            key = (state, message_type, reply_id)
+            if key in self._transitions:
+                raise ValueError(f"Duplicate transition registered for {key}")
+            self._transitions[key] = Transition(
+                state, message_type, reply_id, handler, next_state
+            )
+            return handler
+
+        return register
+
+    def resolve(self, state, message_type, reply_id=None):
+        transitions = self._transitions
+        if reply_id is not None:
+            transition = transitions.get((state, message_type, reply_id))
+            if transition is None:
+                transition = transitions.get((ANY_STATE, message_type, reply_id))
+            if transition is not None:
+                return transition
+        transition = transitions.get((state, message_type, None))
+        if transition is None:
+            transition = transitions.get((ANY_STATE, message_type, None))
+        return transition
+
+    def transitions(self):
+        """
+        Returns the transition table as a list of dictionaries.
+        """
+        return [transition.to_dict() for transition in self._transitions.values()]
+
+    def to_dot(self):
+        """
+        Renders the transition table as a Graphviz DOT digraph.
+        """
+        lines = ["digraph conversation {", "    rankdir=LR;"]
+        for transition in self._transitions.values():
+            label = transition.message_type
+            if transition.reply_id:
+                label += f":{transition.reply_id}"
+            target = transition.next_state or transition.state
+            lines.append(f'    "{transition.state}" -> "{target}" [label="{label}"];')
+        lines.append("}")
+        return "\n".join(lines)
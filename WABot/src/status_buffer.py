@@ -0,0 +1,120 @@
+import threading
+from datetime import datetime
+
+from database import upsert
+from models import OutboundMessageStatus
+
+# Statuses only move forward; a late "sent" must not overwrite "read"
+STATUS_RANKS = {"sent": 1, "delivered": 2, "read": 3, "failed": 4}
+
+
+class StatusBuffer:
+    """
+    Collects delivery/read status callbacks in memory and writes them with one
+    batched upsert per flush. Repeated statuses for the same message are
+    coalesced before they reach the database, and adding a status never blocks
+    on I/O, so it is safe to call from the event loop.
+    """
+
+    def __init__(self, session_factory, max_batch=500, flush_interval=1.0):
+        self.session_factory = session_factory
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self._pending = {}  # message_id -> row
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def add(self, status):
+        """
+        Buffers a wa_cloud_py MessageStatus.
+        """
+        if not status.id:
+            return
+        rank = STATUS_RANKS.get(status.status, 0)
+        row = {
+            "message_id": status.id,
+            "recipient_phone": status.recipient_phone,
+            "status": status.status,
+            "status_rank": rank,
+            "status_timestamp": int(status.timestamp) if status.timestamp else None,
+        }
+        with self._lock:
+            current = self._pending.get(status.id)
+            if current is None or rank >= current["status_rank"]:
+                self._pending[status.id] = row
+            pending = len(self._pending)
+        if pending >= self.max_batch:
+            self._wake.set()
+
+    def flush(self):
+        """
+        Writes every buffered status in a single transaction.
+
+        Returns:
+        int: The number of statuses written.
+        """
+        with self._lock:
+            rows, self._pending = list(self._pending.values()), {}
+        if not rows:
+            return 0
+
+        now = datetime.utcnow()
+        for row in rows:
+            row["updated_at"] = now
+        statement = upsert(OutboundMessageStatus.__table__)
+        statement = statement.on_conflict_do_update(
+            index_elements=["message_id"],
+            set_={
+                "status": statement.excluded.status,
+                "status_rank": statement.excluded.status_rank,
+                "status_timestamp": statement.excluded.status_timestamp,
+                "updated_at": statement.excluded.updated_at,
+            },
+            where=OutboundMessageStatus.status_rank < statement.excluded.status_rank,
+        )
+        db = self.session_factory()
+        try:
+            db.execute(statement, rows)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"Failed to write {len(rows)} message statuses, will retry: {e}")
+            self.requeue(rows)
+            return 0
+        finally:
+            db.close()
+        return len(rows)
+
+    def requeue(self, rows):
+        """
+        Puts rows that could not be written back in the buffer for the next
+        flush, unless a higher-ranked status for the message arrived meanwhile.
+        """
+        with self._lock:
+            for row in rows:
+                current = self._pending.get(row["message_id"])
+                if current is None or row["status_rank"] > current["status_rank"]:
+                    self._pending[row["message_id"]] = row
+
+    def start(self):
+        self._stopping.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="status-buffer", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
@@ -0,0 +1,78 @@
+import os
+import sys
+import tempfile
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import db_config  # noqa: E402
+
+# Importing db_operations creates every table in the configured database; point
+# it at a scratch file before database.py reads the URL
+db_config.DATABASE_URL = (
+    f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='wabot-tests-'), 'test.db')}"
+)
+
+from dashboard import track_dashboard_version  # noqa: E402
+from models import Base  # noqa: E402
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    """
+    A sessionmaker bound to a new SQLite database with every table created,
+    whose sessions move the dashboard version as the app's do.
+    """
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'test.db'}", connect_args={"check_same_thread": False}
+    )
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    track_dashboard_version(session_factory)
+    yield session_factory
+    engine.dispose()
+
+
+@pytest.fixture
+def db(session_factory):
+    session = session_factory()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def app_module(monkeypatch):
+    """
+    The FastAPI app module, imported with placeholder WhatsApp credentials. Its
+    background workers use the scratch database configured above.
+    """
+    for name in ("VERIFY_TOKEN", "ACCESS_TOKEN", "PHONE_NUMBER_ID"):
+        monkeypatch.setenv(name, "test")
+    import app
+
+    return app
+
+
+@pytest.fixture
+def api_client(app_module, session_factory):
+    """
+    A TestClient for the app, with requests authenticated and served from the
+    test database. The background workers are not started.
+    """
+    from fastapi.testclient import TestClient
+
+    def get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    overrides = app_module.app.dependency_overrides
+    overrides[app_module.get_db] = get_db
+    overrides[app_module.get_current_user] = lambda: None
+    yield TestClient(app_module.app)
+    overrides.clear()
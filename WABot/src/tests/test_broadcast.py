@@ -0,0 +1,204 @@
+import json
+
+import pytest
+
+from broadcast import (
+    OUTSIDE_WINDOW_ERROR,
+    BroadcastRunner,
+    compile_message,
+    create_broadcast,
+)
+from db_operations import add_student, create_or_update_subject_combination
+from models import Broadcast, BroadcastRecipient
+
+
+class FakeOutbound:
+    """
+    Stands in for OutboundQueue.deliver(); `on_send` runs before each send.
+    """
+
+    def __init__(self):
+        self.sent = []
+        self.on_send = None
+        self.response = None
+
+    def deliver(self, payload, to):
+        if self.on_send is not None:
+            self.on_send(to)
+        self.sent.append(json.loads(payload))
+        if self.response is not None:
+            return self.response
+        return True, {"messages": [{"id": f"wamid.{to}"}]}
+
+
+@pytest.fixture
+def outbound():
+    return FakeOutbound()
+
+
+@pytest.fixture
+def runner(outbound, session_factory):
+    return BroadcastRunner(outbound, session_factory, workers=1, batch_size=2)
+
+
+def add_students(db, count, state="upload_photo"):
+    for i in range(count):
+        add_student(db, f"26370{i}", name=f"Student {i}", state=state)
+    db.commit()
+
+
+def new_broadcast(db, message="Hello {name}", **kwargs):
+    broadcast = create_broadcast(db, message, "state", "upload_photo", **kwargs)
+    db.commit()
+    return broadcast.id
+
+
+def statuses(db, broadcast_id):
+    db.expire_all()
+    return [
+        status
+        for (status,) in db.query(BroadcastRecipient.status)
+        .filter(BroadcastRecipient.broadcast_id == broadcast_id)
+        .order_by(BroadcastRecipient.id)
+    ]
+
+
+def test_audience_is_snapshotted_when_the_broadcast_is_created(db, runner, outbound):
+    add_students(db, 3)
+    add_student(db, "263799", state="collecting_name")
+    db.commit()
+    broadcast_id = new_broadcast(db)
+    # Joins after the broadcast was created
+    add_student(db, "263798", state="upload_photo")
+    db.commit()
+
+    runner.run(broadcast_id)
+
+    assert [message["to"] for message in outbound.sent] == [
+        "263700",
+        "263701",
+        "263702",
+    ]
+    assert outbound.sent[0]["text"]["body"] == "Hello Student 0"
+    broadcast = db.get(Broadcast, broadcast_id)
+    assert (broadcast.status, broadcast.total, broadcast.sent) == ("completed", 3, 3)
+
+
+def test_students_without_a_combination_are_pending(db):
+    add_students(db, 2)
+    create_or_update_subject_combination(db, "263700", subject1="Maths")
+    db.commit()
+
+    broadcast = create_broadcast(db, "Hi", "subject_combination_state", "Pending")
+
+    assert broadcast.total == 2
+
+
+def test_cancel_stops_after_the_batch_in_flight_and_resume_finishes(
+    db, session_factory, runner, outbound
+):
+    add_students(db, 5)
+    broadcast_id = new_broadcast(db)
+
+    def cancel(to):
+        other = session_factory()
+        other.query(Broadcast).update({"status": "cancelled"})
+        other.commit()
+        other.close()
+        outbound.on_send = None
+
+    outbound.on_send = cancel
+    runner.run(broadcast_id)
+
+    assert statuses(db, broadcast_id) == ["sent", "sent"] + ["pending"] * 3
+    assert db.get(Broadcast, broadcast_id).status == "cancelled"
+
+    db.get(Broadcast, broadcast_id).status = "running"
+    db.commit()
+    runner.run(broadcast_id)
+
+    assert statuses(db, broadcast_id) == ["sent"] * 5
+    assert len(outbound.sent) == 5
+    broadcast = db.get(Broadcast, broadcast_id)
+    assert (broadcast.status, broadcast.sent) == ("completed", 5)
+
+
+def test_interrupted_broadcast_is_resumed_after_a_restart(
+    db, session_factory, runner, outbound
+):
+    add_students(db, 5)
+    broadcast_id = new_broadcast(db)
+    # The process shuts down while the first batch is being sent
+    outbound.on_send = lambda to: runner._stopping.set()
+    runner.run(broadcast_id)
+    assert statuses(db, broadcast_id) == ["sent", "sent"] + ["pending"] * 3
+    db.expire_all()
+    assert db.get(Broadcast, broadcast_id).status == "running"
+
+    outbound.on_send = None
+    restarted = BroadcastRunner(outbound, session_factory, batch_size=2)
+    restarted.resume_interrupted()
+    restarted._threads[broadcast_id].join()
+
+    assert statuses(db, broadcast_id) == ["sent"] * 5
+    assert sorted(message["to"] for message in outbound.sent) == [
+        f"26370{i}" for i in range(5)
+    ]
+
+
+def test_template_broadcast_sends_the_message_as_the_template_variable(
+    db, runner, outbound
+):
+    add_students(db, 1)
+    broadcast_id = new_broadcast(db, template_name="school_update")
+
+    runner.run(broadcast_id)
+
+    (message,) = outbound.sent
+    assert message["type"] == "template"
+    assert message["template"]["name"] == "school_update"
+    assert message["template"]["language"] == {"code": "en"}
+    assert message["template"]["components"][0]["parameters"] == [
+        {"type": "text", "text": "Hello Student 0"}
+    ]
+
+
+def test_template_variables_cannot_span_lines():
+    with pytest.raises(ValueError):
+        compile_message("Hello\nthere", "school_update")
+
+
+def test_send_outside_the_customer_service_window_is_explained(db, runner, outbound):
+    add_students(db, 1)
+    broadcast_id = new_broadcast(db)
+    error = json.dumps({"error": {"code": 131047, "message": "Re-engagement"}})
+    outbound.response = (False, {"error": error, "status_code": 400})
+
+    runner.run(broadcast_id)
+
+    recipient = db.query(BroadcastRecipient).one()
+    assert (recipient.status, recipient.error) == ("failed", OUTSIDE_WINDOW_ERROR)
+
+
+@pytest.fixture
+def api(api_client, app_module, runner, monkeypatch):
+    monkeypatch.setattr(app_module, "broadcast_runner", runner)
+    return api_client
+
+
+@pytest.mark.parametrize(
+    "status, code", [("completed", 409), ("cancelled", 200), ("running", 200)]
+)
+def test_only_cancelled_or_interrupted_broadcasts_resume(db, api, runner, status, code):
+    add_students(db, 1)
+    broadcast_id = new_broadcast(db)
+    db.get(Broadcast, broadcast_id).status = status
+    db.commit()
+
+    res = api.post(f"/api/broadcasts/{broadcast_id}/resume")
+
+    assert res.status_code == code
+    if code == 200:
+        runner._threads[broadcast_id].join()
+        db.expire_all()
+        assert db.get(Broadcast, broadcast_id).status == "completed"
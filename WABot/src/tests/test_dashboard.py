@@ -0,0 +1,71 @@
+from sqlalchemy.orm import sessionmaker
+
+from dashboard import (
+    STUDENTS_BY_STATE,
+    read_dashboard_counters,
+    read_dashboard_version,
+    reconcile_dashboard_counters,
+    track_dashboard_version,
+)
+from db_operations import add_student, update_student
+from models import DashboardCounter
+
+
+def test_version_moves_once_per_unit_of_work(db):
+    add_student(db, "263700")
+    update_student(db, "263700", name="Ann", state="collecting_dob")
+    add_student(db, "263701")
+    db.commit()
+    assert read_dashboard_version(db) == 1
+
+    update_student(db, "263701", state="collecting_dob")
+    db.rollback()
+    db.commit()
+    assert read_dashboard_version(db) == 1
+
+    update_student(db, "263701", name="Bee")
+    db.commit()
+    assert read_dashboard_version(db) == 2
+
+
+def test_only_tracked_sessions_move_the_version(db, session_factory):
+    untracked = sessionmaker(bind=session_factory.kw["bind"])()
+    try:
+        add_student(untracked, "263700")
+        untracked.commit()
+        assert read_dashboard_version(untracked) == 0
+    finally:
+        untracked.close()
+
+    # Tracking twice does not count a commit twice
+    track_dashboard_version(session_factory)
+    add_student(db, "263701")
+    db.commit()
+    assert read_dashboard_version(db) == 1
+
+
+def test_reconcile_reports_and_corrects_drift(db):
+    add_student(db, "263700")
+    add_student(db, "263701")
+    update_student(db, "263701", state="collecting_dob")
+    db.commit()
+    assert reconcile_dashboard_counters(db) == {}
+    version = read_dashboard_version(db)
+
+    # A write path that changed students without moving their counters
+    db.query(DashboardCounter).filter(
+        DashboardCounter.name == STUDENTS_BY_STATE,
+        DashboardCounter.key == "collecting_name",
+    ).update({"value": 5})
+    db.add(DashboardCounter(name=STUDENTS_BY_STATE, key="done", value=2))
+    db.commit()
+
+    drift = reconcile_dashboard_counters(db)
+
+    assert drift == {STUDENTS_BY_STATE: {"collecting_name": (5, 1), "done": (2, 0)}}
+    assert read_dashboard_counters(db)[STUDENTS_BY_STATE] == {
+        "collecting_name": 1,
+        "collecting_dob": 1,
+    }
+    assert read_dashboard_version(db) == version + 1
+    assert reconcile_dashboard_counters(db) == {}
@@ -0,0 +1,159 @@
+import random
+from datetime import datetime
+
+import pytest
+
+from fingerprints import (
+    BANDS,
+    EXACT_RECALL_DISTANCE,
+    SIMILAR_DISTANCE,
+    bands_of,
+    band_neighbours,
+    find_cross_applicant_duplicates,
+    find_similar,
+    hamming,
+)
+from models import ImageFingerprint, MediaObject, StudentAcademicHistory
+
+
+def flip(value, bits):
+    for bit in bits:
+        value ^= 1 << bit
+    return value
+
+
+@pytest.fixture
+def hashes(db):
+    """
+    Clusters of hashes around a few random centres, at every distance from 0 to
+    16 bits, stored as fingerprinted images, each uploaded by its own applicant.
+    """
+    rng = random.Random(7)
+    values = []
+    for _ in range(4):
+        centre = rng.getrandbits(64)
+        values.append(centre)
+        for distance in range(17):
+            values.append(flip(centre, rng.sample(range(64), distance)))
+    values = list(dict.fromkeys(values))
+    for i, value in enumerate(values):
+        path = f"/media/objects/{i:064x}.jpg"
+        db.add(
+            MediaObject(sha256=f"{i:064x}", size=1, mime_type="image/jpeg", path=path)
+        )
+        db.add(StudentAcademicHistory(whatsapp_number=f"2637{i:05d}", path1=path))
+        db.add(
+            ImageFingerprint(
+                sha256=f"{i:064x}",
+                dhash=f"{value:016x}",
+                created_at=datetime.utcnow(),
+                **{f"band{b}": band for b, band in enumerate(bands_of(value))},
+            )
+        )
+    db.commit()
+    return {f"{i:064x}": value for i, value in enumerate(values)}
+
+
+def test_recall_bound_covers_the_default_threshold():
+    assert SIMILAR_DISTANCE <= EXACT_RECALL_DISTANCE == 3 * BANDS - 1
+
+
+def test_band_neighbours():
+    assert band_neighbours(0, 0) == [0]
+    assert len(band_neighbours(0, 2)) == 1 + 16 + 120
+    assert all(hamming(0, value) <= 2 for value in band_neighbours(0, 2))
+
+
+@pytest.mark.parametrize("max_distance", [0, 3, 7, SIMILAR_DISTANCE, 11])
+def test_find_similar_finds_every_hash_within_the_distance(db, hashes, max_distance):
+    for sha256, value in hashes.items():
+        expected = sorted(
+            (other, hamming(value, other_value))
+            for other, other_value in hashes.items()
+            if other != sha256 and hamming(value, other_value) <= max_distance
+        )
+        assert sorted(find_similar(db, sha256, max_distance)) == expected
+
+
+def read_all(db, max_distance, limit):
+    duplicates, cursor = [], None
+    while True:
+        page, cursor = find_cross_applicant_duplicates(db, max_distance, limit, cursor)
+        duplicates += page
+        if cursor is None:
+            return duplicates
+
+
+@pytest.mark.parametrize("limit", [1, 7, 1000])
+@pytest.mark.parametrize("max_distance", [0, 3, 7, SIMILAR_DISTANCE, 11])
+def test_duplicate_pages_cover_every_pair_within_the_distance(
+    db, hashes, max_distance, limit
+):
+    items = sorted(hashes.items())
+    expected = {
+        (sha_a, sha_b, hamming(a, b))
+        for i, (sha_a, a) in enumerate(items)
+        for sha_b, b in items[i + 1 :]
+        if hamming(a, b) <= max_distance
+    }
+    found = [
+        (*duplicate["images"], duplicate["distance"])
+        for duplicate in read_all(db, max_distance, limit)
+    ]
+    assert len(found) == len(expected)
+    assert set(found) == expected
+
+
+def test_duplicates_by_one_applicant_are_skipped(db, hashes):
+    (sha_a, a), (sha_b, b) = min(
+        (
+            ((sha_a, a), (sha_b, b))
+            for sha_a, a in hashes.items()
+            for sha_b, b in hashes.items()
+            if sha_a < sha_b
+        ),
+        key=lambda pair: hamming(pair[0][1], pair[1][1]),
+    )
+    path_b = db.query(MediaObject.path).filter(MediaObject.sha256 == sha_b).scalar()
+    db.query(StudentAcademicHistory).filter(
+        StudentAcademicHistory.path1 == path_b
+    ).delete()
+    history = (
+        db.query(StudentAcademicHistory)
+        .join(MediaObject, MediaObject.path == StudentAcademicHistory.path1)
+        .filter(MediaObject.sha256 == sha_a)
+        .one()
+    )
+    history.path2 = path_b
+    db.commit()
+
+    images = [duplicate["images"] for duplicate in read_all(db, hamming(a, b), 5)]
+    assert [sha_a, sha_b] not in images
+
+
+def test_files_sent_by_several_applicants_are_listed(db, hashes):
+    # Not an image, so never fingerprinted
+    path = "/media/objects/results.pdf"
+    db.add(MediaObject(sha256="f" * 64, size=1, mime_type="application/pdf", path=path))
+    for number in ("263788881", "263788882"):
+        db.add(StudentAcademicHistory(whatsapp_number=number, path1=path))
+    db.commit()
+
+    assert {
+        "images": ["f" * 64],
+        "distance": 0,
+        "whatsapp_numbers": ["263788881", "263788882"],
+    } in read_all(db, SIMILAR_DISTANCE, 5)
+
+
+def test_duplicates_endpoint_pages_with_the_next_cursor_header(api_client, db, hashes):
+    found, params = [], {"limit": 10}
+    while True:
+        response = api_client.get("/api/media/duplicates", params=params)
+        assert response.status_code == 200
+        found += response.json()
+        if "X-Next-Cursor" not in response.headers:
+            break
+        params["cursor"] = response.headers["X-Next-Cursor"]
+    assert found == read_all(db, SIMILAR_DISTANCE, 10)
+    assert found
@@ -0,0 +1,45 @@
+import json
+from types import SimpleNamespace
+
+from models import OutboxMessage
+from other_operations import handle_image_upload
+from outbox import OutboxWhatsApp
+
+PHONE = "263700"
+
+
+def upload(db, n):
+    message = SimpleNamespace(media_id=f"media{n}", id=f"wamid.{n}", sha256=None)
+    handle_image_upload(db, OutboxWhatsApp(db, None), PHONE, message, "upload_photo")
+    db.commit()
+
+
+def bodies(db):
+    return [
+        json.loads(row.payload)["interactive"]["body"]["text"]
+        for row in db.query(OutboxMessage).order_by(OutboxMessage.id)
+    ]
+
+
+def test_confirmation_counts_every_image_of_the_burst(db):
+    upload(db, 1)
+    assert "received 1 academic image from you" in bodies(db)[0]
+
+    upload(db, 2)
+    upload(db, 3)
+    upload(db, 4)
+
+    confirmation, limit = bodies(db)
+    assert "received 3 academic images from you" in confirmation
+    assert "Upload Limit Reached" in limit
+
+
+def test_confirmation_is_not_rewritten_once_sent(db):
+    upload(db, 1)
+    db.query(OutboxMessage).update({"status": "sent", "attempts": 1})
+    db.commit()
+
+    upload(db, 2)
+
+    assert len(bodies(db)) == 1
+    assert "received 1 academic image from you" in bodies(db)[0]
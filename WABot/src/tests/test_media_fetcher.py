@@ -0,0 +1,85 @@
+import json
+
+from db_operations import claim_academic_image_slot, claim_academic_message_flag
+from media_fetcher import MediaFetcher, queue_media_download
+from media_store import MediaStore, pending_media_path
+from models import MediaDownload, OutboxMessage, StudentAcademicHistory
+
+
+class ExpiredMediaClient:
+    def open_media(self, media_id):
+        return {"error": "Media not found"}, None
+
+
+def upload(db, phone, media_id):
+    claim_academic_image_slot(db, phone, pending_media_path(media_id))
+    queue_media_download(db, media_id, f"wamid.{media_id}", phone, media_id)
+    claim_academic_message_flag(db, phone, "confirmation_sent")
+    db.commit()
+
+
+def test_failed_download_frees_the_slot_and_asks_for_the_image_again(
+    session_factory, db, tmp_path
+):
+    upload(db, "263700", "m1")
+    upload(db, "263700", "m2")
+    fetcher = MediaFetcher(
+        ExpiredMediaClient(), session_factory, store=MediaStore(str(tmp_path))
+    )
+
+    job = db.query(MediaDownload).filter(MediaDownload.media_id == "m1").one()
+    fetcher.process(job.id)
+
+    db.expire_all()
+    history = db.query(StudentAcademicHistory).one()
+    assert (history.path1, history.path2) == (None, pending_media_path("m2"))
+    assert history.confirmation_sent is False
+    assert history.error_message_sent is False
+    assert db.get(MediaDownload, job.id).status == "failed"
+    message = db.query(OutboxMessage).one()
+    assert message.recipient_phone == "263700"
+    assert "send that image again" in json.loads(message.payload)["text"]["body"]
+
+
+class ImageClient:
+    def open_media(self, media_id):
+        return {"mime_type": "image/jpeg"}, FakeResponse(b"jpeg bytes")
+
+
+class FakeResponse:
+    status_code = 200
+
+    def __init__(self, content):
+        self.content = content
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def iter_content(self, chunk_size):
+        yield self.content
+
+
+def test_failing_post_processing_does_not_reset_a_stored_download(
+    session_factory, db, tmp_path
+):
+    upload(db, "263700", "m1")
+
+    def on_stored(sha256):
+        raise RuntimeError("renditions are down")
+
+    fetcher = MediaFetcher(
+        ImageClient(),
+        session_factory,
+        store=MediaStore(str(tmp_path)),
+        on_stored=on_stored,
+    )
+    job = db.query(MediaDownload).one()
+    fetcher.process(job.id)
+
+    db.expire_all()
+    job = db.get(MediaDownload, job.id)
+    assert (job.status, job.attempts, job.error) == ("done", 1, None)
+    assert db.query(StudentAcademicHistory).one().path1 == job.path
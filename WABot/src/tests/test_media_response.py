@@ -0,0 +1,97 @@
+import os
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import FileResponse
+from fastapi.testclient import TestClient
+
+from media_response import etag_matches, evaluate_if_range
+from media_store import MediaStore, record_media_object
+
+ETAG = '"abc-original"'
+
+
+@pytest.fixture
+def client(tmp_path):
+    path = tmp_path / "image.jpg"
+    path.write_bytes(b"0123456789")
+    app = FastAPI()
+
+    @app.get("/media")
+    def media(request: Request):
+        evaluate_if_range(request, ETAG)
+        return FileResponse(path, headers={"ETag": ETAG})
+
+    return TestClient(app)
+
+
+def test_range_is_served_when_if_range_matches(client):
+    res = client.get("/media", headers={"Range": "bytes=2-4", "If-Range": ETAG})
+    assert res.status_code == 206
+    assert res.content == b"234"
+    assert res.headers["etag"] == ETAG
+
+
+def test_whole_file_is_sent_when_if_range_is_stale(client):
+    for stale in ('"other"', f"W/{ETAG}", "Tue, 01 Jan 2030 00:00:00 GMT"):
+        res = client.get("/media", headers={"Range": "bytes=2-4", "If-Range": stale})
+        assert res.status_code == 200
+        assert res.content == b"0123456789"
+
+
+def test_range_without_if_range(client):
+    res = client.get("/media", headers={"Range": "bytes=8-"})
+    assert res.status_code == 206
+    assert res.content == b"89"
+
+
+def test_etag_matches_uses_weak_comparison():
+    assert etag_matches(f'"x", W/{ETAG}', ETAG)
+    assert etag_matches("*", ETAG)
+    assert not etag_matches('"x"', ETAG)
+    assert not etag_matches(None, ETAG)
+
+
+@pytest.fixture
+def stored_media(app_module, db, tmp_path, monkeypatch):
+    """
+    A stored image; returns the path of its file.
+    """
+    store = MediaStore(str(tmp_path))
+    monkeypatch.setattr(app_module, "media_store", store)
+    path = store.path_for("ab" * 32, ".jpg")
+    os.makedirs(os.path.dirname(path))
+    with open(path, "wb") as f:
+        f.write(b"jpeg")
+    record_media_object(
+        db, "ab" * 32, 4, "image/jpeg", store.url_for("ab" * 32, ".jpg")
+    )
+    db.commit()
+    return path
+
+
+def test_media_is_served_with_its_etag(api_client, stored_media):
+    res = api_client.get(f"/api/media/{'ab' * 32}?rendition=original")
+    assert res.status_code == 200
+    assert res.content == b"jpeg"
+    assert res.headers["etag"] == f'"{"ab" * 32}-original"'
+
+
+def test_missing_file_is_a_404(api_client, stored_media):
+    os.unlink(stored_media)
+    res = api_client.get(f"/api/media/{'ab' * 32}?rendition=original")
+    assert res.status_code == 404
+
+
+def test_proxy_sends_the_file_with_accel_redirect(
+    api_client, app_module, stored_media, monkeypatch
+):
+    monkeypatch.setattr(app_module, "MEDIA_ACCEL_REDIRECT", "/internal-media/")
+    res = api_client.get(f"/api/media/{'ab' * 32}?rendition=original")
+    assert res.status_code == 200
+    assert res.content == b""
+    assert res.headers["x-accel-redirect"] == (
+        f"/internal-media/objects/ab/ab/{'ab' * 32}.jpg"
+    )
+    assert res.headers["content-type"] == "image/jpeg"
+    assert res.headers["etag"] == f'"{"ab" * 32}-original"'
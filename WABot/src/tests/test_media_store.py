@@ -0,0 +1,161 @@
+import base64
+import hashlib
+
+import pytest
+
+from media_store import (
+    MediaStore,
+    import_flat_media,
+    normalize_sha256,
+    replace_image_path,
+)
+from models import MediaObject, StudentAcademicHistory
+
+JPEG = b"\xff\xd8 results page"
+PNG = b"\x89PNG second page"
+
+
+def sha(content):
+    return hashlib.sha256(content).hexdigest()
+
+
+@pytest.fixture
+def media_dir(tmp_path):
+    (tmp_path / "media").mkdir()
+    return tmp_path / "media"
+
+
+@pytest.fixture
+def store(media_dir):
+    return MediaStore(f"{media_dir}/")
+
+
+@pytest.fixture
+def flat_media(db, media_dir):
+    """
+    Files saved flat by the old downloader, two of them with the same content,
+    referenced with and without their extension.
+    """
+    (media_dir / "image_wamid.A.jpeg").write_bytes(JPEG)
+    (media_dir / "image_wamid.B.jpeg").write_bytes(JPEG)
+    (media_dir / "image_wamid.C.png").write_bytes(PNG)
+    db.add_all(
+        [
+            StudentAcademicHistory(
+                whatsapp_number="263771000001",
+                path1="/media/image_wamid.A",
+                path2="/media/image_wamid.C.png",
+            ),
+            StudentAcademicHistory(
+                whatsapp_number="263771000002", path1="/media/image_wamid.B.jpeg"
+            ),
+        ]
+    )
+    db.commit()
+
+
+def slots(db):
+    db.expire_all()
+    return {
+        history.whatsapp_number: (history.path1, history.path2, history.path3)
+        for history in db.query(StudentAcademicHistory)
+    }
+
+
+def objects(db):
+    return sorted(
+        (media.sha256, media.mime_type, media.size, media.path)
+        for media in db.query(MediaObject)
+    )
+
+
+def expected_state(store):
+    jpeg, png = store.url_for(sha(JPEG), ".jpeg"), store.url_for(sha(PNG), ".png")
+    return (
+        {
+            "263771000001": (jpeg, png, None),
+            "263771000002": (jpeg, None, None),
+        },
+        sorted(
+            [
+                (sha(JPEG), "image/jpeg", len(JPEG), jpeg),
+                (sha(PNG), "image/png", len(PNG), png),
+            ]
+        ),
+    )
+
+
+def test_normalize_sha256():
+    digest = hashlib.sha256(b"x")
+    assert normalize_sha256(digest.hexdigest().upper()) == digest.hexdigest()
+    assert normalize_sha256(base64.b64encode(digest.digest()).decode()) == (
+        digest.hexdigest()
+    )
+    assert normalize_sha256("not a digest") is None
+    assert normalize_sha256(base64.b64encode(b"short").decode()) is None
+
+
+def test_put_keeps_one_copy_per_content(store, tmp_path):
+    for i in range(2):
+        (tmp_path / f"part{i}").write_bytes(JPEG)
+    first, new = store.put(str(tmp_path / "part0"), sha(JPEG), ".jpeg")
+    second, again = store.put(str(tmp_path / "part1"), sha(JPEG), ".jpeg")
+    assert (new, again) == (True, False) and first == second
+    assert open(first, "rb").read() == JPEG
+    assert not (tmp_path / "part1").exists()
+
+
+def test_import_moves_files_and_repoints_slots(db, store, media_dir, flat_media):
+    assert import_flat_media(db, store, str(media_dir)) == 3
+    assert (slots(db), objects(db)) == expected_state(store)
+    assert not list(media_dir.glob("image_*"))
+    for url in {path for numbers in slots(db).values() for path in numbers if path}:
+        assert open(store.local_path(url), "rb").read() in (JPEG, PNG)
+
+
+def test_import_is_idempotent(db, store, media_dir, flat_media):
+    import_flat_media(db, store, str(media_dir))
+    state = slots(db), objects(db)
+    assert import_flat_media(db, store, str(media_dir)) == 0
+    assert (slots(db), objects(db)) == state
+
+
+def test_interrupted_import_can_be_run_again(
+    db, store, media_dir, flat_media, monkeypatch
+):
+    put = store.put
+    moved = []
+
+    def crash_on_second_file(source, sha256, ext=""):
+        if moved:
+            raise OSError("disk full")
+        moved.append(source)
+        return put(source, sha256, ext)
+
+    monkeypatch.setattr(store, "put", crash_on_second_file)
+    with pytest.raises(OSError):
+        import_flat_media(db, store, str(media_dir))
+    monkeypatch.undo()
+
+    assert import_flat_media(db, store, str(media_dir)) == 2
+    assert (slots(db), objects(db)) == expected_state(store)
+    assert not list(media_dir.glob("image_*"))
+
+
+def test_replace_image_path_only_touches_that_student(db):
+    db.add_all(
+        [
+            StudentAcademicHistory(
+                whatsapp_number="263771000001", path1="/a", path3="/pending"
+            ),
+            StudentAcademicHistory(whatsapp_number="263771000002", path1="/pending"),
+        ]
+    )
+    db.commit()
+    assert replace_image_path(db, "263771000001", "/pending", "/stored") == 1
+    assert replace_image_path(db, "263771000001", "/missing", "/stored") == 0
+    db.commit()
+    assert slots(db) == {
+        "263771000001": ("/a", None, "/stored"),
+        "263771000002": ("/pending", None, None),
+    }
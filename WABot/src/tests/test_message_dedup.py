@@ -0,0 +1,46 @@
+from message_dedup import MessageDeduplicator
+from models import ProcessedMessage
+
+
+def test_claim_is_true_once_committed(session_factory, db):
+    dedup = MessageDeduplicator(session_factory)
+
+    assert dedup.claim(db, "wamid.1")
+    db.commit()
+    dedup.mark_processed("wamid.1")
+
+    assert not dedup.claim(db, "wamid.1")
+
+
+def test_committed_claim_survives_a_restart(session_factory, db):
+    assert MessageDeduplicator(session_factory).claim(db, "wamid.1")
+    db.commit()
+
+    # A new deduplicator has an empty cache and must ask the database
+    assert not MessageDeduplicator(session_factory).claim(db, "wamid.1")
+
+
+def test_rolled_back_claim_is_released(session_factory, db):
+    dedup = MessageDeduplicator(session_factory)
+
+    assert dedup.claim(db, "wamid.1")
+    # The handler failed, so the unit of work (claim included) rolls back
+    db.rollback()
+
+    assert db.query(ProcessedMessage).count() == 0
+    assert dedup.claim(db, "wamid.1")
+
+
+def test_claims_are_per_message(session_factory, db):
+    dedup = MessageDeduplicator(session_factory)
+
+    assert dedup.claim(db, "wamid.1")
+    assert dedup.claim(db, "wamid.2")
+    assert not dedup.claim(db, "wamid.2")
+
+
+def test_messages_without_an_id_are_never_duplicates(session_factory, db):
+    dedup = MessageDeduplicator(session_factory)
+
+    assert dedup.claim(db, None)
+    assert dedup.claim(db, None)
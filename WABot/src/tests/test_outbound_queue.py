@@ -0,0 +1,161 @@
+import json
+
+import pytest
+import requests
+
+import outbound_queue
+from models import DeadLetterMessage
+from outbound_queue import OutboundQueue, TokenBucket
+
+
+class Clock:
+    """
+    Stands in for the time module in outbound_queue: sleeping moves the clock
+    forward instead of waiting.
+    """
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(outbound_queue, "time", clock)
+    return clock
+
+
+class FakeResponse:
+    def __init__(self, status_code, body=None, headers=None):
+        self.status_code = status_code
+        self.body = body or {}
+        self.headers = headers or {}
+        self.text = json.dumps(self.body)
+
+    def json(self):
+        return self.body
+
+
+class FakeClient:
+    """
+    Answers post_payload with the queued responses (or raises the queued
+    exceptions) in order.
+    """
+
+    phone_number_id = "12345"
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.posted = []
+
+    def post_payload(self, payload):
+        self.posted.append(payload)
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+SENT = FakeResponse(200, {"messages": [{"id": "wamid.1"}]})
+THROTTLED = FakeResponse(429, {"error": {"code": 130429}}, {"Retry-After": "2"})
+UNAVAILABLE = FakeResponse(503, {"error": {"code": 1}})
+BAD_RECIPIENT = FakeResponse(400, {"error": {"code": 131026}})
+PAYLOAD = {"to": "263771000001", "type": "text", "text": {"body": "Hi"}}
+
+
+def make_queue(session_factory, *responses, **kwargs):
+    return OutboundQueue(FakeClient(*responses), session_factory, **kwargs)
+
+
+def dead_letters(session_factory):
+    db = session_factory()
+    try:
+        return [
+            (
+                row.recipient_phone,
+                json.loads(row.payload),
+                row.status_code,
+                row.attempts,
+            )
+            for row in db.query(DeadLetterMessage).order_by(DeadLetterMessage.id)
+        ]
+    finally:
+        db.close()
+
+
+def test_bucket_allows_a_burst_then_the_rate(clock):
+    bucket = TokenBucket(rate=4, capacity=2)
+    bucket.acquire()
+    bucket.acquire()
+    assert clock.sleeps == []
+
+    bucket.acquire()
+    assert clock.sleeps == [pytest.approx(0.25)]
+
+
+def test_bucket_refills_up_to_its_capacity(clock):
+    bucket = TokenBucket(rate=4, capacity=2)
+    bucket.acquire()
+    bucket.acquire()
+
+    clock.now += 0.25
+    bucket.acquire()
+    assert clock.sleeps == []
+
+    # An idle minute refills the bucket, but only to capacity
+    clock.now += 60
+    for _ in range(3):
+        bucket.acquire()
+    assert clock.sleeps == [pytest.approx(0.25)]
+
+
+def test_each_phone_number_id_has_its_own_bucket(session_factory):
+    queue = make_queue(session_factory, rate=10)
+    assert queue.bucket("a") is queue.bucket("a")
+    assert queue.bucket("a") is not queue.bucket("b")
+
+
+def test_retriable_failures_are_retried_until_sent(session_factory, clock):
+    queue = make_queue(
+        session_factory,
+        UNAVAILABLE,
+        requests.exceptions.ConnectTimeout("connect timed out"),
+        SENT,
+    )
+    assert queue.deliver(PAYLOAD, "263771000001") == (True, SENT.body)
+    assert len(queue.client.posted) == 3
+    assert dead_letters(session_factory) == []
+
+
+def test_retry_after_is_honoured_up_to_the_max_delay(session_factory, clock):
+    queue = make_queue(session_factory, THROTTLED, SENT, max_delay=30)
+    queue.deliver(PAYLOAD, "263771000001")
+    assert 2 in clock.sleeps
+    assert queue.backoff(1, "120") == 30
+    assert 0 <= queue.backoff(3, "soon") <= queue.base_delay * 2**3
+
+
+def test_permanent_failure_is_dead_lettered_at_once(session_factory, clock):
+    queue = make_queue(session_factory, BAD_RECIPIENT)
+    ok, body = queue.deliver(PAYLOAD, "263771000001")
+    assert not ok and body["status_code"] == 400
+    assert len(queue.client.posted) == 1
+    assert dead_letters(session_factory) == [("263771000001", PAYLOAD, 400, 1)]
+
+
+def test_message_is_dead_lettered_when_attempts_run_out(session_factory, clock):
+    queue = make_queue(session_factory, *[UNAVAILABLE] * 3, max_attempts=3)
+    ok, _ = queue.deliver(json.dumps(PAYLOAD).encode(), "263771000001")
+    assert not ok
+    assert len(queue.client.posted) == 3
+    # Backoff between attempts, not after the last one
+    assert len(clock.sleeps) == 2
+    assert dead_letters(session_factory) == [("263771000001", PAYLOAD, 503, 3)]
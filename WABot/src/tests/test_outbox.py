@@ -0,0 +1,147 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import OutboxMessage
+from outbox import OutboxDispatcher
+
+
+class FakeOutbound:
+    """
+    Stands in for OutboundQueue: each payload answers with the results queued
+    for it, then succeeds.
+    """
+
+    max_attempts = 3
+
+    def __init__(self):
+        self.responses = {}
+        self.attempts = []
+        self.dead_letters = []
+
+    def fail(self, payload, *results):
+        self.responses.setdefault(payload, []).extend(results)
+
+    def attempt(self, payload):
+        self.attempts.append(payload)
+        queued = self.responses.get(payload)
+        if queued:
+            return queued.pop(0)
+        return True, False, {"messages": [{"id": f"wamid.{payload}"}]}
+
+    def backoff(self, attempt, retry_after=None):
+        return 60
+
+    def dead_letter(self, payload, to, status_code, error, attempts):
+        self.dead_letters.append((payload, attempts))
+
+
+RETRIABLE = (False, True, {"error": "throttled", "status_code": 429})
+PERMANENT = (False, False, {"error": "bad recipient", "status_code": 400})
+
+
+@pytest.fixture
+def outbound():
+    return FakeOutbound()
+
+
+@pytest.fixture
+def dispatcher(outbound, session_factory):
+    return OutboxDispatcher(outbound, session_factory)
+
+
+def queue(db, to, payload, **fields):
+    db.add(OutboxMessage(recipient_phone=to, payload=payload, **fields))
+    db.commit()
+
+
+def statuses(db):
+    db.expire_all()
+    return {
+        row.payload: (row.status, row.attempts)
+        for row in db.query(OutboxMessage).order_by(OutboxMessage.id)
+    }
+
+
+def make_due(db, payload):
+    db.query(OutboxMessage).filter(OutboxMessage.payload == payload).update(
+        {"not_before": datetime.utcnow() - timedelta(seconds=1)}
+    )
+    db.commit()
+
+
+def test_retriable_failure_is_retried_later_without_holding_up_others(
+    dispatcher, outbound, db
+):
+    outbound.fail("a1", RETRIABLE)
+    queue(db, "a", "a1")
+    queue(db, "a", "a2")
+    queue(db, "b", "b1")
+
+    assert dispatcher.dispatch() == 3
+    # One attempt only; a2 is put back behind a1 without being tried
+    assert outbound.attempts == ["a1", "b1"]
+    assert statuses(db) == {
+        "a1": ("pending", 1),
+        "a2": ("pending", 0),
+        "b1": ("sent", 1),
+    }
+    retry = db.query(OutboxMessage).filter(OutboxMessage.payload == "a1").one()
+    assert retry.not_before > datetime.utcnow() + timedelta(seconds=50)
+    assert retry.error == "throttled"
+
+    # Before the backoff runs out nothing of a's is sent, but b's messages are
+    queue(db, "a", "a3")
+    queue(db, "b", "b2")
+    assert dispatcher.dispatch() == 1
+    assert outbound.attempts[-1] == "b2"
+
+    make_due(db, "a1")
+    assert dispatcher.dispatch() == 3
+    assert outbound.attempts[-3:] == ["a1", "a2", "a3"]
+    assert set(statuses(db).values()) == {("sent", 1), ("sent", 2)}
+
+
+def test_message_is_dead_lettered_after_its_last_attempt(dispatcher, outbound, db):
+    outbound.fail("a1", RETRIABLE, RETRIABLE, RETRIABLE)
+    queue(db, "a", "a1")
+
+    for _ in range(outbound.max_attempts):
+        dispatcher.dispatch()
+        make_due(db, "a1")
+
+    assert statuses(db) == {"a1": ("failed", 3)}
+    assert outbound.dead_letters == [("a1", 3)]
+
+
+def test_permanent_failure_is_not_retried(dispatcher, outbound, db):
+    outbound.fail("a1", PERMANENT)
+    queue(db, "a", "a1")
+    queue(db, "a", "a2")
+
+    dispatcher.dispatch()
+
+    assert statuses(db) == {"a1": ("failed", 1), "a2": ("sent", 1)}
+    assert outbound.dead_letters == [("a1", 1)]
+
+
+def test_messages_of_a_dead_dispatcher_are_sent_after_the_lease(
+    dispatcher, outbound, db
+):
+    queue(db, "a", "a1")
+    assert len(dispatcher.claim()) == 1
+    # The claiming dispatcher died before sending
+    assert dispatcher.dispatch() == 0
+
+    make_due(db, "a1")
+    assert dispatcher.dispatch() == 1
+    assert statuses(db) == {"a1": ("sent", 1)}
+
+
+def test_deferred_message_does_not_hold_up_later_replies(dispatcher, outbound, db):
+    queue(db, "a", "a1", not_before=datetime.utcnow() + timedelta(seconds=3))
+    queue(db, "a", "a2")
+
+    assert dispatcher.dispatch() == 1
+    assert outbound.attempts == ["a2"]
+    assert statuses(db)["a1"] == ("pending", 0)
@@ -0,0 +1,127 @@
+import hashlib
+import io
+import os
+
+import pytest
+from PIL import Image
+
+from media_store import MediaStore
+from models import MediaObject, MediaRendition
+from renditions import RENDITIONS, RenditionBuilder, get_rendition
+
+
+@pytest.fixture
+def store(tmp_path):
+    return MediaStore(f"{tmp_path / 'media'}/")
+
+
+@pytest.fixture
+def builder(session_factory, store):
+    return RenditionBuilder(session_factory, store)
+
+
+def encode(image, format, **params):
+    buffer = io.BytesIO()
+    image.save(buffer, format, **params)
+    return buffer.getvalue()
+
+
+def stored(db, store, content, mime_type="image/jpeg", ext=".jpeg"):
+    """
+    Stores `content` as a media object and returns its hash.
+    """
+    sha256 = hashlib.sha256(content).hexdigest()
+    path = store.path_for(sha256, ext)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(content)
+    db.add(
+        MediaObject(
+            sha256=sha256,
+            size=len(content),
+            mime_type=mime_type,
+            path=store.url_for(sha256, ext),
+        )
+    )
+    db.commit()
+    return sha256
+
+
+def renditions(db, store, sha256):
+    """
+    kind -> (recorded size, size of the file on disk) of each rendition built.
+    """
+    db.expire_all()
+    built = {}
+    for kind in RENDITIONS:
+        rendition = get_rendition(db, sha256, kind)
+        if rendition is None:
+            continue
+        with Image.open(store.local_path(rendition.path)) as image:
+            assert image.format == "JPEG"
+            built[kind] = ((rendition.width, rendition.height), image.size)
+    return built
+
+
+def test_photo_is_scaled_to_each_rendition(db, store, builder):
+    photo = encode(Image.new("RGB", (4000, 3000), "white"), "JPEG", quality=90)
+    sha256 = stored(db, store, photo)
+    builder.build(sha256)
+    assert renditions(db, store, sha256) == {
+        "display": ((1600, 1200), (1600, 1200)),
+        "thumb": ((320, 240), (320, 240)),
+    }
+    # Temporary files have all been moved into place
+    assert os.listdir(store.tmp) == []
+
+
+def test_exif_orientation_is_applied(db, store, builder):
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Rotated 90 degrees clockwise
+    photo = encode(Image.new("RGB", (3000, 2000)), "JPEG", exif=exif)
+    sha256 = stored(db, store, photo)
+    builder.build(sha256)
+    (width, height), _ = renditions(db, store, sha256)["display"]
+    assert height == 1600 and width < height
+
+
+def test_small_images_are_not_enlarged(db, store, builder):
+    png = encode(Image.new("RGBA", (200, 100), (255, 0, 0, 128)), "PNG")
+    sha256 = stored(db, store, png, "image/png", ".png")
+    builder.build(sha256)
+    assert renditions(db, store, sha256) == {
+        "display": ((200, 100), (200, 100)),
+        "thumb": ((200, 100), (200, 100)),
+    }
+
+
+def test_unreadable_and_non_image_media_are_skipped(db, store, builder):
+    broken = stored(db, store, b"\xff\xd8 not really a jpeg")
+    document = stored(db, store, b"%PDF-1.4", "application/pdf", ".pdf")
+    builder.build(broken)
+    builder.build(document)
+    assert db.query(MediaRendition).count() == 0
+
+
+def test_building_twice_keeps_one_row_per_kind(db, store, builder):
+    sha256 = stored(db, store, encode(Image.new("RGB", (800, 600)), "JPEG"))
+    builder.build(sha256)
+    builder.build(sha256)
+    assert db.query(MediaRendition).count() == len(RENDITIONS)
+
+
+def test_queue_missing_picks_up_images_without_every_rendition(db, store, builder):
+    done = stored(db, store, encode(Image.new("RGB", (800, 600)), "JPEG"))
+    builder.build(done)
+    partial = stored(db, store, encode(Image.new("RGB", (600, 800)), "JPEG"))
+    builder.build(partial)
+    db.query(MediaRendition).filter(
+        MediaRendition.sha256 == partial, MediaRendition.kind == "thumb"
+    ).delete()
+    db.commit()
+    new = stored(db, store, encode(Image.new("RGB", (10, 10)), "PNG"), "image/png")
+    stored(db, store, b"%PDF-1.4", "application/pdf", ".pdf")
+
+    assert builder.queue_missing() == 2
+    queued = {builder._queue.get_nowait() for _ in range(2)}
+    assert queued == {partial, new}
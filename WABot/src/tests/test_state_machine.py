@@ -0,0 +1,86 @@
+import json
+
+import pytest
+
+from state_machine import ANY_STATE, StateMachine
+
+
+def handler(ctx):
+    return {}
+
+
+@pytest.fixture
+def machine():
+    machine = StateMachine()
+    machine.on("none", "text")(handler)
+    machine.on("none", "list_reply", "lower_six", next_state="collecting_name")(handler)
+    machine.on(ANY_STATE, "list_reply", "lower_six")(handler)
+    machine.on(ANY_STATE, "list_reply", "class_enrollment")(handler)
+    machine.on("collecting_name", "list_reply")(handler)
+    machine.on(ANY_STATE, "image")(handler)
+    return machine
+
+
+def test_exact_entry_wins(machine):
+    transition = machine.resolve("none", "list_reply", "lower_six")
+    assert (transition.state, transition.next_state) == ("none", "collecting_name")
+
+
+def test_reply_id_falls_back_to_any_state(machine):
+    transition = machine.resolve("collecting_dob", "list_reply", "lower_six")
+    assert transition.state == ANY_STATE
+    assert transition.next_state is None
+
+
+def test_any_state_reply_id_beats_state_entry_without_reply_id(machine):
+    transition = machine.resolve("collecting_name", "list_reply", "class_enrollment")
+    assert (transition.state, transition.reply_id) == (ANY_STATE, "class_enrollment")
+
+
+def test_unknown_reply_id_falls_back_to_state_entry(machine):
+    transition = machine.resolve("collecting_name", "list_reply", "unknown")
+    assert (transition.state, transition.reply_id) == ("collecting_name", None)
+
+
+def test_message_type_falls_back_to_any_state(machine):
+    assert machine.resolve("collecting_dob", "image").state == ANY_STATE
+
+
+def test_unhandled_message_resolves_to_none(machine):
+    assert machine.resolve("collecting_dob", "text") is None
+    assert machine.resolve("none", "list_reply", "unknown") is None
+    assert machine.resolve("none", "audio") is None
+
+
+def test_duplicate_registration_is_rejected(machine):
+    with pytest.raises(ValueError):
+        machine.on("none", "text")(handler)
+
+
+def test_new_student_can_choose_lower_six():
+    # A student created by the message being handled has no state yet
+    from conversation import machine
+
+    transition = machine.resolve(None, "list_reply", "lower_six")
+    assert transition.handler.__name__ == "choose_lower_six"
+    assert transition.next_state == "collecting_name"
+
+
+def test_invalid_combination_is_answered_and_keeps_the_state(db):
+    from wa_cloud_py.messages.types import TextMessage, User
+
+    from conversation import handle_message
+    from db_operations import add_student
+    from models import OutboxMessage, Student, SubjectCombination
+
+    add_student(db, "263700", state="collecting_combination")
+    user = User({"wa_id": "263700", "profile": {"name": "T"}})
+    message = TextMessage({"id": "wamid.1", "text": {"body": "Physics"}}, user)
+
+    handle_message(db, message)
+    db.commit()
+
+    assert db.query(Student).one().state == "collecting_combination"
+    assert db.query(SubjectCombination).count() == 0
+    (reply,) = db.query(OutboxMessage).all()
+    assert "couldn't read that combination" in json.loads(reply.payload)["text"]["body"]
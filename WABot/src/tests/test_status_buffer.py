@@ -0,0 +1,56 @@
+from types import SimpleNamespace
+
+from models import OutboundMessageStatus
+from status_buffer import StatusBuffer
+
+
+def status(message_id, name):
+    return SimpleNamespace(
+        id=message_id, recipient_phone="263700000001", status=name, timestamp="1"
+    )
+
+
+class FailingSession:
+    def execute(self, *args, **kwargs):
+        raise RuntimeError("database is locked")
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_failed_flush_keeps_statuses_for_the_next_flush(session_factory, db):
+    buffer = StatusBuffer(FailingSession)
+    buffer.add(status("wamid.1", "delivered"))
+    buffer.add(status("wamid.2", "sent"))
+    assert buffer.flush() == 0
+
+    # Arrived while the failed flush was running
+    buffer.add(status("wamid.1", "read"))
+    buffer.add(status("wamid.2", "sent"))
+
+    buffer.session_factory = session_factory
+    assert buffer.flush() == 2
+    statuses = dict(
+        db.query(OutboundMessageStatus.message_id, OutboundMessageStatus.status)
+    )
+    assert statuses == {"wamid.1": "read", "wamid.2": "sent"}
+
+
+def test_requeue_does_not_overwrite_a_newer_status(session_factory):
+    buffer = StatusBuffer(session_factory)
+    buffer.add(status("wamid.1", "read"))
+    buffer.requeue(
+        [
+            {
+                "message_id": "wamid.1",
+                "recipient_phone": "263700000001",
+                "status": "delivered",
+                "status_rank": 2,
+                "status_timestamp": 1,
+            }
+        ]
+    )
+    assert buffer._pending["wamid.1"]["status"] == "read"
@@ -0,0 +1,86 @@
+import base64
+
+import pytest
+
+from db_operations import (
+    add_student,
+    count_students,
+    create_or_update_subject_combination,
+    decode_student_cursor,
+    encode_student_cursor,
+    get_students_page,
+)
+from models import SubjectCombination
+
+NAMES = ["Tino", "Ann", None, "Bee", "Ann", "Chipo", "Rudo"]
+
+
+@pytest.fixture
+def students(db):
+    for i, name in enumerate(NAMES):
+        add_student(db, f"26370{i}", name=name)
+    db.commit()
+
+
+def read_all(db, sort, limit, **filters):
+    numbers, cursor = [], None
+    while True:
+        page, cursor = get_students_page(db, limit, cursor, sort, **filters)
+        numbers += [row["student"].whatsapp_number for row in page]
+        if cursor is None:
+            return numbers
+
+
+@pytest.mark.parametrize(
+    "sort, value", [("id", 42), ("-id", 42), ("name", "Ann"), ("-name", "")]
+)
+def test_cursor_round_trip(sort, value):
+    assert decode_student_cursor(encode_student_cursor(sort, value, 7), sort) == (
+        value,
+        7,
+    )
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "",
+        "not a cursor!",
+        base64.urlsafe_b64encode(b"[1, 2]").decode(),
+        base64.urlsafe_b64encode(b'{"sort": "id"}').decode(),
+        base64.urlsafe_b64encode(b"\xff\xfe").decode(),
+    ],
+)
+def test_invalid_cursor(cursor):
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_student_cursor(cursor, "id")
+
+
+def test_cursor_from_another_sort_is_rejected(db, students):
+    _, cursor = get_students_page(db, 2, sort="name")
+    with pytest.raises(ValueError, match="different sort"):
+        get_students_page(db, 2, cursor, sort="-name")
+
+
+@pytest.mark.parametrize("sort", ["id", "-id", "name", "-name"])
+@pytest.mark.parametrize("limit", [1, 2, 3, 10])
+def test_pages_follow_the_sort_without_gaps(db, students, sort, limit):
+    page, _ = get_students_page(db, len(NAMES), sort=sort)
+    expected = [row["student"].whatsapp_number for row in page]
+    assert sorted(expected) == sorted(f"26370{i}" for i in range(len(NAMES)))
+    assert read_all(db, sort, limit) == expected
+
+
+def test_students_without_a_combination_are_pending(db, students):
+    create_or_update_subject_combination(db, "263700", subject1="Maths")
+    create_or_update_subject_combination(db, "263701", subject1="Art")
+    db.query(SubjectCombination).filter(
+        SubjectCombination.whatsapp_number == "263701"
+    ).update({"subject_combination_state": "Approved"})
+    db.commit()
+
+    pending = read_all(db, "id", 2, combination_state="Pending")
+    assert "263701" not in pending and len(pending) == len(NAMES) - 1
+    assert count_students(db, combination_state="Pending") == len(NAMES) - 1
+    assert read_all(db, "id", 2, combination_state="Approved") == ["263701"]
+    assert count_students(db) == len(NAMES)
@@ -0,0 +1,166 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from models import WebhookInboxEntry
+from webhook_queue import WebhookInbox, WebhookQueue
+
+
+def webhook_body(message_id, phone="263700"):
+    return json.dumps(
+        {
+            "entry": [
+                {
+                    "changes": [
+                        {
+                            "value": {
+                                "contacts": [
+                                    {"profile": {"name": "T"}, "wa_id": phone}
+                                ],
+                                "messages": [
+                                    {
+                                        "from": phone,
+                                        "id": message_id,
+                                        "type": "text",
+                                        "text": {"body": "hi"},
+                                    }
+                                ],
+                            }
+                        }
+                    ]
+                }
+            ]
+        }
+    )
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.02)
+
+
+def test_inbox_keeps_bodies_until_removed(session_factory):
+    inbox = WebhookInbox(session_factory)
+    first = inbox.add(b'{"entry": []}')
+    second = inbox.add('{"entry": [1]}')
+
+    assert inbox.pending() == [(first, '{"entry": []}'), (second, '{"entry": [1]}')]
+    inbox.remove(first)
+    assert inbox.pending() == [(second, '{"entry": [1]}')]
+
+
+def test_failing_body_is_dead_lettered_after_max_attempts(session_factory, db):
+    inbox = WebhookInbox(session_factory, max_attempts=3, base_delay=2)
+    entry_id = inbox.add('{"entry": []}')
+
+    assert inbox.record_failure(entry_id, "boom") == 1
+    assert inbox.record_failure(entry_id, "boom") == 2
+    assert [inbox.retry_delay(n) for n in (1, 2)] == [2, 4]
+    assert inbox.record_failure(entry_id, "still boom") is None
+
+    assert inbox.pending() == []
+    entry = db.get(WebhookInboxEntry, entry_id)
+    assert (entry.status, entry.attempts, entry.error) == ("failed", 3, "still boom")
+
+
+def test_queue_refuses_bodies_when_stopped_or_full():
+    handled = []
+
+    async def run():
+        queue = WebhookQueue(handler=handled.append, workers=1, maxsize=1)
+        assert not queue.enqueue("a")
+        await queue.start()
+        assert queue.enqueue("b")
+        assert not queue.enqueue("c")
+        await queue.stop()
+
+    asyncio.run(run())
+    assert handled == ["b"]
+
+
+class LaneHandler:
+    """
+    Stands in for process_messages on the lanes: records the message ids it
+    gets and returns the queued results, then "processed".
+    """
+
+    def __init__(self):
+        self.handled = []
+        self.results = []
+        self.running = threading.Event()
+        self.running.set()
+
+    def __call__(self, messages):
+        self.running.wait()
+        self.handled += [message.id for message in messages]
+        if self.results:
+            return self.results.pop(0)
+        return {"status": "processed", "processed": len(messages), "duplicates": 0}
+
+
+@pytest.fixture
+def lanes(app_module, session_factory, monkeypatch):
+    """
+    Runs the app in queue mode with its inbox in the test database and
+    LaneHandler in place of process_messages.
+    """
+    handler = LaneHandler()
+    inbox = WebhookInbox(session_factory, max_attempts=2, base_delay=0.05)
+    monkeypatch.setattr(app_module, "webhook_inbox", inbox)
+    monkeypatch.setattr(app_module, "WEBHOOK_INGESTION_MODE", "queue")
+    monkeypatch.setattr(app_module.lane_scheduler, "handler", handler)
+    handler.inbox = inbox
+    return handler
+
+
+def test_body_is_stored_before_the_ack_and_removed_once_handled(app_module, lanes):
+    lanes.running.clear()
+    with TestClient(app_module.app) as client:
+        res = client.post("/webhook", content=webhook_body("wamid.1"))
+        assert res.status_code == 200
+        assert [body for _, body in lanes.inbox.pending()] == [webhook_body("wamid.1")]
+
+        lanes.running.set()
+        wait_for(lambda: not lanes.inbox.pending())
+    assert lanes.handled == ["wamid.1"]
+
+
+def test_inbox_is_replayed_on_start(app_module, lanes):
+    lanes.inbox.add(webhook_body("wamid.1"))
+    with TestClient(app_module.app):
+        wait_for(lambda: not lanes.inbox.pending())
+    assert lanes.handled == ["wamid.1"]
+
+
+def test_failed_message_keeps_its_body_until_a_retry_succeeds(app_module, lanes, db):
+    failed = {"status": "error", "processed": 0, "duplicates": 0, "errors": ["boom"]}
+    lanes.results = [failed]
+    with TestClient(app_module.app) as client:
+        client.post("/webhook", content=webhook_body("wamid.1"))
+        wait_for(lambda: not lanes.inbox.pending())
+    assert lanes.handled == ["wamid.1", "wamid.1"]
+    assert db.query(WebhookInboxEntry).count() == 0
+
+
+def test_body_that_keeps_failing_is_dead_lettered(app_module, lanes, db):
+    failed = {"status": "error", "processed": 0, "duplicates": 0, "errors": ["boom"]}
+    lanes.results = [failed, failed]
+    with TestClient(app_module.app) as client:
+        client.post("/webhook", content=webhook_body("wamid.1"))
+        wait_for(lambda: not lanes.inbox.pending())
+    entry = db.query(WebhookInboxEntry).one()
+    assert (entry.status, entry.attempts, entry.error) == ("failed", 2, "boom")
+    assert lanes.handled == ["wamid.1", "wamid.1"]
+
+
+@pytest.mark.parametrize("body", [b"", b"not json", b'{"object": "page"}'])
+def test_invalid_payload_is_rejected(app_module, lanes, body):
+    with TestClient(app_module.app) as client:
+        assert client.post("/webhook", content=body).status_code == 400
+    assert lanes.inbox.pending() == []
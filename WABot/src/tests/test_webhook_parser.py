@@ -0,0 +1,115 @@
+import json
+import os
+
+import pytest
+from wa_cloud_py.messages.types import (
+    DocumentMessage,
+    ImageMessage,
+    InteractiveButtonMessage,
+    InteractiveListMessage,
+    MessageStatus,
+    TextMessage,
+)
+
+from webhook_parser import parse_webhook_events
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "webhooks")
+
+
+def load(name):
+    with open(os.path.join(FIXTURES, name), "rb") as f:
+        return f.read()
+
+
+def summary(events):
+    return [
+        (
+            type(event).__name__,
+            event.id,
+            (
+                event.status
+                if isinstance(event, MessageStatus)
+                else event.user.phone_number
+            ),
+        )
+        for event in events
+    ]
+
+
+def test_every_entry_and_change_is_read():
+    events = list(parse_webhook_events(load("multi_entry.json")))
+    assert summary(events) == [
+        ("TextMessage", "wamid.ENTRY1-TEXT", "263771000001"),
+        ("ImageMessage", "wamid.ENTRY2-IMAGE", "263771000002"),
+        ("InteractiveButtonMessage", "wamid.ENTRY2-BUTTON", "263771000003"),
+    ]
+    text, image, button = events
+    assert isinstance(text, TextMessage) and text.body == "Hi"
+    assert isinstance(image, ImageMessage) and image.media_id == "1479537139650973"
+    assert isinstance(button, InteractiveButtonMessage)
+    assert button.reply_id == "confirm_yes"
+    assert [event.user.name for event in events] == ["Tino", "Rudo", "Chipo"]
+
+
+def test_status_only_body_yields_only_statuses():
+    events = list(parse_webhook_events(load("status_only.json")))
+    assert all(isinstance(event, MessageStatus) for event in events)
+    assert [(event.id, event.status, event.recipient_phone) for event in events] == [
+        ("wamid.OUT-1", "sent", "263771000001"),
+        ("wamid.OUT-1", "delivered", "263771000001"),
+        ("wamid.OUT-2", "failed", "263771000002"),
+    ]
+
+
+def test_mixed_body_keeps_payload_order_and_skips_unsupported_types():
+    events = list(parse_webhook_events(load("mixed.json")))
+    assert summary(events) == [
+        ("TextMessage", "wamid.MIXED-1", "263771000002"),
+        ("InteractiveListMessage", "wamid.MIXED-3", "263771000001"),
+        ("MessageStatus", "wamid.OUT-1", "read"),
+        ("DocumentMessage", "wamid.MIXED-4", "263771000004"),
+        ("TextMessage", "wamid.MIXED-5", "263771000005"),
+    ]
+    assert isinstance(events[1], InteractiveListMessage)
+    assert events[1].reply_id == "arts"
+    assert isinstance(events[3], DocumentMessage)
+
+
+def test_senders_are_matched_to_their_contact():
+    events = [
+        event
+        for event in parse_webhook_events(load("mixed.json"))
+        if not isinstance(event, MessageStatus)
+    ]
+    # By wa_id among several contacts; the only contact when "from" is written
+    # differently; just the number when the change has no contacts
+    assert [event.user.name for event in events] == ["Rudo", "Tino", "Bee", None]
+
+
+@pytest.mark.parametrize("decode", [False, True])
+def test_str_and_bytes_bodies_parse_alike(decode):
+    body = load("multi_entry.json")
+    events = parse_webhook_events(body.decode() if decode else body)
+    assert [event.id for event in events] == [
+        "wamid.ENTRY1-TEXT",
+        "wamid.ENTRY2-IMAGE",
+        "wamid.ENTRY2-BUTTON",
+    ]
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [
+        {"object": "whatsapp_business_account"},
+        {"object": "whatsapp_business_account", "entry": []},
+        {"entry": [{"id": "1"}]},
+        {"entry": [{"id": "1", "changes": [{"field": "messages"}]}]},
+    ],
+)
+def test_bodies_without_events_yield_nothing(payload):
+    assert list(parse_webhook_events(json.dumps(payload))) == []
+
+
+def test_invalid_json_raises():
+    with pytest.raises(ValueError):
+        list(parse_webhook_events(b"not json"))
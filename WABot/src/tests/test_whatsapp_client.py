@@ -0,0 +1,112 @@
+import asyncio
+import io
+import json
+import threading
+
+import pytest
+import requests
+from requests.adapters import HTTPAdapter
+
+from whatsapp_client import PooledWhatsApp, text_payload
+
+
+class FakeAdapter(HTTPAdapter):
+    """
+    Answers requests from a list of canned (status, body) replies or exceptions,
+    recording each request with its timeout and the thread that sent it.
+    """
+
+    def __init__(self, replies):
+        super().__init__()
+        self.replies = list(replies)
+        self.sent = []
+
+    def send(self, request, stream=False, timeout=None, **kwargs):
+        self.sent.append((request, timeout, threading.current_thread().name))
+        reply = self.replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        status, body = reply
+        response = requests.Response()
+        response.status_code = status
+        response.raw = io.BytesIO(
+            body if isinstance(body, bytes) else json.dumps(body).encode()
+        )
+        response.request = request
+        response.url = request.url
+        return response
+
+
+@pytest.fixture
+def client():
+    client = PooledWhatsApp(
+        "token",
+        "12345",
+        pool_size=2,
+        connect_timeout=1.5,
+        read_timeout=4,
+        verbose=False,
+    )
+    yield client
+    client.close()
+
+
+def mount(client, *replies):
+    adapter = FakeAdapter(replies)
+    client.session.mount("https://", adapter)
+    return adapter
+
+
+def test_sends_reuse_one_session_with_the_timeouts(client):
+    adapter = mount(client, (200, {"messages": [{"id": "wamid.1"}]}), (200, {}))
+    assert client.send_text("263771000001", "Hi") == (
+        True,
+        {"messages": [{"id": "wamid.1"}]},
+    )
+    client.post_payload(b'{"to": "263771000002"}')
+
+    (first, timeout, _), (second, _, _) = adapter.sent
+    assert timeout == (1.5, 4)
+    assert first.url == client.messages_url
+    assert first.headers["Authorization"] == "Bearer token"
+    assert json.loads(first.body) == text_payload("263771000001", "Hi")
+    # Pre-serialized bodies are sent as they are
+    assert second.body == b'{"to": "263771000002"}'
+
+
+def test_graph_errors_are_returned_not_raised(client):
+    error = {"error": {"code": 131047, "message": "Re-engagement message"}}
+    mount(client, (400, error))
+    assert client.send_text("263771000001", "Hi") == (False, error)
+
+
+def test_timeouts_reach_the_caller(client):
+    mount(client, requests.exceptions.ReadTimeout("read timed out"))
+    with pytest.raises(requests.exceptions.Timeout):
+        client.send_text("263771000001", "Hi")
+
+
+def test_async_sends_run_on_the_client_pool(client):
+    adapter = mount(client, (200, {"messages": [{"id": "wamid.1"}]}))
+    ok, _ = asyncio.run(client.send_text_async("263771000001", "Hi"))
+    assert ok
+    assert adapter.sent[0][2].startswith("whatsapp")
+
+
+def test_media_without_a_url_is_not_downloaded(client, tmp_path):
+    adapter = mount(client, (404, {"error": {"message": "Unknown media"}}))
+    ok, body = client.download_media("998877", "results", str(tmp_path))
+    assert not ok and body["error"]["message"] == "Unknown media"
+    assert len(adapter.sent) == 1
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_media_is_streamed_to_disk(client, tmp_path):
+    mount(
+        client,
+        (200, {"url": "https://lookaside.example/998877", "mime_type": "image/jpeg"}),
+        (200, b"\xff\xd8jpeg bytes"),
+    )
+    ok, _ = client.download_media("998877", "results", str(tmp_path))
+    assert ok
+    assert (tmp_path / "results.jpeg").read_bytes() == b"\xff\xd8jpeg bytes"
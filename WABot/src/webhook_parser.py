@@ -0,0 +1,84 @@
+import json
+
+from wa_cloud_py.messages.types import (
+    MessageType,
+    MessageStatus,
+    User,
+    TextMessage,
+    OrderMessage,
+    LocationMessage,
+    ImageMessage,
+    VideoMessage,
+    AudioMessage,
+    DocumentMessage,
+    InteractiveListMessage,
+    InteractiveButtonMessage,
+)
+
+MESSAGE_CLASSES = {
+    MessageType.TEXT.value: TextMessage,
+    MessageType.ORDER.value: OrderMessage,
+    MessageType.LOCATION.value: LocationMessage,
+    MessageType.IMAGE.value: ImageMessage,
+    MessageType.VIDEO.value: VideoMessage,
+    MessageType.AUDIO.value: AudioMessage,
+    MessageType.DOCUMENT.value: DocumentMessage,
+}
+
+INTERACTIVE_CLASSES = {
+    MessageType.INTERACTIVE_LIST.value: InteractiveListMessage,
+    MessageType.INTERACTIVE_BUTTON.value: InteractiveButtonMessage,
+}
+
+
+def parse_message(data, user):
+    """
+    Builds the wa_cloud_py message object for a single entry of a "messages" array,
+    mirroring the type mapping used by WhatsApp.parse().
+
+    Returns None for unsupported message types.
+    """
+    message_class = MESSAGE_CLASSES.get(data.get("type"))
+    if message_class is None:
+        interactive_type = data.get("interactive", {}).get("type")
+        message_class = INTERACTIVE_CLASSES.get(interactive_type)
+    if message_class is None:
+        print(f"Unsupported message type: {data.get('type')}")
+        return None
+    return message_class(data, user=user)
+
+
+def parse_webhook_events(body):
+    """
+    Parses every message and status in a webhook payload. Unlike WhatsApp.parse(),
+    which only reads entry[0].changes[0], this walks all entries and changes so
+    batched deliveries are not dropped.
+
+    Args:
+    body (bytes | str): The raw request body posted by the WhatsApp Cloud API.
+
+    Yields:
+    UserMessage | MessageStatus: Messages and statuses in payload order.
+    """
+    payload = json.loads(body)
+    for entry in payload.get("entry", []):
+        for change in entry.get("changes", []):
+            value = change.get("value", {})
+
+            # Messages carry the sender's wa_id in "from"; match it to its contact
+            contacts = {
+                contact.get("wa_id"): User(contact)
+                for contact in value.get("contacts", [])
+            }
+            for data in value.get("messages", []):
+                user = contacts.get(data.get("from"))
+                if user is None and len(contacts) == 1:
+                    user = next(iter(contacts.values()))
+                if user is None:
+                    user = User({"wa_id": data.get("from")})
+                message = parse_message(data, user)
+                if message is not None:
+                    yield message
+
+            for status in value.get("statuses", []):
+                yield MessageStatus(status)
@@ -0,0 +1,185 @@
+import asyncio
+import json
+
+from sqlalchemy import delete, select
+
+from models import WebhookInboxEntry
+
+
+def validate_webhook_body(body):
+    """
+    Performs the cheap checks needed before a webhook body is accepted for
+    background processing.
+
+    Args:
+    body (bytes): The raw request body posted by the WhatsApp Cloud API.
+
+    Returns:
+    bool: True if the body is a JSON object carrying an "entry" list.
+    """
+    if not body:
+        return False
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return False
+    return isinstance(payload, dict) and isinstance(payload.get("entry"), list)
+
+
+class WebhookInbox:
+    """
+    Keeps raw webhook bodies in the webhook_inbox table from the moment they are
+    acknowledged until they have been processed. Meta does not redeliver a body
+    it got a 200 for, so whatever is still in the inbox after a crash or deploy
+    is replayed on start; the message deduplicator drops the messages in it that
+    were already handled.
+
+    A body with a message whose handler failed stays in the inbox and is
+    processed again after a backoff (retry_delay). After max_attempts it is
+    marked failed and kept, with the error, as a dead letter.
+    """
+
+    def __init__(self, session_factory, max_attempts=5, base_delay=5):
+        self.session_factory = session_factory
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+
+    def add(self, body):
+        """
+        Stores a body and commits. Blocking.
+
+        Returns:
+        int: The inbox entry id.
+        """
+        if isinstance(body, bytes):
+            body = body.decode("utf-8")
+        db = self.session_factory()
+        try:
+            entry = WebhookInboxEntry(body=body)
+            db.add(entry)
+            db.commit()
+            return entry.id
+        finally:
+            db.close()
+
+    def remove(self, entry_id):
+        db = self.session_factory()
+        try:
+            db.execute(
+                delete(WebhookInboxEntry).where(WebhookInboxEntry.id == entry_id)
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def record_failure(self, entry_id, error):
+        """
+        Records a failed attempt at processing a body. Blocking.
+
+        Returns:
+        int: The attempts made so far, or None if that was the last one and the
+        body is now a dead letter.
+        """
+        db = self.session_factory()
+        try:
+            entry = db.get(WebhookInboxEntry, entry_id)
+            entry.attempts += 1
+            entry.error = error
+            if entry.attempts >= self.max_attempts:
+                entry.status = "failed"
+            db.commit()
+            if entry.status == "failed":
+                print(f"Webhook {entry_id} failed {entry.attempts} times: {error}")
+                return None
+            return entry.attempts
+        finally:
+            db.close()
+
+    def retry_delay(self, attempts):
+        return self.base_delay * 2 ** (attempts - 1)
+
+    def pending(self):
+        """
+        Returns the (id, body) of every body not yet processed, oldest first.
+        """
+        db = self.session_factory()
+        try:
+            return db.execute(
+                select(WebhookInboxEntry.id, WebhookInboxEntry.body)
+                .where(WebhookInboxEntry.status == "pending")
+                .order_by(WebhookInboxEntry.id)
+            ).all()
+        finally:
+            db.close()
+
+
+class WebhookQueue:
+    """
+    Buffers webhook bodies so that POST /webhook can be acknowledged right away.
+    A fixed pool of asyncio workers drains the queue. Coroutine handlers are
+    awaited directly; blocking handlers run in a thread, keeping the event loop
+    free for new requests.
+    """
+
+    def __init__(self, handler, workers=4, maxsize=10000):
+        self.handler = handler
+        self.workers = workers
+        self.maxsize = maxsize
+        self.queue = None
+        self._tasks = []
+
+    async def start(self):
+        self.queue = asyncio.Queue(maxsize=self.maxsize)
+        for worker_id in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._worker(worker_id)))
+        print(f"Webhook queue started with {self.workers} workers")
+
+    async def stop(self, timeout=10):
+        """
+        Gives the workers up to `timeout` seconds to drain what is left in the
+        queue, then cancels them.
+        """
+        if self.queue is None:
+            return
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            print(f"Webhook queue stopped with {self.queue.qsize()} bodies pending")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def enqueue(self, body):
+        """
+        Adds a webhook body to the queue without waiting.
+
+        Returns:
+        bool: False if the queue is not running or is full.
+        """
+        if self.queue is None:
+            return False
+        try:
+            self.queue.put_nowait(body)
+        except asyncio.QueueFull:
+            return False
+        return True
+
+    async def put(self, body):
+        """
+        Adds a webhook body to the queue, waiting for room if it is full.
+        """
+        await self.queue.put(body)
+
+    async def _worker(self, worker_id):
+        while True:
+            body = await self.queue.get()
+            try:
+                if asyncio.iscoroutinefunction(self.handler):
+                    await self.handler(body)
+                else:
+                    await asyncio.to_thread(self.handler, body)
+            except Exception as e:
+                print(f"Webhook worker {worker_id} failed to process body: {e}")
+            finally:
+                self.queue.task_done()
@@ -0,0 +1,207 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import List, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from wa_cloud_py import WhatsApp
+from wa_cloud_py.components.messages import ListSection
+from wa_cloud_py.messages.types import MIME_TYPES, MessageType
+
+
+def text_payload(to, body, preview_url=True, context_message_id=None):
+    """
+    Builds the Graph API body for a text message, as WhatsApp.send_text() does.
+    """
+    data = {
+        "messaging_product": "whatsapp",
+        "recipient_type": "individual",
+        "to": to,
+        "type": MessageType.TEXT.value,
+        "text": {"preview_url": preview_url, "body": body},
+    }
+    if context_message_id is not None:
+        data["context"] = {"message_id": context_message_id}
+    return data
+
+
+def interactive_list_payload(to, body, button, sections, header=None, footer=None):
+    """
+    Builds the Graph API body for an interactive list message, as
+    WhatsApp.send_interactive_list() does.
+    """
+    return {
+        "messaging_product": "whatsapp",
+        "recipient_type": "individual",
+        "to": to,
+        "type": MessageType.INTERACTIVE.value,
+        "interactive": {
+            "type": "list",
+            "header": {"type": "text", "text": header or ""},
+            "body": {"text": body},
+            "footer": {"text": footer},
+            "action": {
+                "button": button,
+                "sections": [
+                    section.to_dict() if isinstance(section, ListSection) else section
+                    for section in sections
+                ],
+            },
+        },
+    }
+
+
+def template_payload(to, name, language, body_parameters=()):
+    """
+    Builds the Graph API body for an approved message template, filling the
+    template's body variables ({{1}}, {{2}}, ...) in order.
+    """
+    template = {"name": name, "language": {"code": language}}
+    if body_parameters:
+        template["components"] = [
+            {
+                "type": "body",
+                "parameters": [
+                    {"type": "text", "text": text} for text in body_parameters
+                ],
+            }
+        ]
+    return {
+        "messaging_product": "whatsapp",
+        "recipient_type": "individual",
+        "to": to,
+        "type": "template",
+        "template": template,
+    }
+
+
+class PooledWhatsApp(WhatsApp):
+    """
+    WhatsApp Cloud API client that sends through one requests.Session, so HTTPS
+    connections to graph.facebook.com are kept alive and reused instead of doing a
+    TCP and TLS handshake per message. Every request has a timeout.
+
+    The *_async methods run the same calls on a dedicated thread pool and can be
+    awaited from async code without blocking the event loop.
+    """
+
+    def __init__(
+        self,
+        access_token: str,
+        phone_number_id: str,
+        pool_size: int = 20,
+        connect_timeout: float = 3.05,
+        read_timeout: float = 20,
+        **kwargs,
+    ) -> None:
+        super().__init__(access_token, phone_number_id, **kwargs)
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self._executor = ThreadPoolExecutor(
+            max_workers=pool_size, thread_name_prefix="whatsapp"
+        )
+
+    def post_payload(self, payload) -> requests.Response:
+        """
+        Posts a message body to the messages endpoint. `payload` may be a dict or
+        pre-serialized JSON (str or bytes).
+        """
+        if isinstance(payload, (bytes, str)):
+            return self.session.post(
+                self.messages_url, data=payload, timeout=self.timeout
+            )
+        return self.session.post(self.messages_url, json=payload, timeout=self.timeout)
+
+    def send_payload(self, payload, to: str) -> Tuple[bool, dict]:
+        res = self.post_payload(payload)
+        return self._parse_response(res, phone_number=to)
+
+    def send_text(
+        self,
+        to: str,
+        body: str,
+        preview_url: bool = True,
+        context_message_id: str = None,
+    ) -> Tuple[bool, dict]:
+        return self.send_payload(
+            text_payload(to, body, preview_url, context_message_id), to
+        )
+
+    def send_interactive_list(
+        self,
+        to: str,
+        body: str,
+        button: str,
+        sections: List[ListSection],
+        header: str = None,
+        footer: str = None,
+    ) -> Tuple[bool, dict]:
+        return self.send_payload(
+            interactive_list_payload(to, body, button, sections, header, footer), to
+        )
+
+    def mark_as_read(self, message_id: str) -> Tuple[bool, dict]:
+        data = {
+            "messaging_product": "whatsapp",
+            "status": "read",
+            "message_id": message_id,
+        }
+        res = self.post_payload(data)
+        return res.status_code == 200, res.json()
+
+    def open_media(self, media_id: str) -> Tuple[dict, requests.Response]:
+        """
+        Looks up a media object and opens a streaming GET for its content.
+
+        Returns:
+        Tuple[dict, requests.Response]: The media metadata, and the response whose
+        body has not been read yet (None if the metadata has no URL). The caller
+        must close the response.
+        """
+        res = self.session.get(f"{self.base_url}/{media_id}", timeout=self.timeout)
+        res_json = res.json()
+        if "url" not in res_json:
+            return res_json, None
+        media_res = self.session.get(res_json["url"], stream=True, timeout=self.timeout)
+        return res_json, media_res
+
+    def download_media(
+        self, media_id: str, filename: str, save_path: str = "/assets"
+    ) -> Tuple[bool, dict]:
+        res_json, media_res = self.open_media(media_id)
+        if media_res is None:
+            return False, res_json
+
+        os.makedirs(save_path, exist_ok=True)
+        ext = MIME_TYPES.get(res_json.get("mime_type"), "")
+        with media_res, open(f"{save_path}/{filename}{ext}", "wb") as f:
+            for chunk in media_res.iter_content(chunk_size=64 * 1024):
+                f.write(chunk)
+        return True, res_json
+
+    async def _run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, partial(func, *args, **kwargs)
+        )
+
+    async def send_payload_async(self, payload, to: str) -> Tuple[bool, dict]:
+        return await self._run(self.send_payload, payload, to)
+
+    async def send_text_async(self, *args, **kwargs) -> Tuple[bool, dict]:
+        return await self._run(self.send_text, *args, **kwargs)
+
+    async def send_interactive_list_async(self, *args, **kwargs) -> Tuple[bool, dict]:
+        return await self._run(self.send_interactive_list, *args, **kwargs)
+
+    async def mark_as_read_async(self, message_id: str) -> Tuple[bool, dict]:
+        return await self._run(self.mark_as_read, message_id)
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        self.session.close()
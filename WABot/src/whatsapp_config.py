@@ -1,6 +1,8 @@
 from dotenv import load_dotenv
 import os
-from wa_cloud_py import WhatsApp
+from whatsapp_client import PooledWhatsApp
+from outbound_queue import OutboundQueue
+from database import SessionLocal
 
 # Load environment variables
 load_dotenv()
@@ -9,8 +11,18 @@ load_dotenv()
 access_token = os.getenv("ACCESS_TOKEN")
 phone_number_id = os.getenv("PHONE_NUMBER_ID")
 
-# Configure WhatsApp client
-whatsapp = WhatsApp(
+# Configure WhatsApp client with a persistent connection pool
+whatsapp = PooledWhatsApp(
     access_token=access_token,
-    phone_number_id=phone_number_id
-)
\ No newline at end of file
+    phone_number_id=phone_number_id,
+    pool_size=int(os.getenv("WHATSAPP_POOL_SIZE", "20")),
+    connect_timeout=float(os.getenv("WHATSAPP_CONNECT_TIMEOUT", "3.05")),
+    read_timeout=float(os.getenv("WHATSAPP_READ_TIMEOUT", "20")),
+)
+
+# Rate-limited, retrying sender used by the outbox dispatcher and broadcasts
+outbound_queue = OutboundQueue(
+    client=whatsapp,
+    session_factory=SessionLocal,
+    rate=float(os.getenv("WHATSAPP_MESSAGES_PER_SECOND", "80")),
+)
@@ -5,16 +5,20 @@ export default function StudentList() {
   const [students, setStudents] = React.useState<Student[]>([]);
   const [loading, setLoading] = React.useState(true);
   const [error, setError] = React.useState<string | null>(null);
+  const [nextCursor, setNextCursor] = React.useState<string | null>(null);
 
   React.useEffect(() => {
     loadStudents();
   }, []);
 
-  const loadStudents = async () => {
+  const loadStudents = async (cursor?: string) => {
     try {
       setLoading(true);
-      const data = await studentService.getAllStudents();
-      setStudents(data);
+      const page = await studentService.getStudents({ cursor });
+      setStudents((loaded) =>
+        cursor ? [...loaded, ...page.students] : page.students
+      );
+      setNextCursor(page.nextCursor);
     } catch (err) {
       setError("Failed to load students");
       console.error("Error loading students:", err);
@@ -23,7 +27,7 @@ export default function StudentList() {
     }
   };
 
-  if (loading) return <div>Loading...</div>;
+  if (loading && students.length === 0) return <div>Loading...</div>;
   if (error) return <div className="text-red-600">{error}</div>;
 
   return (
@@ -106,6 +110,15 @@ export default function StudentList() {
           ))}
         </tbody>
       </table>
+      {nextCursor && (
+        <button
+          onClick={() => loadStudents(nextCursor)}
+          disabled={loading}
+          className="mt-4 px-4 py-2 text-sm text-emerald-600 hover:text-emerald-900"
+        >
+          {loading ? "Loading..." : "Load more"}
+        </button>
+      )}
     </div>
   );
 }
@@ -7,6 +7,7 @@ export default function ApplicationsPage() {
   const [applications, setApplications] = React.useState<Student[]>([]);
   const [loading, setLoading] = React.useState(true);
   const [error, setError] = React.useState<string | null>(null);
+  const [nextCursor, setNextCursor] = React.useState<string | null>(null);
   const [expandedId, setExpandedId] = useState<number | null>(null);
   const [editMode, setEditMode] = useState<number | null>(null);
   const [editedStudent, setEditedStudent] = useState<Partial<Student> | null>(
@@ -17,11 +18,14 @@ export default function ApplicationsPage() {
     loadApplications();
   }, []);
 
-  const loadApplications = async () => {
+  const loadApplications = async (cursor?: string) => {
     try {
       setLoading(true);
-      const data = await studentService.getAllStudents();
-      setApplications(data);
+      const page = await studentService.getStudents({ cursor });
+      setApplications((loaded) =>
+        cursor ? [...loaded, ...page.students] : page.students
+      );
+      setNextCursor(page.nextCursor);
     } catch (err) {
       setError("Failed to load applications");
       console.error("Error loading applications:", err);
@@ -52,7 +56,7 @@ export default function ApplicationsPage() {
     }
   };
 
-  if (loading) return <div>Loading...</div>;
+  if (loading && applications.length === 0) return <div>Loading...</div>;
   if (error) return <div className="text-red-600">{error}</div>;
 
   return (
@@ -278,6 +282,16 @@ export default function ApplicationsPage() {
           </div>
         ))}
       </div>
+
+      {nextCursor && (
+        <button
+          onClick={() => loadApplications(nextCursor)}
+          disabled={loading}
+          className="mt-6 px-4 py-2 text-sm text-emerald-600 hover:text-emerald-900"
+        >
+          {loading ? "Loading..." : "Load more"}
+        </button>
+      )}
     </div>
   );
 }
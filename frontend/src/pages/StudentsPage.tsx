@@ -15,11 +15,15 @@ export default function StudentsPage() {
 
   const loadStats = async () => {
     try {
-      const students = await studentService.getAllStudents();
+      // Only the counts are needed, so ask for the smallest pages
+      const [all, approved] = await Promise.all([
+        studentService.getStudents({ limit: 1 }),
+        studentService.getStudents({ limit: 1, state: "none" }),
+      ]);
       setStats({
-        total: students.length,
-        pending: students.filter((s) => s.student.state !== "none").length,
-        approved: students.filter((s) => s.student.state === "none").length,
+        total: all.total,
+        pending: all.total - approved.total,
+        approved: approved.total,
       });
     } catch (err) {
       console.error("Error loading stats:", err);
@@ -4,6 +4,12 @@ const API_URL = import.meta.env.VITE_API_URL;
 
 export const apiClient = {
   get: async (endpoint: string) => {
+    const response = await apiClient.getResponse(endpoint);
+    return response.json();
+  },
+
+  // For endpoints that return metadata (e.g. paging) in headers
+  getResponse: async (endpoint: string): Promise<Response> => {
     const response = await fetch(`${API_URL}${endpoint}`, {
       headers: {
         'Authorization': `Bearer ${authService.getToken()}`,
@@ -19,7 +25,7 @@ export const apiClient = {
       throw new Error('API request failed');
     }
     
-    return response.json();
+    return response;
   },
 
   post: async (endpoint: string, data: any) => {
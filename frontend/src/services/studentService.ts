@@ -41,9 +41,38 @@ export interface Student {
   };
 }
 
+export interface StudentPageParams {
+  cursor?: string;
+  limit?: number;
+  sort?: 'id' | '-id' | 'name' | '-name';
+  state?: string;
+  combination_state?: string;
+  gender?: string;
+  has_images?: boolean;
+}
+
+export interface StudentPage {
+  students: Student[];
+  // Pass as `cursor` to get the next page; null on the last page
+  nextCursor: string | null;
+  // Number of students matching the filters, across all pages
+  total: number;
+}
+
 export const studentService = {
-  getAllStudents: async (): Promise<Student[]> => {
-    return await apiClient.get('/api/students');
+  getStudents: async (params: StudentPageParams = {}): Promise<StudentPage> => {
+    const query = new URLSearchParams();
+    Object.entries(params).forEach(([key, value]) => {
+      if (value !== undefined) {
+        query.set(key, String(value));
+      }
+    });
+    const response = await apiClient.getResponse(`/api/students?${query}`);
+    return {
+      students: await response.json(),
+      nextCursor: response.headers.get('X-Next-Cursor'),
+      total: Number(response.headers.get('X-Total-Count') ?? 0),
+    };
   },
 
   getStudent: async (whatsappNumber: string): Promise<Student> => {